@@ -0,0 +1,139 @@
+# backend/autosave.py
+# Buffer write-behind para los autosaves del frontend (debounce de 500 ms por tecla):
+# cada POST solo deja los valores en memoria, coalescidos por (tabla, sid), y un hilo
+# los escribe cada AUTOSAVE_FLUSH_MS en una única transacción (también al apagar).
+# Las lecturas llaman a flush(sid) antes de consultar la DB: read-your-writes. El flush no
+# pisa filas con updated_at más nuevo (p. ej. una escritura directa que se le adelantó).
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from state_db import SessionLocal, upsert_by_sid, upsert_stmt
+
+logger = logging.getLogger("regresiones")
+
+AUTOSAVE_FLUSH_MS = int(os.getenv("AUTOSAVE_FLUSH_MS", "1000"))  # 0 = escritura directa
+AUTOSAVE_MAX_PENDING = int(os.getenv("AUTOSAVE_MAX_PENDING", "2000"))
+
+_Key = Tuple[type, str]
+
+
+class AutosaveBuffer:
+    def __init__(self, session_factory, interval_s: float, max_pending: int):
+        self.session_factory = session_factory
+        self.interval_s = interval_s
+        self.max_pending = max_pending
+        self._pending: Dict[_Key, Tuple[dict, dict]] = {}  # (modelo, sid) -> (values, update)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # un flush a la vez (mantiene el orden por sid)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.writes = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.errors = 0
+
+    def put(self, model, sid: str, values: dict, update: Optional[dict] = None) -> None:
+        """Como state_db.upsert_by_sid, pero diferido; `update` = columnas a pisar si la fila existe."""
+        if self.interval_s <= 0:
+            with self.session_factory() as db:
+                upsert_by_sid(db, model, sid, values, update)
+            return
+        update = values if update is None else update
+        with self._lock:
+            self.writes += 1
+            prev = self._pending.get((model, sid))
+            if prev is not None:
+                self.coalesced += 1
+                values = {**prev[0], **values}
+                update = {**prev[1], **update}
+            self._pending[(model, sid)] = (values, update)
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._wake.set()
+
+    def get(self, model, sid: str) -> Optional[dict]:
+        """Valores pendientes (aún no escritos) de la fila, o None."""
+        with self._lock:
+            item = self._pending.get((model, sid))
+            return dict(item[0]) if item else None
+
+    def discard(self, model, sid: str) -> None:
+        # una escritura directa posterior reemplaza lo pendiente
+        with self._lock:
+            self._pending.pop((model, sid), None)
+
+    @contextmanager
+    def paused(self):
+        """Sin flush en curso mientras dura: cada valor está pendiente en el buffer o ya
+        commiteado, nunca sacado del buffer y a medio escribir. Para leer-modificar-escribir."""
+        with self._flush_lock:
+            yield
+
+    def flush(self, sid: Optional[str] = None) -> int:
+        """Escribe lo pendiente (todo, o solo de `sid`) en una transacción. Devuelve filas escritas."""
+        with self._flush_lock:
+            with self._lock:
+                if sid is None:
+                    batch, self._pending = self._pending, {}
+                else:
+                    batch = {k: v for k, v in self._pending.items() if k[1] == sid}
+                    for k in batch:
+                        del self._pending[k]
+            if not batch:
+                return 0
+            try:
+                with self.session_factory() as db:
+                    for (model, row_sid), (values, update) in batch.items():
+                        db.execute(upsert_stmt(model, row_sid, values, update, newer_only=True))
+                    db.commit()
+            except Exception as e:
+                logger.warning("Autosave: no se pudo escribir el lote (%d filas): %s", len(batch), e)
+                with self._lock:
+                    self.errors += 1
+                    for k, v in batch.items():
+                        self._pending.setdefault(k, v)  # se reintenta salvo que ya haya algo más nuevo
+                return 0
+            with self._lock:
+                self.flushes += 1
+                self.rows_flushed += len(batch)
+            return len(batch)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval_s)
+            self._wake.clear()
+            self.flush()
+
+    def start(self) -> None:
+        if self.interval_s > 0 and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="autosave", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "interval_ms": int(self.interval_s * 1000),
+                "pending": len(self._pending),
+                "writes": self.writes,
+                "coalesced": self.coalesced,
+                "flushes": self.flushes,
+                "rows_flushed": self.rows_flushed,
+                "errors": self.errors,
+            }
+
+
+autosave_buffer = AutosaveBuffer(SessionLocal, AUTOSAVE_FLUSH_MS / 1000.0, AUTOSAVE_MAX_PENDING)
@@ -0,0 +1,84 @@
+# backend/batch.py
+# Muchas especificaciones (y, X, intercepto) contra un mismo dataset: se parsea,
+# se convierte a numérico y se calculan los momentos una sola vez; cada modelo
+# cuesta O(k^3). Con k grande se puede repartir entre procesos.
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from moments import Moments
+from solvers import COND_CHOLESKY_MAX
+
+BATCH_MAX_SPECS = int(os.getenv("BATCH_MAX_SPECS", "500"))
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", str(min(4, os.cpu_count() or 1))))
+BATCH_PARALLEL_MIN_K = int(os.getenv("BATCH_PARALLEL_MIN_K", "50"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # forkserver, no fork: el servidor ya tiene hilos (autosave, GC de blobs, jobs,
+        # perfilador) y conexiones abiertas que un fork copiaría a medio usar
+        _pool = ProcessPoolExecutor(max_workers=BATCH_WORKERS, mp_context=multiprocessing.get_context("forkserver"))
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def check_spec(m: Moments, spec: dict) -> Optional[str]:
+    """Mensaje de error de la especificación, o None si se puede ajustar con `m`."""
+    y, xs = spec["y"], spec["x_columns"]
+    if not xs:
+        return "Debes especificar al menos una X en 'x_columns'"
+    if y in xs:
+        return "La columna y no puede estar también en 'x_columns'"
+    for c in [y] + xs:
+        if c in m.index:
+            continue
+        if c in m.non_numeric:
+            return f"La columna '{c}' debe ser completamente numérica"
+        return f"Columna y '{c}' no existe" if c == y else f"La columna X '{c}' no existe"
+    return None
+
+
+def _fit_one(m: Moments, spec: dict) -> Tuple[str, Optional[dict]]:
+    """("ok", out) | ("error", {"error": msg}) | ("rows", None) si hay que reajustar sobre filas."""
+    err = check_spec(m, spec)
+    if err:
+        return "error", {"error": err}
+    out = m.fit(spec["y"], sorted(spec["x_columns"]), spec["fit_intercept"])
+    if out["condition_number"] > COND_CHOLESKY_MAX:
+        return "rows", None
+    return "ok", out
+
+
+def _fit_chunk(state: tuple, specs: List[dict]) -> List[Tuple[str, Optional[dict]]]:
+    # se ejecuta en el proceso hijo: reconstruye Moments a partir de arrays (picklable)
+    m = Moments(*state)
+    return [_fit_one(m, s) for s in specs]
+
+
+def fit_specs(m: Moments, specs: List[dict], parallel: bool = False) -> List[Tuple[str, Optional[dict]]]:
+    """Ajusta cada especificación contra los mismos momentos (resultado en el mismo orden)."""
+    max_k = max((len(s["x_columns"]) + 1 for s in specs), default=0)
+    if not (parallel and BATCH_WORKERS > 1 and len(specs) > 1 and max_k >= BATCH_PARALLEL_MIN_K):
+        return [_fit_one(m, s) for s in specs]
+
+    state = (m.names, m.n, m.mean, m.comoment, m.non_numeric)
+    n_chunks = min(BATCH_WORKERS, len(specs))
+    size = -(-len(specs) // n_chunks)
+    chunks = [specs[i:i + size] for i in range(0, len(specs), size)]
+    pool = get_pool()
+    futures = [pool.submit(_fit_chunk, state, chunk) for chunk in chunks]
+    out: List[Tuple[str, Optional[dict]]] = []
+    for f in futures:
+        out.extend(f.result())
+    return out
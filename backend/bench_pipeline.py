@@ -0,0 +1,93 @@
+# backend/bench_pipeline.py
+# Antes/después del pipeline de arrays: validación de payload JSON + matriz de diseño
+# (endpoint /api/regression/json) y coerción numérica + matriz de diseño desde un
+# DataFrame (endpoints Excel / biblioteca). Mide tiempo y pico de memoria (tracemalloc).
+#   python bench_pipeline.py
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from main import _all_finite, _ensure_numeric, _ols, _prepare_matrix
+
+
+# ---- implementación anterior (lista -> dict -> np.asarray/np.hstack por columna)
+def _legacy_is_number(x) -> bool:
+    return isinstance(x, (int, float)) and not (isinstance(x, float) and (np.isnan(x) or np.isinf(x)))
+
+
+def _legacy_prepare(y_list, X_dict, fit_intercept):
+    y = np.asarray(y_list, dtype=float).reshape(-1, 1)
+    X = np.hstack([np.asarray(X_dict[n], dtype=float).reshape(-1, 1) for n in sorted(X_dict)])
+    if fit_intercept:
+        X = np.hstack([np.ones((X.shape[0], 1)), X])
+    return y, X
+
+
+def _legacy_json(y, X):
+    assert all(_legacy_is_number(t) for t in y)
+    for col in X.values():
+        assert all(_legacy_is_number(t) for t in col)
+    return _ols(*_legacy_prepare(y, X, True))
+
+
+def _legacy_excel(df, y_column, xs):
+    def ensure_numeric(s, name):
+        coerced = pd.to_numeric(s, errors="coerce")
+        if coerced.isna().any():
+            raise ValueError(name)
+        return coerced
+    y = ensure_numeric(df[y_column], y_column).to_numpy().reshape(-1, 1)
+    X_cols = {c: ensure_numeric(df[c], c).to_numpy().tolist() for c in xs}
+    y_list = y.flatten().tolist()
+    return _ols(*_legacy_prepare(y_list, {c: X_cols[c] for c in xs}, True))
+
+
+# ---- implementación actual
+def _new_json(y, X):
+    assert _all_finite(y)
+    for col in X.values():
+        assert _all_finite(col)
+    return _ols(*_prepare_matrix(y, X, True))
+
+
+def _new_excel(df, y_column, xs):
+    y = _ensure_numeric(df[y_column], y_column)
+    X_cols = {c: _ensure_numeric(df[c], c) for c in xs}
+    return _ols(*_prepare_matrix(y, X_cols, True))
+
+
+def _measure(fn, *args):
+    fn(*args)  # calentamiento
+    t0 = time.perf_counter()
+    fn(*args)
+    secs = time.perf_counter() - t0
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return secs, peak
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'endpoint':>10} {'n':>9} {'k':>3} | {'antes':>22} | {'después':>22} | {'speedup':>7}")
+    for n, k in [(10_000, 3), (200_000, 3), (200_000, 10)]:
+        data = {f"x{i}": rng.normal(size=n) for i in range(k)}
+        y = sum(data.values()) + rng.normal(size=n)
+        df = pd.DataFrame({"y": y, **data})
+        xs = list(data)
+        json_y, json_X = y.tolist(), {c: v.tolist() for c, v in data.items()}  # lo que entrega pydantic
+        for name, old, new, args in [
+            ("json", _legacy_json, _new_json, (json_y, json_X)),
+            ("excel", _legacy_excel, _new_excel, (df, "y", xs)),
+        ]:
+            t_old, m_old = _measure(old, *args)
+            t_new, m_new = _measure(new, *args)
+            print(f"{name:>10} {n:>9} {k:>3} | {t_old * 1e3:8.1f}ms {m_old / 2**20:8.1f}MiB | "
+                  f"{t_new * 1e3:8.1f}ms {m_new / 2**20:8.1f}MiB | {t_old / t_new:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
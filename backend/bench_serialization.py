@@ -0,0 +1,84 @@
+# backend/bench_serialization.py
+# Serialización de respuestas grandes: antes (_sanitize_numbers recursivo +
+# jsonable_encoder + json stdlib) vs ahora (saneo vectorizado + FastJSONResponse).
+#   python bench_serialization.py
+import json
+import math
+import time
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+
+from fast_json import FastJSONResponse, orjson
+from solvers import finite
+
+
+def _legacy_sanitize(obj):
+    if isinstance(obj, dict):
+        return {k: _legacy_sanitize(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_legacy_sanitize(v) for v in obj]
+    try:
+        if isinstance(obj, (np.floating, float)):
+            v = float(obj)
+            if not math.isfinite(v):
+                return 0.0
+            return v
+        if isinstance(obj, (np.integer, int)):
+            return int(obj)
+    except Exception:
+        pass
+    return obj
+
+
+def _legacy(payload):
+    # camino anterior: sanear en Python, luego FastAPI codifica con jsonable_encoder + json.dumps
+    content = jsonable_encoder(_legacy_sanitize(payload))
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def _new(payload):
+    return FastJSONResponse(payload).body
+
+
+def _payload(n, k, rng, as_arrays):
+    names = ["intercept"] + [f"x{i}" for i in range(k - 1)]
+    beta = rng.normal(size=k)
+    fitted = rng.normal(size=n)
+    fitted[::97] = np.nan  # algunos no finitos
+    resid = rng.normal(size=n)
+    if as_arrays:
+        fitted, resid = finite(fitted), finite(resid)
+    else:
+        fitted, resid = fitted.tolist(), resid.tolist()
+    return {
+        "coefficients": dict(zip(names, beta.tolist())),
+        "std_errors": dict(zip(names, np.abs(beta).tolist())),
+        "t_stats": dict(zip(names, beta.tolist())),
+        "r2": 0.9, "adj_r2": 0.89, "sse": 1.0, "sigma2": 0.1, "n": n, "k": k,
+        "fitted_values": fitted, "residuals": resid,
+    }
+
+
+def _best(fn, arg, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"orjson: {'sí' if orjson is not None else 'no (fallback json stdlib)'}")
+    print(f"{'n':>9} {'k':>4} | {'antes':>10} | {'ahora':>10} | {'speedup':>7}")
+    for n, k in [(1_000, 5), (100_000, 5), (1_000_000, 5), (1_000, 500)]:
+        t_old = _best(_legacy, _payload(n, k, rng, as_arrays=False))
+        new_payload = _payload(n, k, rng, as_arrays=True)
+        t_new = _best(_new, new_payload)
+        print(f"{n:>9} {k:>4} | {t_old * 1e3:8.1f}ms | {t_new * 1e3:8.1f}ms | {t_old / t_new:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
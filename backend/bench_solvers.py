@@ -0,0 +1,72 @@
+# backend/bench_solvers.py
+# Compara los backends de solvers.py (y la inversión explícita anterior) en tiempo y
+# precisión, variando n, k y el condicionamiento de X.
+#   python bench_solvers.py
+import time
+
+import numpy as np
+
+from solvers import solve_ols
+
+
+def _legacy_inv(X, y):
+    XtX_inv = np.linalg.inv(X.T @ X)
+    return XtX_inv @ (X.T @ y)
+
+
+def _design(n, k, ill, rng):
+    if ill:
+        # columnas polinomiales 1, t, t^2, ... con t en [1, 2]: cond crece muy rápido con k
+        t = rng.uniform(1.0, 2.0, size=n)
+        return np.vander(t, k, increasing=True)
+    X = rng.normal(size=(n, k))
+    X[:, 0] = 1.0
+    return X
+
+
+def _timeit(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    rng = np.random.default_rng(42)
+    cases = {
+        False: [(1_000, 5), (1_000, 20), (100_000, 5), (100_000, 20), (100_000, 50)],
+        # Vandermonde: cond ~1e3 (k=4) .. ~1e9 (k=10) .. singular en doble precisión (k=14)
+        True: [(1_000, 4), (100_000, 4), (100_000, 6), (100_000, 8), (100_000, 10), (100_000, 14)],
+    }
+    header = f"{'n':>8} {'k':>3} {'design':>6} {'cond':>9} | " + " | ".join(f"{m:>22}" for m in ("inv", "cholesky", "qr", "svd", "auto"))
+    print(header)
+    print("-" * len(header))
+    for ill in (False, True):
+        for n, k in cases[ill]:
+            X = _design(n, k, ill, rng)
+            beta_true = rng.normal(size=k)
+            y = X @ beta_true
+            cells, cond, auto_method = [], None, ""
+            for method in ("inv", "cholesky", "qr", "svd", "auto"):
+                if method == "inv":
+                    try:
+                        secs, beta = _timeit(lambda: _legacy_inv(X, y))
+                    except np.linalg.LinAlgError:
+                        cells.append(f"{'singular':>22}")
+                        continue
+                else:
+                    secs, sol = _timeit(lambda: solve_ols(X, y, method))
+                    beta = sol.beta
+                    if method == "qr":
+                        cond = sol.cond
+                    if method == "auto":
+                        auto_method = sol.method
+                err = np.linalg.norm(beta - beta_true) / np.linalg.norm(beta_true)
+                cells.append(f"{secs * 1e3:8.2f}ms err={err:8.1e}")
+            print(f"{n:>8} {k:>3} {'ill' if ill else 'rand':>6} {cond:9.1e} | " + " | ".join(cells) + f"  (auto -> {auto_method})")
+
+
+if __name__ == "__main__":
+    main()
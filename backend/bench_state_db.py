@@ -0,0 +1,100 @@
+# backend/bench_state_db.py
+# Carga de autosaves concurrentes sobre el state store: N sesiones (hilos) guardan su
+# tabla cada pocos ms y leen el estado Excel, como el debounce de 500 ms del frontend
+# con muchos usuarios. Compara el esquema anterior (journal por defecto, SELECT y luego
+# UPDATE/INSERT) con WAL + synchronous=NORMAL, con el upsert ON CONFLICT y con el
+# buffer write-behind de autosave.py (el tiempo total incluye el flush final).
+#   python bench_state_db.py
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from autosave import AutosaveBuffer
+from state_db import Base, ExcelState, TableState, make_engine, upsert_by_sid
+
+ROWS_JSON = "[" + ",".join('{"x":"%d","y":"%d"}' % (i, 2 * i) for i in range(400)) + "]"
+
+
+def _legacy_save(db, sid):
+    row = db.query(TableState).filter(TableState.sid == sid).first()
+    now = datetime.utcnow()
+    if row:
+        row.rows_json = ROWS_JSON
+        row.updated_at = now
+    else:
+        db.add(TableState(sid=sid, rows_json=ROWS_JSON, fit_intercept=True, updated_at=now))
+    db.commit()
+
+
+def _upsert_save(db, sid):
+    upsert_by_sid(db, TableState, sid, {"rows_json": ROWS_JSON, "fit_intercept": True, "updated_at": datetime.utcnow()})
+
+
+def _run(wal, save, threads, writes):
+    path = Path(tempfile.mkdtemp()) / "bench.db"
+    engine = make_engine(path, wal=wal)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    buffer = None
+    if save is None:  # write-behind: el POST solo encola
+        buffer = AutosaveBuffer(Session, interval_s=0.05, max_pending=10_000)
+        buffer.start()
+        save = lambda db, sid: buffer.put(TableState, sid, {"rows_json": ROWS_JSON, "fit_intercept": True, "updated_at": datetime.utcnow()})
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+
+    def session(i):
+        sid = f"s{i:04d}"
+        local = []
+        with Session() as db:
+            for w in range(writes):
+                t0 = time.perf_counter()
+                try:
+                    save(db, sid)
+                except OperationalError:  # "database is locked"
+                    db.rollback()
+                    with lock:
+                        errors[0] += 1
+                local.append(time.perf_counter() - t0)
+                if w % 4 == 0:
+                    db.query(ExcelState).filter(ExcelState.sid == sid).first()
+                    db.commit()
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=session, args=(i,)) for i in range(threads)]
+    t0 = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    if buffer is not None:
+        buffer.stop()
+    wall = time.perf_counter() - t0
+    engine.dispose()
+    lat = np.asarray(latencies) * 1e3
+    return threads * writes / wall, float(np.percentile(lat, 50)), float(np.percentile(lat, 99)), errors[0]
+
+
+def main():
+    configs = [
+        ("journal + select/update", False, _legacy_save),
+        ("WAL + select/update", True, _legacy_save),
+        ("WAL + upsert", True, _upsert_save),
+        ("WAL + buffer", True, None),
+    ]
+    print(f"{'config':>24} {'hilos':>5} | {'escrituras/s':>12} {'p50 ms':>8} {'p99 ms':>8} {'errores':>7}")
+    for threads in (4, 16, 64):
+        for name, wal, save in configs:
+            rate, p50, p99, errs = _run(wal, save, threads, writes=50)
+            print(f"{name:>24} {threads:>5} | {rate:12.0f} {p50:8.2f} {p99:8.2f} {errs:7d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# backend/bench_uploads.py
+# Subidas grandes concurrentes: N hilos reciben cada uno un CSV de S MB desde un
+# SpooledTemporaryFile (lo que entrega Starlette en UploadFile) y lo dejan guardado y
+# parseado. Compara el camino anterior (await file.read() -> bytes -> hash -> escribir ->
+# BytesIO -> parsear) con la copia por bloques al blob store + parseo desde la ruta.
+# Mide tiempo total y pico de memoria (tracemalloc) con y sin la etapa de parseo.
+#   python bench_uploads.py
+import hashlib
+import io
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from blob_store import LocalBlobStore
+
+
+def _make_csv(mb: int) -> bytes:
+    rows = mb * 1024 * 1024 // 100
+    rng = np.random.default_rng(0)
+    buf = io.StringIO()
+    pd.DataFrame(rng.normal(size=(rows, 5)), columns=["y", "x1", "x2", "x3", "x4"]).to_csv(buf, index=False)
+    return buf.getvalue().encode()
+
+
+def _spooled(content: bytes, i: int):
+    # cada hilo sube un archivo distinto (sin dedup); Starlette usa max_size=1 MB
+    f = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    f.write(content)
+    f.write(f"{i},0,0,0,0\n".encode())
+    f.seek(0)
+    return f
+
+
+def _legacy(src, root: Path, i: int, parse: bool):
+    content = src.read()
+    digest = hashlib.sha256(content).hexdigest()
+    with open(root / f"{i}_{digest[:8]}.csv", "wb") as fh:
+        fh.write(content)
+    if parse:
+        pd.read_csv(io.BytesIO(content))
+
+
+def _streamed(src, store: LocalBlobStore, parse: bool):
+    ref = store.put_stream(src, "csv", max_bytes=None)
+    if parse:
+        pd.read_csv(ref.path)
+
+
+def _run(content: bytes, threads: int, mode: str, parse: bool):
+    root = Path(tempfile.mkdtemp())
+    store = LocalBlobStore(root / "blobs")
+    sources = [_spooled(content, i) for i in range(threads)]
+    barrier = threading.Barrier(threads)
+
+    def work(i):
+        barrier.wait()
+        if mode == "legacy":
+            _legacy(sources[i], root, i, parse)
+        else:
+            _streamed(sources[i], store, parse)
+
+    workers = [threading.Thread(target=work, args=(i,)) for i in range(threads)]
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    wall = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    for f in sources:
+        f.close()
+    return wall, peak / 1024 ** 2
+
+
+def main():
+    threads = 8
+    print(f"{'MB':>4} {'modo':>9} {'parseo':>6} | {'tiempo s':>8} {'pico MB':>8} {'pico/subida MB':>14}")
+    for mb in (8, 32):
+        content = _make_csv(mb)
+        for parse in (False, True):
+            for mode in ("legacy", "streamed"):
+                wall, peak = _run(content, threads, mode, parse)
+                print(f"{mb:>4} {mode:>9} {'sí' if parse else 'no':>6} | {wall:8.2f} {peak:8.1f} {peak / threads:14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# backend/binary_format.py
+# Formato binario columnar para /api/regression/json (petición y respuesta):
+#
+#   b"RGF1" | uint32 LE largo del header | header JSON UTF-8 | relleno a múltiplo de 8 | float64 LE...
+#
+# El header lleva "columns": [[nombre, largo], ...] en el orden de los buffers, más
+# campos libres (p. ej. "y", "fit_intercept"). Los buffers se leen con np.frombuffer,
+# sin copiar ni pasar por listas de Python.
+import json
+import struct
+from typing import Dict, Tuple
+
+import numpy as np
+
+MEDIA_TYPE = "application/x-regression-f64"
+MAGIC = b"RGF1"
+_F64 = np.dtype("<f8")
+
+
+def _pad8(n: int) -> int:
+    return (-n) % 8
+
+
+def decode(body: bytes) -> Tuple[dict, Dict[str, np.ndarray]]:
+    """(header, {columna: array float64 de solo lectura sobre `body`})."""
+    if len(body) < 8 or body[:4] != MAGIC:
+        raise ValueError("Cuerpo binario inválido (falta la firma RGF1)")
+    (hlen,) = struct.unpack_from("<I", body, 4)
+    start = 8 + hlen
+    if start > len(body):
+        raise ValueError("Header binario truncado")
+    try:
+        header = json.loads(body[8:start].decode("utf-8"))
+    except (UnicodeDecodeError, ValueError):
+        raise ValueError("Header binario no es JSON válido")
+    cols = header.get("columns")
+    if not isinstance(cols, list) or not cols:
+        raise ValueError("El header debe incluir 'columns': [[nombre, largo], ...]")
+
+    offset = start + _pad8(start)
+    out: Dict[str, np.ndarray] = {}
+    for item in cols:
+        if not (isinstance(item, list) and len(item) == 2 and isinstance(item[0], str) and isinstance(item[1], int)):
+            raise ValueError("Cada columna debe ser [nombre, largo]")
+        name, length = item
+        if length < 0 or offset + 8 * length > len(body):
+            raise ValueError(f"Buffer de '{name}' fuera del cuerpo")
+        if name in out:
+            raise ValueError(f"Columna duplicada '{name}'")
+        out[name] = np.frombuffer(body, dtype=_F64, count=length, offset=offset)
+        offset += 8 * length
+    if offset != len(body):
+        raise ValueError("Sobran bytes al final del cuerpo binario")
+    return header, out
+
+
+def encode(header: dict, arrays: Dict[str, np.ndarray]) -> bytes:
+    header = dict(header)
+    header["columns"] = [[name, int(np.size(arr))] for name, arr in arrays.items()]
+    hbytes = json.dumps(header, ensure_ascii=False, allow_nan=False).encode("utf-8")
+    start = 8 + len(hbytes)
+    parts = [MAGIC, struct.pack("<I", len(hbytes)), hbytes, b"\0" * _pad8(start)]
+    parts.extend(np.ascontiguousarray(arr, dtype=_F64).tobytes() for arr in arrays.values())
+    return b"".join(parts)
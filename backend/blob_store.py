@@ -0,0 +1,406 @@
+# backend/blob_store.py
+# Almacén de archivos subidos direccionado por contenido: cada archivo se guarda una sola
+# vez como <sha256>.<ext> (el hash se calcula mientras se escribe, por bloques), y las filas
+# de ExcelFile / ExcelState que lo usan son sus referencias. Subir el mismo Excel desde
+# muchas sesiones reutiliza el blob y su sidecar columnar (sin volver a parsearlo).
+# Backends: disco local (por defecto) o S3-compatible (boto3; MinIO sirve como stand-in
+# local) con copia local como cache, porque openpyxl y los .npy por mmap necesitan una ruta.
+# El GC en segundo plano borra sesiones vencidas y los blobs que quedaron sin referencias; el
+# período de gracia sale del mtime del blob (LastModified en S3), que cada reuso renueva, así lo
+# respetan los demás workers y el GC después de un reinicio.
+import hashlib
+import io
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, NamedTuple, Optional, Set, Union
+
+from columnar import remove_sidecar, restamp_sidecar
+from excel_cache import remember_path_digest
+from state_db import ExcelFile, ExcelResultState, ExcelState, Job, SessionLocal, TableState
+
+logger = logging.getLogger("regresiones")
+
+BLOB_STORE = os.getenv("BLOB_STORE", "local")  # "local" | "s3"
+BLOB_CHUNK_BYTES = 1024 * 1024
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(200 * 1024 * 1024)))
+BLOB_GC_INTERVAL_S = float(os.getenv("BLOB_GC_INTERVAL_S", "3600"))  # 0 = sin GC en segundo plano
+BLOB_GC_GRACE_S = float(os.getenv("BLOB_GC_GRACE_S", "3600"))  # blobs recién escritos no se borran
+SESSION_TTL_DAYS = float(os.getenv("SESSION_TTL_DAYS", "30"))  # igual que el max_age de la cookie sid
+
+_KEY_RE = re.compile(r"^[0-9a-f]{64}\.(xlsx|csv)$")
+
+
+class UploadTooLarge(ValueError):
+    """El archivo superó el máximo permitido mientras se copiaba."""
+
+
+def too_large_message(max_bytes: int) -> str:
+    return f"El archivo supera el máximo de {round(max_bytes / (1024 * 1024), 1):g} MB"
+
+
+class BlobRef(NamedTuple):
+    key: str           # "<sha256>.<ext>"
+    path: str          # ruta local legible
+    size: int
+    deduplicated: bool  # ya existía: no se escribió nada nuevo
+
+    @property
+    def digest(self) -> str:
+        return self.key.split(".", 1)[0]
+
+
+def blob_key(digest: str, kind: str) -> str:
+    return f"{digest}.{kind}"
+
+
+class LocalBlobStore:
+    """Blobs en root/<2 primeros hex>/<key>; las escrituras pasan por root/tmp + os.replace."""
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+        self._tmp = self.root / "tmp"
+        self._tmp.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.puts = 0
+        self.dedup_hits = 0
+        self.bytes_written = 0
+
+    # ---- claves y rutas
+    def path_for(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def key_of(self, path: Optional[str]) -> Optional[str]:
+        """Clave si `path` es un blob de este almacén, si no None (archivos del esquema anterior)."""
+        if not path:
+            return None
+        p = Path(path)
+        if _KEY_RE.match(p.name) and p.parent.parent == self.root:
+            return p.name
+        return None
+
+    # ---- escritura
+    def _spool(self, src: BinaryIO, max_bytes: Optional[int] = None):
+        """Copia src a un temporal por bloques calculando el sha256. Devuelve (tmp, digest, size)."""
+        h = hashlib.sha256()
+        size = 0
+        fd, tmp = tempfile.mkstemp(dir=self._tmp)
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                while True:
+                    chunk = src.read(BLOB_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise UploadTooLarge(too_large_message(max_bytes))
+                    h.update(chunk)
+                    fh.write(chunk)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return Path(tmp), h.hexdigest(), size
+
+    def _touch(self, target: Path) -> None:
+        """Renueva el mtime (período de gracia del GC) sin invalidar el sidecar del blob."""
+        try:
+            prev = target.stat().st_mtime_ns
+            os.utime(target)
+        except OSError:
+            return
+        restamp_sidecar(target, prev)
+
+    def _commit(self, tmp: Path, key: str, size: int) -> BlobRef:
+        target = self.path_for(key)
+        if target.exists():
+            tmp.unlink(missing_ok=True)
+            self._touch(target)
+            ref = BlobRef(key, str(target), size, True)
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp, target)  # atómico: nadie ve un blob a medio escribir
+            ref = BlobRef(key, str(target), size, False)
+        remember_path_digest(target, ref.digest)  # el hash ya se calculó al copiar
+        with self._lock:
+            self.puts += 1
+            if ref.deduplicated:
+                self.dedup_hits += 1
+            else:
+                self.bytes_written += size
+        return ref
+
+    def put_stream(self, src: BinaryIO, kind: str, max_bytes: Optional[int] = UPLOAD_MAX_BYTES) -> BlobRef:
+        tmp, digest, size = self._spool(src, max_bytes)
+        return self._commit(tmp, blob_key(digest, kind), size)
+
+    def put_bytes(self, content: bytes, kind: str) -> BlobRef:
+        return self.put_stream(io.BytesIO(content), kind)
+
+    # ---- lectura / borrado
+    def materialize(self, path: Optional[str]) -> bool:
+        """True si `path` está disponible en disco local (en S3 lo descarga si hace falta)."""
+        return bool(path) and os.path.exists(path)
+
+    def recently_used(self, key: str) -> bool:
+        """Escrito o reusado hace menos de BLOB_GC_GRACE_S (su fila puede no estar commiteada aún)."""
+        try:
+            mtime = self.path_for(key).stat().st_mtime
+        except OSError:
+            return False
+        return time.time() - mtime < BLOB_GC_GRACE_S
+
+    def delete(self, key: str) -> None:
+        path = self.path_for(key)
+        path.unlink(missing_ok=True)
+        remove_sidecar(path)
+
+    def keys(self) -> Iterator[str]:
+        for sub in self.root.iterdir():
+            if sub.is_dir() and len(sub.name) == 2:
+                for p in sub.iterdir():
+                    if _KEY_RE.match(p.name):
+                        yield p.name
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "local",
+                "root": str(self.root),
+                "puts": self.puts,
+                "dedup_hits": self.dedup_hits,
+                "bytes_written": self.bytes_written,
+            }
+
+
+class S3BlobStore(LocalBlobStore):
+    """Blobs en un bucket S3-compatible; `root` es la copia local (cache) con los sidecars.
+
+    `client` es un cliente boto3 ("s3") o cualquier objeto con upload_file, download_file,
+    head_object, copy_object, delete_object y list_objects_v2.
+    """
+
+    def __init__(self, client, bucket: str, prefix: str, cache_root: Union[str, Path]):
+        super().__init__(cache_root)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.downloads = 0
+
+    def _head(self, key: str) -> Optional[dict]:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+        except Exception:
+            return None
+
+    def _object_exists(self, key: str) -> bool:
+        return self._head(key) is not None
+
+    def _renew(self, key: str) -> None:
+        # copia sobre sí mismo: renueva LastModified, que es lo que mira el GC
+        src = {"Bucket": self.bucket, "Key": self.prefix + key}
+        try:
+            self.client.copy_object(Bucket=self.bucket, Key=self.prefix + key, CopySource=src,
+                                    MetadataDirective="REPLACE")
+        except Exception as e:
+            logger.warning("No se pudo renovar el blob %s: %s", key, e)
+
+    def _commit(self, tmp: Path, key: str, size: int) -> BlobRef:
+        if not self._object_exists(key):
+            try:
+                self.client.upload_file(str(tmp), self.bucket, self.prefix + key)
+            except BaseException:
+                tmp.unlink(missing_ok=True)
+                raise
+            ref = super()._commit(tmp, key, size)
+            return ref._replace(deduplicated=False)
+        self._renew(key)
+        return super()._commit(tmp, key, size)._replace(deduplicated=True)
+
+    def recently_used(self, key: str) -> bool:
+        head = self._head(key)
+        if head is None:
+            return False
+        modified = head["LastModified"]
+        if modified.tzinfo is None:
+            modified = modified.replace(tzinfo=timezone.utc)
+        return (datetime.now(timezone.utc) - modified).total_seconds() < BLOB_GC_GRACE_S
+
+    def materialize(self, path: Optional[str]) -> bool:
+        if super().materialize(path):
+            return True
+        key = self.key_of(path)
+        if key is None:
+            return False
+        fd, tmp = tempfile.mkstemp(dir=self._tmp)
+        os.close(fd)
+        try:
+            self.client.download_file(self.bucket, self.prefix + key, tmp)
+        except Exception as e:
+            logger.warning("No se pudo descargar el blob %s: %s", key, e)
+            os.unlink(tmp)
+            return False
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp, path)
+        with self._lock:
+            self.downloads += 1
+        return True
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+        super().delete(key)
+
+    def keys(self) -> Iterator[str]:
+        token = None
+        while True:
+            kwargs = {"Bucket": self.bucket, "Prefix": self.prefix}
+            if token:
+                kwargs["ContinuationToken"] = token
+            page = self.client.list_objects_v2(**kwargs)
+            for obj in page.get("Contents", []):
+                name = obj["Key"][len(self.prefix):]
+                if _KEY_RE.match(name):
+                    yield name
+            if not page.get("IsTruncated"):
+                return
+            token = page.get("NextContinuationToken")
+
+    def stats(self) -> dict:
+        out = super().stats()
+        out.update({"backend": "s3", "bucket": self.bucket, "prefix": self.prefix, "downloads": self.downloads})
+        return out
+
+
+def make_blob_store(upload_root: Union[str, Path]) -> LocalBlobStore:
+    root = Path(upload_root) / "blobs"
+    if BLOB_STORE == "local":
+        return LocalBlobStore(root)
+    if BLOB_STORE == "s3":
+        import boto3  # opcional: solo con BLOB_STORE=s3
+        client = boto3.client("s3", endpoint_url=os.getenv("S3_ENDPOINT_URL") or None)
+        return S3BlobStore(client, os.environ["S3_BUCKET"], os.getenv("S3_PREFIX", "blobs/"), root)
+    raise ValueError(f"BLOB_STORE desconocido: '{BLOB_STORE}'")
+
+
+# -------------------- Referencias y GC --------------------
+def referenced_keys(db, store: LocalBlobStore) -> Set[str]:
+    """Blobs con al menos una referencia (filas de la biblioteca, archivo de la sección Excel o
+    conversión encolada en jobs.py)."""
+    refs = {k for (k,) in db.query(ExcelFile.blob_key).filter(ExcelFile.blob_key.isnot(None)).distinct()}
+    refs.update(k for (k,) in db.query(Job.blob_key).filter(Job.blob_key.isnot(None),
+                                                          Job.status.in_(("queued", "running"))))
+    for (path,) in db.query(ExcelState.file_path).filter(ExcelState.file_path.isnot(None)):
+        key = store.key_of(path)
+        if key:
+            refs.add(key)
+    return refs
+
+
+def release_blob(db, store: LocalBlobStore, key: Optional[str]) -> bool:
+    """Borra el blob si ya nadie lo referencia (y no se acaba de subir). True si se borró."""
+    if not key or store.recently_used(key):
+        return False
+    if db.query(ExcelFile.id).filter(ExcelFile.blob_key == key).first() is not None:
+        return False
+    if key in referenced_keys(db, store):
+        return False
+    store.delete(key)
+    return True
+
+
+def _remove_legacy_file(store: LocalBlobStore, path: Optional[str], sidecar: Optional[str] = None) -> None:
+    # archivos del esquema anterior (uploads/<sid>/... y uploads/<sid>.xlsx): no son blobs compartidos
+    if path and store.key_of(path) is None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        remove_sidecar(path, sidecar)
+
+
+def expire_sessions(db, store: LocalBlobStore, now: Optional[datetime] = None) -> int:
+    """Borra todas las filas de las sesiones sin actividad en SESSION_TTL_DAYS. Devuelve cuántas sesiones."""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=SESSION_TTL_DAYS)
+    last: Dict[str, datetime] = {}
+    for model, col in ((TableState, TableState.updated_at), (ExcelState, ExcelState.updated_at),
+                       (ExcelResultState, ExcelResultState.updated_at), (ExcelFile, ExcelFile.uploaded_at)):
+        for sid, ts in db.query(model.sid, col):
+            last[sid] = max(last.get(sid, datetime.min), ts or datetime.min)
+    expired = [sid for sid, ts in last.items() if ts < cutoff]
+    if not expired:
+        return 0
+    for start in range(0, len(expired), 500):
+        chunk = expired[start:start + 500]
+        for row in db.query(ExcelFile).filter(ExcelFile.sid.in_(chunk)):
+            _remove_legacy_file(store, row.file_path, row.sidecar_path)
+        for row in db.query(ExcelState).filter(ExcelState.sid.in_(chunk)):
+            _remove_legacy_file(store, row.file_path)
+        for model in (TableState, ExcelState, ExcelResultState, ExcelFile):
+            db.query(model).filter(model.sid.in_(chunk)).delete(synchronize_session=False)
+    db.commit()
+    return len(expired)
+
+
+def collect_garbage(db, store: LocalBlobStore) -> dict:
+    sessions = expire_sessions(db, store)
+    refs = referenced_keys(db, store)
+    removed = 0
+    for key in list(store.keys()):
+        if key not in refs and not store.recently_used(key):
+            store.delete(key)
+            removed += 1
+    return {"expired_sessions": sessions, "blobs_removed": removed, "blobs_kept": len(refs)}
+
+
+class BlobGC:
+    def __init__(self, store: LocalBlobStore, session_factory, interval_s: float):
+        self.store = store
+        self.session_factory = session_factory
+        self.interval_s = interval_s
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()  # una pasada a la vez
+        self.runs = 0
+        self.last: Optional[dict] = None
+
+    def run_once(self) -> dict:
+        with self._lock:
+            t0 = time.perf_counter()
+            with self.session_factory() as db:
+                out = collect_garbage(db, self.store)
+            out["elapsed_ms"] = round((time.perf_counter() - t0) * 1000.0, 3)
+            self.runs += 1
+            self.last = out
+        if out["expired_sessions"] or out["blobs_removed"]:
+            logger.info("GC de archivos: %s", out)
+        return out
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.warning("GC de archivos falló: %s", e)
+
+    def start(self) -> None:
+        if self.interval_s > 0 and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="blob-gc", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {"interval_s": self.interval_s, "runs": self.runs, "last": self.last}
+
+
+blob_store = make_blob_store(Path(__file__).parent / "uploads")
+blob_gc = BlobGC(blob_store, SessionLocal, BLOB_GC_INTERVAL_S)
@@ -0,0 +1,205 @@
+# backend/columnar.py
+# Sidecar columnar de los Excel subidos: un .npy por columna numérica + schema.json.
+# Se genera una sola vez al subir; los endpoints de cálculo cargan vía mmap solo
+# las columnas pedidas en vez de re-parsear el .xlsx completo.
+import json
+import logging
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("regresiones")
+
+SCHEMA_NAME = "schema.json"
+SCHEMA_VERSION = 1
+
+
+def sidecar_dir_for(path: Union[str, Path]) -> Path:
+    return Path(str(path) + ".cols")
+
+
+def _tmp_dir(path: Union[str, Path]) -> Path:
+    # tmp propio: dos subidas del mismo blob pueden generar su sidecar a la vez
+    target = sidecar_dir_for(path)
+    tmp = target.with_name(f"{target.name}.{uuid.uuid4().hex[:8]}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    return tmp
+
+
+def _publish(path: Union[str, Path], tmp: Path, n_rows: int, columns: List[dict]) -> str:
+    """Escribe el schema en `tmp` y lo mueve a su lugar definitivo."""
+    target = sidecar_dir_for(path)
+    st = os.stat(path)
+    schema = {
+        "version": SCHEMA_VERSION,
+        "n_rows": int(n_rows),
+        "source_size": st.st_size,
+        "source_mtime_ns": st.st_mtime_ns,
+        "columns": columns,
+    }
+    with open(tmp / SCHEMA_NAME, "w", encoding="utf-8") as fh:
+        json.dump(schema, fh, ensure_ascii=False)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+    return str(target)
+
+
+def write_sidecar(path: Union[str, Path], df: pd.DataFrame) -> Optional[str]:
+    """Escribe el sidecar de `path` a partir de su DataFrame ya parseado.
+
+    Solo se guardan columnas completamente numéricas; el resto queda listado en
+    el schema para poder validar existencia sin abrir el Excel.
+    """
+    tmp = None
+    try:
+        tmp = _tmp_dir(path)
+        columns = []
+        for i, name in enumerate(df.columns):
+            coerced = pd.to_numeric(df[name], errors="coerce")
+            if coerced.isna().any():
+                columns.append({"name": str(name), "numeric": False})
+                continue
+            arr = np.ascontiguousarray(coerced.to_numpy())
+            fname = f"c{i}.npy"
+            np.save(tmp / fname, arr, allow_pickle=False)
+            columns.append({"name": str(name), "numeric": True, "file": fname, "dtype": str(arr.dtype)})
+        return _publish(path, tmp, len(df), columns)
+    except Exception as e:
+        logger.warning("No se pudo generar el sidecar de %s: %s", path, e)
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+        return None
+
+
+class SidecarWriter:
+    """Sidecar escrito por bloques (modo streaming), sin el DataFrame completo.
+
+    Cada columna se acumula como float64 crudo en c<i>.raw y al cerrar se convierte a
+    .npy; int64 si todos sus bloques fueron enteros (lo que haría pandas al parsear).
+    Una columna con alguna celda no numérica se descarta en cuanto aparece.
+    """
+
+    def __init__(self, path: Union[str, Path], names: List[str]):
+        self.path = path
+        self.names = [str(n) for n in names]
+        self.n_rows = 0
+        self._tmp = _tmp_dir(path)
+        self._files = [open(self._tmp / f"c{i}.raw", "wb") for i in range(len(self.names))]
+        self._integral = [True] * len(self.names)
+
+    def append(self, values: List[np.ndarray], masks: List[np.ndarray], integral: List[bool]) -> None:
+        """Un bloque: por columna, valores float, máscara de celdas no numéricas y si son enteros."""
+        for i, (arr, mask, whole) in enumerate(zip(values, masks, integral)):
+            fh = self._files[i]
+            if fh is None:
+                continue
+            if mask.any():
+                fh.close()
+                os.unlink(fh.name)
+                self._files[i] = None
+                continue
+            self._integral[i] = self._integral[i] and whole
+            fh.write(np.ascontiguousarray(arr, dtype=float).tobytes())
+        self.n_rows += len(values[0]) if values else 0
+
+    def close(self) -> Optional[str]:
+        """Publica el sidecar; devuelve su directorio o None si falló."""
+        try:
+            columns = []
+            for i, (name, fh) in enumerate(zip(self.names, self._files)):
+                if fh is None:
+                    columns.append({"name": name, "numeric": False})
+                    continue
+                fh.close()
+                dtype = np.dtype(np.int64 if self._integral[i] else np.float64)
+                fname = f"c{i}.npy"
+                with open(fh.name, "rb") as src, open(self._tmp / fname, "wb") as dst:
+                    np.lib.format.write_array_header_1_0(dst, {"descr": np.lib.format.dtype_to_descr(dtype),
+                                                               "fortran_order": False, "shape": (self.n_rows,)})
+                    for chunk in iter(lambda: src.read(1 << 20), b""):
+                        dst.write(np.frombuffer(chunk, dtype=float).astype(dtype).tobytes())
+                os.unlink(fh.name)
+                columns.append({"name": name, "numeric": True, "file": fname, "dtype": str(dtype)})
+            return _publish(self.path, self._tmp, self.n_rows, columns)
+        except Exception as e:
+            logger.warning("No se pudo generar el sidecar de %s: %s", self.path, e)
+            self.abort()
+            return None
+
+    def abort(self) -> None:
+        for fh in self._files:
+            if fh is not None:
+                fh.close()
+        shutil.rmtree(self._tmp, ignore_errors=True)
+
+
+def read_schema(path: Union[str, Path], sidecar_dir: Optional[str] = None) -> Optional[dict]:
+    """Schema del sidecar, o None si falta o ya no corresponde al archivo fuente."""
+    sdir = Path(sidecar_dir) if sidecar_dir else sidecar_dir_for(path)
+    try:
+        with open(sdir / SCHEMA_NAME, encoding="utf-8") as fh:
+            schema = json.load(fh)
+        st = os.stat(path)
+    except (OSError, ValueError):
+        return None
+    if schema.get("version") != SCHEMA_VERSION:
+        return None
+    if schema.get("source_size") != st.st_size or schema.get("source_mtime_ns") != st.st_mtime_ns:
+        return None  # el .xlsx cambió después de generar el sidecar
+    schema["dir"] = str(sdir)
+    return schema
+
+
+def load_sidecar_frame(path: Union[str, Path], columns: List[str], sidecar_dir: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """DataFrame con solo `columns` (memmap), o None si hay que caer al .xlsx.
+
+    Devuelve None si falta el sidecar, está desactualizado, o alguna columna pedida
+    no existe / no es numérica (el camino Excel genera el mensaje de error exacto).
+    """
+    schema = read_schema(path, sidecar_dir)
+    if schema is None:
+        return None
+    by_name = {c["name"]: c for c in schema["columns"]}
+    data = {}
+    for name in dict.fromkeys(columns):
+        meta = by_name.get(name)
+        if meta is None or not meta.get("numeric"):
+            return None
+        try:
+            data[name] = np.load(Path(schema["dir"]) / meta["file"], mmap_mode="r", allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+    return pd.DataFrame(data, copy=False)
+
+
+def restamp_sidecar(path: Union[str, Path], prev_mtime_ns: int) -> None:
+    """Tras tocar el mtime de `path` sin cambiar su contenido (blobs direccionados por contenido),
+    mantiene vigente el sidecar que lo estaba con el mtime anterior."""
+    sdir = sidecar_dir_for(path)
+    try:
+        with open(sdir / SCHEMA_NAME, encoding="utf-8") as fh:
+            schema = json.load(fh)
+        st = os.stat(path)
+    except (OSError, ValueError):
+        return
+    if schema.get("source_mtime_ns") != prev_mtime_ns or schema.get("source_size") != st.st_size:
+        return
+    schema["source_mtime_ns"] = st.st_mtime_ns
+    tmp = sdir / f"{SCHEMA_NAME}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(schema, fh, ensure_ascii=False)
+        os.replace(tmp, sdir / SCHEMA_NAME)
+    except OSError as e:
+        logger.warning("No se pudo actualizar el sidecar de %s: %s", path, e)
+        tmp.unlink(missing_ok=True)
+
+
+def remove_sidecar(path: Union[str, Path], sidecar_dir: Optional[str] = None) -> None:
+    shutil.rmtree(Path(sidecar_dir) if sidecar_dir else sidecar_dir_for(path), ignore_errors=True)
@@ -0,0 +1,121 @@
+# backend/distributions.py
+# Distribuciones muestrales (t, chi², F, exponencial, normal) evaluadas de forma
+# vectorizada con scipy.stats: una llamada evalúa pdf/cdf/sf/ppf sobre toda una
+# grilla de puntos x todos los valores de parámetros. Los cuantiles (valores
+# críticos) se memoizan; las regresiones usan las mismas funciones para p-valores
+# e intervalos de confianza.
+from functools import lru_cache
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from scipy import stats
+
+FUNCTIONS = ("pdf", "cdf", "sf", "ppf")
+DIST_MAX_CELLS = 500_000  # puntos x combinaciones de parámetros por llamada
+COMMON_PROBS = (0.9, 0.95, 0.975, 0.99, 0.995, 0.999)
+COMMON_DF = tuple(range(1, 31)) + (40, 60, 120)
+
+# nombre -> (parámetros en orden, fábrica de la distribución scipy congelada)
+DISTRIBUTIONS = {
+    "t": (("df",), lambda df: stats.t(df)),
+    "chi2": (("df",), lambda df: stats.chi2(df)),
+    "f": (("dfn", "dfd"), lambda dfn, dfd: stats.f(dfn, dfd)),
+    "exponential": (("rate",), lambda rate: stats.expon(scale=1.0 / rate)),
+    "normal": (("mu", "sigma"), lambda mu, sigma: stats.norm(mu, sigma)),
+}
+_DEFAULTS = {"mu": 0.0, "sigma": 1.0}
+_POSITIVE = {"df", "dfn", "dfd", "rate", "sigma"}
+
+
+def describe() -> Dict[str, dict]:
+    return {name: {"params": list(params), "defaults": {p: _DEFAULTS[p] for p in params if p in _DEFAULTS}}
+            for name, (params, _) in DISTRIBUTIONS.items()}
+
+
+def param_arrays(dist: str, params: Dict[str, object]) -> List[np.ndarray]:
+    """Un array 1-D por parámetro (en el orden de DISTRIBUTIONS), todos del mismo largo m."""
+    if dist not in DISTRIBUTIONS:
+        raise ValueError(f"Distribución desconocida '{dist}'. Opciones: {', '.join(DISTRIBUTIONS)}")
+    names, _ = DISTRIBUTIONS[dist]
+    extra = set(params) - set(names)
+    if extra:
+        raise ValueError(f"Parámetros no válidos para '{dist}': {', '.join(sorted(extra))}")
+    arrays = []
+    for p in names:
+        if p not in params and p not in _DEFAULTS:
+            raise ValueError(f"Falta el parámetro '{p}' para '{dist}'")
+        arr = np.atleast_1d(np.asarray(params.get(p, _DEFAULTS.get(p)), dtype=float))
+        if arr.ndim != 1 or arr.size == 0:
+            raise ValueError(f"El parámetro '{p}' debe ser un número o una lista no vacía")
+        if not np.isfinite(arr).all() or (p in _POSITIVE and (arr <= 0).any()):
+            raise ValueError(f"El parámetro '{p}' debe ser finito" + (" y positivo" if p in _POSITIVE else ""))
+        arrays.append(arr)
+    sizes = {a.size for a in arrays} - {1}
+    if len(sizes) > 1:
+        raise ValueError("Los parámetros con varios valores deben tener el mismo largo")
+    m = sizes.pop() if sizes else 1
+    return [np.broadcast_to(a, (m,)) for a in arrays]
+
+
+def evaluate(dist: str, fn: str, x: Sequence[float], params: Dict[str, object]) -> np.ndarray:
+    """Matriz (m, len(x)): fila i = fn evaluada en todos los x con la i-ésima combinación de parámetros."""
+    if fn not in FUNCTIONS:
+        raise ValueError(f"Función desconocida '{fn}'. Opciones: {', '.join(FUNCTIONS)}")
+    x = np.asarray(x, dtype=float).ravel()
+    cols = param_arrays(dist, params)
+    m = cols[0].size
+    if m * x.size > DIST_MAX_CELLS:
+        raise ValueError(f"Demasiados puntos: {m} x {x.size} supera el máximo de {DIST_MAX_CELLS}")
+    if fn == "ppf" and ((x < 0) | (x > 1)).any():
+        raise ValueError("ppf requiere probabilidades en [0, 1]")
+    frozen = DISTRIBUTIONS[dist][1](*(c[:, None] for c in cols))
+    return np.asarray(getattr(frozen, fn)(x[None, :]), dtype=float).reshape(m, x.size)
+
+
+def grid(start: float, stop: float, num: int) -> np.ndarray:
+    if not (np.isfinite(start) and np.isfinite(stop)) or stop <= start:
+        raise ValueError("La grilla requiere start < stop finitos")
+    if not 2 <= num <= DIST_MAX_CELLS:
+        raise ValueError(f"num debe estar entre 2 y {DIST_MAX_CELLS}")
+    return np.linspace(start, stop, num)
+
+
+@lru_cache(maxsize=4096)
+def ppf_cached(dist: str, p: float, params: Tuple[float, ...]) -> float:
+    """Cuantil escalar memoizado (valores críticos que se repiten entre peticiones)."""
+    names = DISTRIBUTIONS[dist][0] if dist in DISTRIBUTIONS else ()
+    return float(evaluate(dist, "ppf", [p], dict(zip(names, params)))[0, 0])
+
+
+@lru_cache(maxsize=256)
+def quantile_table(dist: str, probs: Tuple[float, ...], params: Tuple[Tuple[float, ...], ...]) -> np.ndarray:
+    """Tabla (len(params), len(probs)) de cuantiles, memoizada por argumentos.
+
+    `params` es una tupla de combinaciones, p. ej. ((1,), (2,), ...) para t con df = 1, 2, ...
+    """
+    names = DISTRIBUTIONS[dist][0] if dist in DISTRIBUTIONS else ()
+    by_name = {n: [combo[i] for combo in params] for i, n in enumerate(names)}
+    if any(len(combo) != len(names) for combo in params):
+        raise ValueError(f"Cada combinación debe tener {len(names)} valor(es): {', '.join(names)}")
+    table = evaluate(dist, "ppf", probs, by_name)
+    table.flags.writeable = False  # se comparte entre peticiones
+    return table
+
+
+def t_critical(conf: float, df: float) -> float:
+    """Valor crítico bilateral t_{(1+conf)/2, df}."""
+    return ppf_cached("t", round((1.0 + conf) / 2.0, 12), (float(df),))
+
+
+def t_pvalues(t_stats, df: float) -> np.ndarray:
+    """p-valores bilaterales P(|T| > |t|) con df grados de libertad."""
+    t_stats = np.abs(np.asarray(t_stats, dtype=float))
+    return 2.0 * evaluate("t", "sf", t_stats, {"df": df})[0]
+
+
+def f_pvalue(f_stat: float, dfn: float, dfd: float) -> float:
+    return float(evaluate("f", "sf", [f_stat], {"dfn": dfn, "dfd": dfd})[0, 0])
+
+
+def chi2_pvalue(stat: float, df: float) -> float:
+    return float(evaluate("chi2", "sf", [stat], {"df": df})[0, 0])
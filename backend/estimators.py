@@ -0,0 +1,439 @@
+# backend/estimators.py
+# Estimadores alternativos a OLS sobre la misma matriz de diseño (?method=...):
+#   wls          mínimos cuadrados ponderados (columna/lista de pesos positivos)
+#   hc0..hc3     OLS con errores estándar robustos a heterocedasticidad (White / MacKinnon-White)
+#   ridge        penalización L2 sobre columnas estandarizadas; todos los lambda con una sola SVD
+#   huber        regresión robusta M (IRLS), arranque en caliente desde OLS o un ajuste previo
+# Los de mínimos cuadrados (ols, wls, hc*) admiten además ?resample=pairs|residual|permutation.
+# La matriz de diseño y sus factorizaciones (SVD, solución OLS) quedan en DesignCache:
+# cambiar de método sobre los mismos datos no vuelve a leer el archivo ni a factorizar.
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from batch import BATCH_WORKERS, get_pool
+from resampling import parse_resample, resample
+from solvers import COND_CAP, DEFAULT_CONF_LEVELS, SVD_RCOND, Solution, finite, ols_summary, residual_fields, solve_ols
+
+ESTIMATORS = ("ols", "wls", "hc0", "hc1", "hc2", "hc3", "ridge", "huber")
+HC_TYPES = ("hc0", "hc1", "hc2", "hc3")
+LS_METHODS = ("ols", "wls") + HC_TYPES  # mismo beta de mínimos cuadrados: admiten remuestreo
+HUBER_K_DEFAULT = 1.345   # 95 % de eficiencia con errores normales
+HUBER_MAX_ITER = 50
+HUBER_TOL = 1e-8
+RIDGE_DEFAULT_LAMBDAS = tuple(float(v) for v in np.logspace(-3, 3, 25))
+RIDGE_LAMBDAS_MAX = 200
+DESIGN_CACHE_MAX_BYTES = int(os.getenv("DESIGN_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+class EstimatorSpec(NamedTuple):
+    method: str = "ols"
+    weights: Optional[str] = None        # columna de pesos (endpoints de archivo)
+    lambdas: Tuple[float, ...] = ()
+    huber_k: float = HUBER_K_DEFAULT
+    resample: Optional[str] = None       # pairs | residual | permutation (ver resampling.py)
+    n_boot: int = 0
+    seed: Optional[int] = None           # None: la sortea resample(); pedidos sin semilla comparten clave
+
+    @property
+    def uses_design(self) -> bool:
+        """Va por la matriz de diseño cacheada (no por momentos/streaming)."""
+        return self.method != "ols" or self.resample is not None
+
+    def cache_key(self) -> Optional[dict]:
+        """Parte de la especificación que cambia el resultado (None para OLS simple)."""
+        if not self.uses_design:
+            return None
+        key = {"method": self.method}
+        if self.method == "wls":
+            key["weights"] = self.weights
+        elif self.method == "ridge":
+            key["lambdas"] = list(self.lambdas)
+        elif self.method == "huber":
+            key["k"] = self.huber_k
+        if self.resample:
+            key["resample"] = {"method": self.resample, "B": self.n_boot, "seed": self.seed}
+        return key
+
+
+def parse_spec(method: Optional[str], weights: Optional[str] = None, lambdas: Optional[str] = None,
+               huber_k: Optional[str] = None, resample: Optional[str] = None, n_boot: Optional[str] = None,
+               seed: Optional[str] = None) -> EstimatorSpec:
+    method = (method or "ols").strip().lower()
+    if method not in ESTIMATORS:
+        raise ValueError(f"Método desconocido '{method}'. Opciones: {', '.join(ESTIMATORS)}")
+    weights = (weights or "").strip() or None
+    if weights and method != "wls":
+        raise ValueError("'weights' solo aplica con method=wls")
+    if lambdas and method != "ridge":
+        raise ValueError("'lambda' solo aplica con method=ridge")
+    if huber_k and method != "huber":
+        raise ValueError("'huber_k' solo aplica con method=huber")
+    lams = RIDGE_DEFAULT_LAMBDAS if method == "ridge" else ()
+    if lambdas:
+        try:
+            lams = tuple(dict.fromkeys(float(v) for v in lambdas.split(",") if v.strip()))
+        except ValueError:
+            raise ValueError("'lambda' debe ser una lista de números separados por comas")
+        if not lams or len(lams) > RIDGE_LAMBDAS_MAX or not all(np.isfinite(v) and v >= 0 for v in lams):
+            raise ValueError(f"'lambda' admite entre 1 y {RIDGE_LAMBDAS_MAX} valores finitos >= 0")
+    k = HUBER_K_DEFAULT
+    if huber_k:
+        try:
+            k = float(huber_k)
+        except ValueError:
+            raise ValueError("'huber_k' debe ser un número")
+        if not (np.isfinite(k) and k > 0):
+            raise ValueError("'huber_k' debe ser positivo")
+    kind, B, s = parse_resample(resample, n_boot, seed)
+    if kind and method not in LS_METHODS:
+        raise ValueError(f"'resample' solo aplica con method={', '.join(LS_METHODS)}")
+    return EstimatorSpec(method, weights, lams, k, kind, B, s)
+
+
+class Design:
+    """y, X (con la columna de unos si hay intercepto) y factorizaciones perezosas, compartidas entre métodos.
+
+    Con `weights` las filas se escalan por sqrt(w) una sola vez (WLS). Los arrays no se mutan.
+    """
+
+    def __init__(self, y: np.ndarray, X: np.ndarray, names: List[str], fit_intercept: bool,
+                 weights: Optional[np.ndarray] = None):
+        self.y = np.asarray(y, dtype=float).reshape(-1)
+        self.X = X
+        self.names = list(names)
+        self.fit_intercept = fit_intercept
+        self.n, self.k = X.shape
+        self.weights = weights
+        if weights is not None:
+            sw = np.sqrt(weights)
+            self.Xw, self.yw = X * sw[:, None], self.y * sw
+        else:
+            self.Xw, self.yw = X, self.y
+        self._lock = threading.Lock()
+        self._ols: Optional[Solution] = None
+        self._svd = None
+        self._ridge_svd = None
+        self._huber: Dict[float, np.ndarray] = {}  # k -> beta (arranque en caliente)
+
+    @property
+    def nbytes(self) -> int:
+        # X, Xw y U de la SVD (n x k cada una) dominan
+        return 3 * self.X.nbytes + 2 * self.y.nbytes
+
+    def ols(self) -> Solution:
+        with self._lock:
+            if self._ols is None:
+                self._ols = solve_ols(self.Xw, self.yw)
+            return self._ols
+
+    def svd(self):
+        """SVD fina de Xw truncada al rango numérico: (U, s, Vt)."""
+        with self._lock:
+            if self._svd is None:
+                U, s, Vt = np.linalg.svd(self.Xw, full_matrices=False)
+                keep = s > (s[0] * SVD_RCOND if s.size else 0.0)
+                self._svd = (U[:, keep], s[keep], Vt[keep])
+            return self._svd
+
+    def xtx_inv(self) -> np.ndarray:
+        _, s, Vt = self.svd()
+        return (Vt.T / s ** 2) @ Vt
+
+    def ridge_svd(self):
+        """SVD de las pendientes centradas (si hay intercepto) y escaladas a varianza 1."""
+        with self._lock:
+            if self._ridge_svd is None:
+                off = 1 if self.fit_intercept else 0
+                Z = self.X[:, off:]
+                mean = Z.mean(axis=0) if off else np.zeros(Z.shape[1])
+                y_mean = float(self.y.mean()) if off else 0.0
+                Zc = Z - mean
+                scale = np.sqrt((Zc ** 2).mean(axis=0))
+                scale[scale == 0] = 1.0
+                U, s, Vt = np.linalg.svd(Zc / scale, full_matrices=False)
+                keep = s > (s[0] * SVD_RCOND if s.size else 0.0)
+                self._ridge_svd = (U[:, keep], s[keep], Vt[keep], mean, scale, y_mean)
+            return self._ridge_svd
+
+    def huber_start(self, k: float) -> Tuple[np.ndarray, bool]:
+        """Beta inicial: el ajuste Huber previo con la k más cercana, o la solución OLS."""
+        with self._lock:
+            if self._huber:
+                nearest = min(self._huber, key=lambda c: abs(c - k))
+                return self._huber[nearest], True
+        return self.ols().beta, False
+
+    def remember_huber(self, k: float, beta: np.ndarray) -> None:
+        with self._lock:
+            self._huber[k] = beta
+
+
+def design_key(data_digest: str, y_column: str, xs: Sequence[str], fit_intercept: bool, weights: Optional[str]) -> str:
+    spec = "\x1f".join([data_digest, y_column, *sorted(xs), str(bool(fit_intercept)), weights or ""])
+    return hashlib.sha256(spec.encode("utf-8")).hexdigest()
+
+
+def arrays_digest(*arrays: Optional[np.ndarray]) -> str:
+    """Hash del contenido de los arrays (datos enviados en el cuerpo, sin archivo)."""
+    h = hashlib.sha256()
+    for a in arrays:
+        if a is not None:
+            h.update(np.ascontiguousarray(a, dtype=float).tobytes())
+            h.update(b"|")
+    return h.hexdigest()
+
+
+class DesignCache:
+    """LRU de Design por clave con presupuesto de bytes (como excel_cache)."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, Design]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Design]:
+        with self._lock:
+            d = self._items.get(key)
+            if d is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return d
+
+    def put(self, key: str, d: Design) -> None:
+        if d.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._items[key] = d
+            self._bytes += d.nbytes
+            while self._bytes > self.max_bytes:
+                _, ev = self._items.popitem(last=False)
+                self._bytes -= ev.nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+            }
+
+
+design_cache = DesignCache(DESIGN_CACHE_MAX_BYTES)
+
+
+# -------------------- Estimadores --------------------
+def _sums_of_squares(d: Design, resid_w: np.ndarray) -> Tuple[float, float, float]:
+    """(SSE, SST, y'y) ponderados si el diseño tiene pesos."""
+    sse = float(resid_w @ resid_w)
+    if d.weights is None:
+        y = d.y
+        return sse, float(((y - y.mean()) ** 2).sum()), float(y @ y)
+    w = d.weights
+    y_bar = float(w @ d.y) / float(w.sum())
+    return sse, float(w @ (d.y - y_bar) ** 2), float(w @ d.y ** 2)
+
+
+def _hc_cov(d: Design, resid: np.ndarray, kind: str) -> np.ndarray:
+    # (X'X)^{-1} X' diag(omega) X (X'X)^{-1} = V S^-1 (U' diag(omega) U) S^-1 V', con X = U S V'
+    U, s, Vt = d.svd()
+    e2 = resid ** 2
+    n, k = d.n, d.k
+    if kind == "hc0":
+        omega = e2
+    elif kind == "hc1":
+        omega = e2 * (n / max(n - k, 1))
+    else:
+        h = np.einsum("ij,ij->i", U, U)  # leverage: diag del proyector
+        one_h = np.clip(1.0 - h, np.finfo(float).eps, None)
+        omega = e2 / (one_h if kind == "hc2" else one_h ** 2)
+    M = U.T @ (U * omega[:, None])
+    B = Vt.T / s
+    return B @ M @ B.T
+
+
+def _ls_fit(d: Design, cov_type: Optional[str], conf_levels, fields) -> dict:
+    sol = d.ols()
+    beta = sol.beta
+    fitted = d.X @ beta
+    resid = d.y - fitted
+    resid_w = d.yw - d.Xw @ beta
+    sse, sst, yty = _sums_of_squares(d, resid_w)
+    cov_beta = _hc_cov(d, resid_w, cov_type) if cov_type else None
+    out = ols_summary(beta, np.diag(sol.cov_unscaled), sse, sst, d.n, d.k, sol, fit_intercept=d.fit_intercept,
+                      yty=yty, conf_levels=conf_levels, fields=fields, cov_beta=cov_beta)
+    out.update(residual_fields(resid, fitted, out["sigma2"], fields))
+    return out
+
+
+def _ridge_fit(d: Design, lambdas: Sequence[float], conf_levels, fields) -> dict:
+    """Todos los lambda con la misma SVD: b(lambda) = V diag(s / (s^2 + lambda)) U'y.
+
+    Las pendientes se penalizan sobre columnas estandarizadas (lambda no depende de unidades);
+    el intercepto no se penaliza. Se elige el lambda de menor GCV; la covarianza es la
+    condicional a ese lambda, sigma^2 V diag(s^2 / (s^2 + lambda)^2) V'.
+    """
+    U, s, Vt, mean, scale, y_mean = d.ridge_svd()
+    n, off = d.n, (1 if d.fit_intercept else 0)
+    yc = d.y - y_mean
+    uty = U.T @ yc
+    lams = np.asarray(lambdas, dtype=float)
+    s2 = s ** 2
+    shrink = s2[:, None] / (s2[:, None] + lams[None, :])            # (r, L)
+    rss_perp = max(float(yc @ yc) - float(uty @ uty), 0.0)       # parte de y fuera del espacio de X
+    rss = rss_perp + (((1.0 - shrink) * uty[:, None]) ** 2).sum(axis=0)
+    edf = shrink.sum(axis=0) + off
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gcv = np.where(n - edf > 0, n * rss / (n - edf) ** 2, np.inf)
+    B_std = Vt.T @ (shrink / s[:, None] * uty[:, None])            # (k', L) en la escala estandarizada
+    B = B_std / scale[:, None]
+    best = int(np.argmin(gcv))
+
+    sst = float(yc @ yc) if off else float(((d.y - d.y.mean()) ** 2).sum())
+    yty = float(d.y @ d.y)
+
+    def full_beta(j: int) -> np.ndarray:
+        b = B[:, j]
+        return np.concatenate([[y_mean - mean @ b], b]) if off else b
+
+    beta = full_beta(best)
+    dof = n - float(edf[best])
+    sigma2 = float(rss[best]) / max(dof, 1.0)
+    f = shrink[:, best]
+    cov_std = (Vt.T * (f ** 2 / s2)) @ Vt * sigma2
+    cov_b = cov_std / np.outer(scale, scale)
+    if off:
+        cmb = cov_b @ mean
+        cov = np.empty((d.k, d.k))
+        cov[0, 0] = sigma2 / n + mean @ cmb
+        cov[0, 1:] = cov[1:, 0] = -cmb
+        cov[1:, 1:] = cov_b
+    else:
+        cov = cov_b
+    cond = float(s[0] / s[-1]) if s.size and s[-1] > s[0] / COND_CAP else COND_CAP
+    sol = Solution(beta, cov, "ridge-svd", cond, int(s.size) + off)
+    out = ols_summary(beta, None, float(rss[best]), sst, n, d.k, sol, fit_intercept=d.fit_intercept, yty=yty,
+                      conf_levels=conf_levels, fields=fields, cov_beta=cov, dof=dof)
+    fitted = d.X @ beta
+    out.update(residual_fields(d.y - fitted, fitted, out["sigma2"], fields))
+    r2_path = 1.0 - rss / sst if sst > 0 else np.zeros_like(rss)
+    out["estimator"] = {
+        "method": "ridge",
+        "lambda": float(lams[best]),
+        "edf": float(edf[best]),
+        "path": [
+            {"lambda": float(lams[j]), "edf": float(edf[j]), "sse": float(rss[j]), "r2": float(r2_path[j]),
+             "gcv": float(finite(gcv[j])), "coefficients": dict(zip(d.names, finite(full_beta(j)).tolist()))}
+            for j in range(lams.size)
+        ],
+    }
+    return out
+
+
+def _huber_fit(d: Design, k: float, conf_levels, fields) -> dict:
+    """Huber M-estimador por IRLS con escala MAD re-estimada en cada iteración.
+
+    Covarianza H1 de Huber (la de statsmodels RLM): kappa^2 · [sum psi^2 / (n - p)] /
+    [mean psi']^2 · s^2 (X'X)^{-1}, con (X'X)^{-1} de la SVD cacheada.
+    """
+    X, y, n, p = d.X, d.y, d.n, d.k
+    beta, warm = d.huber_start(k)
+    scale, converged, it = 0.0, False, 0
+    w = np.ones(n)
+    for it in range(1, HUBER_MAX_ITER + 1):
+        r = y - X @ beta
+        scale = float(np.median(np.abs(r - np.median(r)))) / 0.6744897501960817
+        if scale <= 0:  # ajuste (casi) perfecto: nada que re-ponderar
+            converged = True
+            break
+        a = np.abs(r) / scale
+        w = np.where(a <= k, 1.0, k / np.maximum(a, k))
+        sw = np.sqrt(w)
+        new = solve_ols(X * sw[:, None], y * sw).beta
+        delta = float(np.max(np.abs(new - beta)))
+        beta = new
+        if delta <= HUBER_TOL * (1.0 + float(np.max(np.abs(beta)))):
+            converged = True
+            break
+    d.remember_huber(k, beta)
+
+    fitted = X @ beta
+    resid = y - fitted
+    sse, sst, yty = _sums_of_squares(d, resid)
+    if scale > 0:
+        u = resid / scale
+        psi = np.clip(u, -k, k)
+        dpsi = (np.abs(u) <= k).astype(float)
+        m = float(dpsi.mean())
+    else:
+        psi, m = np.zeros(n), 0.0
+    if m > 0:
+        kappa = 1.0 + p / n * (m * (1.0 - m)) / m ** 2
+        cov = kappa ** 2 * float(psi @ psi) / max(n - p, 1) / m ** 2 * scale ** 2 * d.xtx_inv()
+    else:
+        cov = np.zeros((p, p))
+    sol = d.ols()._replace(beta=beta, cov_unscaled=d.xtx_inv(), method="huber-irls")
+    out = ols_summary(beta, None, sse, sst, n, p, sol, fit_intercept=d.fit_intercept, yty=yty,
+                      conf_levels=conf_levels, fields=fields, cov_beta=cov)
+    out.update(residual_fields(resid, fitted, out["sigma2"], fields))
+    out["estimator"] = {
+        "method": "huber",
+        "k": k,
+        "scale": scale,
+        "iterations": it,
+        "converged": converged,
+        "downweighted": int((w < 1.0).sum()),
+        "warm_start": warm,
+    }
+    return out
+
+
+def fit(d: Design, spec: EstimatorSpec, conf_levels: Sequence[float] = DEFAULT_CONF_LEVELS,
+        fields: Sequence[str] = (), progress: Optional[Callable[[int, int], None]] = None) -> dict:
+    """Mismo dict que _ols, más "estimator" con los detalles del método. `progress` se pasa al remuestreo."""
+    if spec.method == "wls" and d.weights is None:
+        raise ValueError("method=wls requiere pesos ('weights')")
+    if spec.method in LS_METHODS:
+        out = _ls_fit(d, spec.method if spec.method in HC_TYPES else None, conf_levels, fields)
+        out["estimator"] = {"method": spec.method}
+        if spec.method == "wls":
+            out["estimator"]["weights"] = spec.weights
+        if spec.resample:
+            sol = d.ols()
+            out["resampling"] = resample(d.Xw, d.yw, sol.beta, sol.cov_unscaled, d.names, d.fit_intercept,
+                                         spec.resample, spec.n_boot, spec.seed, conf_levels,
+                                         get_pool if BATCH_WORKERS > 1 else None, progress)
+        return out
+    if spec.method == "ridge":
+        return _ridge_fit(d, spec.lambdas, conf_levels, fields)
+    return _huber_fit(d, spec.huber_k, conf_levels, fields)
+
+
+def check_weights(w: np.ndarray, n: int) -> np.ndarray:
+    w = np.asarray(w, dtype=float).reshape(-1)
+    if w.shape != (n,):
+        raise ValueError("Los pesos deben tener la misma longitud que y")
+    if not (np.isfinite(w).all() and (w > 0).all()):
+        raise ValueError("Los pesos deben ser números positivos y finitos")
+    return w
@@ -0,0 +1,159 @@
+# backend/excel_cache.py
+# Cache de DataFrames ya parseados. pd.read_excel(openpyxl) domina la latencia
+# de los endpoints Excel, y la UI recalcula el mismo archivo muchas veces.
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import pandas as pd
+
+from metrics import registry, stage
+
+# Presupuesto en bytes (memoria aproximada de los DataFrames cacheados)
+EXCEL_CACHE_MAX_BYTES = int(os.getenv("EXCEL_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def content_digest(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+class DataFrameCache:
+    """LRU por hash de contenido con presupuesto de bytes.
+
+    Los DataFrames devueltos se comparten entre requests: NO mutarlos.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, Tuple[pd.DataFrame, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key: str, df: pd.DataFrame) -> None:
+        size = int(df.memory_usage(deep=True, index=True).sum())
+        if size > self.max_bytes:
+            return  # no cabe: no vale la pena vaciar todo el cache por un archivo
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._items[key] = (df, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._items:
+                _, (_, sz) = self._items.popitem(last=False)
+                self._bytes -= sz
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+            }
+
+
+excel_cache = DataFrameCache(EXCEL_CACHE_MAX_BYTES)
+
+# (ruta, mtime_ns, tamaño) -> hash, para no re-leer/re-hashear archivos ya vistos
+_path_digests: Dict[Tuple[str, int, int], str] = {}
+_path_lock = threading.Lock()
+
+
+def file_kind(name: Union[str, Path, None]) -> str:
+    """"csv" o "xlsx" según la extensión (por defecto Excel)."""
+    return "csv" if str(name or "").lower().endswith(".csv") else "xlsx"
+
+
+def _parse_excel(source: Union[bytes, str, Path], kind: str = "xlsx") -> pd.DataFrame:
+    # desde ruta se parsea directo del archivo, sin copiarlo entero a memoria antes
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    if kind == "csv":
+        df = pd.read_csv(source)
+    else:
+        df = pd.read_excel(source, engine="openpyxl")
+    df.columns = [str(c).strip() for c in df.columns]
+    return df
+
+
+def _memo_key(path: Union[str, Path]) -> Tuple[str, int, int]:
+    st = os.stat(path)
+    return (str(path), st.st_mtime_ns, st.st_size)
+
+
+def path_digest(path: Union[str, Path]) -> str:
+    """Hash de contenido de un archivo en disco (memoizado por ruta+mtime+tamaño), leído por bloques."""
+    memo_key = _memo_key(path)
+    with _path_lock:
+        digest = _path_digests.get(memo_key)
+    if digest is not None:
+        return digest
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(HASH_CHUNK_BYTES), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _path_lock:
+        _path_digests[memo_key] = digest
+    return digest
+
+
+def remember_path_digest(path: Union[str, Path], digest: str) -> None:
+    """Registra el hash ya calculado al escribir el archivo (p. ej. un blob) para no releerlo."""
+    memo_key = _memo_key(path)
+    with _path_lock:
+        _path_digests[memo_key] = digest
+
+
+def read_excel_cached(source: Union[bytes, str, Path], kind: Optional[str] = None) -> pd.DataFrame:
+    """Lee un Excel o CSV (bytes o ruta) pasando por el cache.
+
+    Para rutas el formato sale de la extensión; para bytes se indica con `kind`.
+    Las columnas ya vienen normalizadas con str().strip().
+    """
+    if isinstance(source, (bytes, bytearray)):
+        digest = content_digest(bytes(source))
+        kind = kind or "xlsx"
+    else:
+        digest = path_digest(source)
+        kind = kind or file_kind(source)
+
+    df = excel_cache.get(digest)
+    if df is not None:
+        return df
+    with stage("read_excel"):
+        df = _parse_excel(source, kind)
+    size = len(source) if isinstance(source, (bytes, bytearray)) else os.path.getsize(source)
+    registry.inc("bytes_parsed_total", size, format=kind)
+    registry.inc("rows_parsed_total", len(df), format=kind)
+    excel_cache.put(digest, df)
+    return df
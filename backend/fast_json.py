@@ -0,0 +1,89 @@
+# backend/fast_json.py
+# Respuesta JSON rápida para los endpoints de regresión. Devolverla directamente
+# evita el jsonable_encoder recursivo de FastAPI; con orjson (opcional) además se
+# serializan arrays de NumPy sin pasar por listas de Python.
+import json
+from typing import Any, AsyncIterable, Iterable, Iterator, Optional
+
+import numpy as np
+from fastapi.responses import JSONResponse
+from starlette.responses import Response, StreamingResponse
+
+from metrics import stage
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+
+def _default(obj: Any):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Tipo no serializable: {type(obj).__name__}")
+
+
+def nullable(arr: Any):
+    """Array con NaN/Inf -> listas con None (null en JSON); si todo es finito se devuelve tal cual."""
+    arr = np.asarray(arr, dtype=float)
+    bad = ~np.isfinite(arr)
+    if not bad.any():
+        return arr
+    out = arr.astype(object)
+    out[bad] = None
+    return out.tolist()
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        with stage("serialize"):
+            return dumps(content)
+
+
+def fast_json(content: Any, response: Optional[Response] = None, status_code: int = 200) -> FastJSONResponse:
+    """FastJSONResponse que conserva los headers de la `response` inyectada (p. ej. Set-Cookie del sid)."""
+    out = FastJSONResponse(content, status_code=status_code)
+    if response is not None:
+        out.raw_headers.extend(h for h in response.raw_headers if h[0] != b"content-length")
+    return out
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def ndjson_stream(items: Iterable[Any], response: Optional[Response] = None) -> StreamingResponse:
+    """Un objeto JSON por línea a medida que `items` los produce (el cliente procesa sin esperar al final)."""
+    def lines() -> Iterator[bytes]:
+        for item in items:
+            yield dumps(item) + b"\n"
+
+    out = StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+    if response is not None:
+        out.raw_headers.extend(h for h in response.raw_headers if h[0] != b"content-length")
+    return out
+
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+
+def sse_event(event: str, data: Any, event_id: Optional[int] = None) -> bytes:
+    """Un evento Server-Sent Events; `data` va como JSON en una sola línea."""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: ".encode("utf-8") + dumps(data) + b"\n\n"
+
+
+def sse_stream(events: AsyncIterable[bytes], response: Optional[Response] = None) -> StreamingResponse:
+    """text/event-stream sin cache ni buffering del proxy (X-Accel-Buffering: no)."""
+    out = StreamingResponse(events, media_type=SSE_MEDIA_TYPE,
+                            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    if response is not None:
+        out.raw_headers.extend(h for h in response.raw_headers if h[0] != b"content-length")
+    return out
@@ -0,0 +1,508 @@
+# backend/jobs.py
+# Cola de trabajos en segundo plano para los cálculos largos (bootstrap con B grande, best
+# subsets, conversión de libros enormes), que con request/response chocan con los timeouts
+# del cliente y del proxy: POST /api/jobs devuelve un id al instante y el cliente consulta
+# GET /api/jobs/{id} o se suscribe por SSE. Cada trabajo es una fila de state_db.Job. Los
+# corre un pool local de hilos (el cálculo pesado suelta el GIL en numpy o usa el pool de
+# procesos de batch.py) del worker que lo recibió, que queda como `owner` de la fila con un
+# lease que renueva cada JOB_LEASE_S/3. Con varios workers (uvicorn --workers N) cada fila
+# tiene un solo dueño: pasar de queued a running es un UPDATE condicional, y solo se retoman
+# (params_json basta para rehacerlos) los trabajos activos con el lease vencido, es decir,
+# cuyo worker murió o se apagó. El progreso vive en memoria y se escribe a la DB a lo más
+# cada JOB_PERSIST_EVERY_S. Cancelar es cooperativo: se marca cancel_requested en la fila y
+# el trabajo lo nota en su siguiente ctx.progress(), corra en el worker que corra. Dos envíos
+# con la misma dedup_key mientras el primero sigue activo comparten el trabajo.
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from fast_json import dumps
+from state_db import Job, SessionLocal
+
+logger = logging.getLogger("regresiones")
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ACTIVE = int(os.getenv("JOB_MAX_ACTIVE", "64"))                      # encolados + en curso
+JOB_MAX_ACTIVE_PER_SESSION = int(os.getenv("JOB_MAX_ACTIVE_PER_SESSION", "8"))
+JOB_PERSIST_EVERY_S = float(os.getenv("JOB_PERSIST_EVERY_S", "1.0"))
+JOB_TTL_S = float(os.getenv("JOB_TTL_S", str(7 * 24 * 3600)))                # terminados: se borran después
+JOB_LEASE_S = float(os.getenv("JOB_LEASE_S", "60"))                        # sin renovar: otro worker lo retoma
+JOB_PRUNE_EVERY_S = 3600.0
+JOB_LIST_MAX = 50
+
+ACTIVE = ("queued", "running")
+FINISHED = ("done", "error", "cancelled")
+
+
+class JobCancelled(Exception):
+    """Se pidió cancelar el trabajo (o el servidor se está apagando)."""
+
+
+class JobQueueFull(Exception):
+    """Demasiados trabajos activos, en total o de la sesión."""
+
+
+def _iso(ts: Optional[datetime]) -> Optional[str]:
+    return ts.isoformat() if ts else None
+
+
+def _owner_id() -> str:
+    return f"{socket.gethostname()[:40]}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _lease_expired(now: datetime):
+    # NULL: filas de antes de los leases o liberadas por un apagado ordenado
+    return Job.lease_until.is_(None) | (Job.lease_until < now)
+
+
+class _Job:
+    """Estado en memoria de un trabajo activo (la fila de la DB va un poco atrás)."""
+
+    def __init__(self, id: str, sid: str, kind: str, params: dict, dedup_key: Optional[str],
+                 blob_key: Optional[str], created_at: datetime):
+        self.id = id
+        self.sid = sid
+        self.kind = kind
+        self.params = params
+        self.dedup_key = dedup_key
+        self.blob_key = blob_key
+        self.created_at = created_at
+        self.started_at: Optional[datetime] = None
+        self.status = "queued"
+        self.progress = 0.0
+        self.message: Optional[str] = None
+        self.version = 0               # cambia con cada avance (SSE solo emite si cambió)
+        self.persisted_at = 0.0        # monotonic del último avance escrito a la DB
+        self.cancel = threading.Event()
+        self.lost = False              # otro worker lo retomó (venció el lease): se abandona sin escribir
+        self.future: Optional[Future] = None
+
+    def public(self) -> dict:
+        return {"id": self.id, "kind": self.kind, "status": self.status, "progress": self.progress,
+                "message": self.message, "error": None, "cancel_requested": self.cancel.is_set(),
+                "created_at": _iso(self.created_at), "started_at": _iso(self.started_at), "finished_at": None}
+
+
+def _row_public(row: Job, with_result: bool) -> dict:
+    out = {"id": row.id, "kind": row.kind, "status": row.status, "progress": row.progress or 0.0,
+           "message": row.message, "error": row.error, "cancel_requested": bool(row.cancel_requested),
+           "created_at": _iso(row.created_at), "started_at": _iso(row.started_at), "finished_at": _iso(row.finished_at)}
+    if with_result and row.status == "done" and row.result_json:
+        out["result"] = json.loads(row.result_json)
+    return out
+
+
+class JobContext:
+    """Lo que recibe la función del trabajo: sid, params y progress()."""
+
+    def __init__(self, queue: "JobQueue", job: _Job):
+        self._queue = queue
+        self._job = job
+        self.sid = job.sid
+        self.params = job.params
+
+    @property
+    def cancelled(self) -> bool:
+        return self._job.cancel.is_set()
+
+    def progress(self, fraction: Optional[float] = None, message: Optional[str] = None) -> None:
+        """Reporta avance (0..1) y/o un mensaje. Es el punto de cancelación: lanza JobCancelled."""
+        self._queue._progress(self._job, fraction, message)
+
+
+JobHandler = Callable[[JobContext], Any]
+
+
+class JobQueue:
+    def __init__(self, session_factory, workers: int, max_active: int, max_per_session: int,
+                 persist_every_s: float, ttl_s: float, lease_s: float = JOB_LEASE_S):
+        self.session_factory = session_factory
+        self.workers = max(1, workers)
+        self.max_active = max_active
+        self.max_per_session = max_per_session
+        self.persist_every_s = persist_every_s
+        self.ttl_s = ttl_s
+        self.lease_s = lease_s
+        self.owner = _owner_id()
+        self._handlers: Dict[str, JobHandler] = {}
+        self._jobs: Dict[str, _Job] = {}       # activos de este worker; el resto se lee de la DB
+        self._lock = threading.Lock()
+        self._submit_lock = threading.Lock()   # cupo + dedup + alta, atómicos dentro del proceso
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lease_stop = threading.Event()
+        self._lease_thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._last_prune = 0.0
+        self.submitted = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self.recovered = 0
+        self.finished = {s: 0 for s in FINISHED}
+        self.run_s = 0.0
+
+    def register(self, kind: str, fn: JobHandler) -> None:
+        self._handlers[kind] = fn
+
+    @property
+    def kinds(self) -> Tuple[str, ...]:
+        return tuple(self._handlers)
+
+    # ---- ciclo de vida ----
+    def start(self) -> None:
+        if self._executor is not None:
+            return
+        self._stopping = False
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self.prune()
+        self._adopt()
+        self._lease_stop.clear()
+        self._lease_thread = threading.Thread(target=self._lease_loop, name="job-lease", daemon=True)
+        self._lease_thread.start()
+
+    def stop(self) -> None:
+        """Los que estén corriendo vuelven a "queued" en su siguiente punto de cancelación; todos
+        quedan sin dueño en la DB, así otro worker (o este al reiniciar) los retoma enseguida."""
+        if self._executor is None:
+            return
+        self._lease_stop.set()
+        self._lease_thread.join()
+        self._lease_thread = None
+        self._stopping = True
+        with self._lock:
+            for job in self._jobs.values():
+                job.cancel.set()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = None
+        with self.session_factory() as db:
+            db.query(Job).filter(Job.owner == self.owner, Job.status.in_(ACTIVE)).update(
+                {"owner": None, "lease_until": None}, synchronize_session=False)
+            db.commit()
+        with self._lock:
+            self._jobs.clear()
+
+    def _lease_until(self) -> datetime:
+        return datetime.utcnow() + timedelta(seconds=self.lease_s)
+
+    def _adopt(self) -> None:
+        """Toma los trabajos activos con el lease vencido (su worker murió o se apagó). Cada fila se
+        reclama con un UPDATE condicional: si varios workers la ven a la vez, la retoma uno solo."""
+        now = datetime.utcnow()
+        adopted = []
+        with self.session_factory() as db:
+            ids = [i for (i,) in db.query(Job.id).filter(Job.status.in_(ACTIVE), _lease_expired(now))
+                   .order_by(Job.created_at)]
+            for job_id in ids:
+                claimed = db.query(Job).filter(Job.id == job_id, Job.status.in_(ACTIVE), _lease_expired(now)).update(
+                    {"owner": self.owner, "lease_until": self._lease_until(), "status": "queued", "progress": 0.0,
+                     "message": "Reanudado tras reinicio", "started_at": None}, synchronize_session=False)
+                db.commit()
+                if not claimed:
+                    continue
+                row = db.get(Job, job_id)
+                if row.cancel_requested or row.kind not in self._handlers:
+                    # nadie lo está corriendo: se cierra acá mismo
+                    row.status, row.finished_at, row.blob_key = "cancelled", datetime.utcnow(), None
+                    if not row.cancel_requested:
+                        row.status, row.error = "error", f"Tipo de trabajo desconocido '{row.kind}'"
+                    db.commit()
+                    continue
+                job = _Job(row.id, row.sid, row.kind, json.loads(row.params_json), row.dedup_key, row.blob_key,
+                           row.created_at)
+                job.message = row.message
+                adopted.append(job)
+        with self._lock:
+            for job in adopted:
+                self._jobs[job.id] = job
+            self.recovered += len(adopted)
+        for job in adopted:
+            job.future = self._executor.submit(self._run, job)
+        if adopted:
+            logger.info("Trabajos retomados (worker anterior caído o apagado): %d", len(adopted))
+
+    def _lease_loop(self) -> None:
+        while not self._lease_stop.wait(self.lease_s / 3):
+            try:
+                self._heartbeat()
+            except Exception as e:
+                logger.warning("Cola de trabajos: no se pudieron renovar los leases: %s", e)
+
+    def _heartbeat(self) -> None:
+        """Renueva los leases propios, aplica cancelaciones pedidas desde otros workers, detecta
+        trabajos que retomó otro worker y adopta los que quedaron huérfanos."""
+        with self._lock:
+            ids = list(self._jobs)
+        if ids:
+            with self.session_factory() as db:
+                db.query(Job).filter(Job.id.in_(ids), Job.owner == self.owner, Job.status.in_(ACTIVE)).update(
+                    {"lease_until": self._lease_until()}, synchronize_session=False)
+                db.commit()
+                rows = db.query(Job.id, Job.owner, Job.cancel_requested).filter(Job.id.in_(ids)).all()
+            for job_id, owner, cancel_requested in rows:
+                with self._lock:
+                    job = self._jobs.get(job_id)
+                if job is None:
+                    continue
+                if owner != self.owner:
+                    job.lost = True
+                    self._cancel_local(job)
+                elif cancel_requested:
+                    self._cancel_local(job)
+        self._adopt()
+        if time.monotonic() - self._last_prune > JOB_PRUNE_EVERY_S:
+            self.prune()
+
+    def prune(self) -> int:
+        """Borra los trabajos terminados hace más de ttl_s."""
+        self._last_prune = time.monotonic()
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_s)
+        with self.session_factory() as db:
+            n = db.query(Job).filter(Job.status.in_(FINISHED), Job.finished_at < cutoff).delete(synchronize_session=False)
+            db.commit()
+        return n
+
+    # ---- envío ----
+    def submit(self, sid: str, kind: str, params: dict, dedup_key: Optional[str] = None,
+               blob_key: Optional[str] = None) -> Tuple[dict, bool]:
+        """(trabajo, deduplicado). Lanza JobQueueFull si no hay cupo."""
+        if kind not in self._handlers:
+            raise ValueError(f"Tipo de trabajo desconocido '{kind}'. Opciones: {', '.join(self._handlers)}")
+        if self._executor is None:
+            raise RuntimeError("La cola de trabajos no está iniciada")
+        # cupo y dedup contra la DB: cuentan los trabajos de todos los workers
+        with self._submit_lock, self.session_factory() as db:
+            active = db.query(Job).filter(Job.status.in_(ACTIVE))
+            existing = active.filter(Job.sid == sid, Job.dedup_key == dedup_key,
+                                     Job.cancel_requested.isnot(True)).first() if dedup_key else None
+            if existing is not None:
+                with self._lock:
+                    self.deduplicated += 1
+                    local = self._jobs.get(existing.id)
+                    return (local.public() if local else _row_public(existing, with_result=False)), True
+            total = active.with_entities(func.count(Job.id)).scalar()
+            per_session = active.filter(Job.sid == sid).with_entities(func.count(Job.id)).scalar()
+            if total >= self.max_active or per_session >= self.max_per_session:
+                with self._lock:
+                    self.rejected += 1
+                raise JobQueueFull()
+            job = _Job(uuid.uuid4().hex, sid, kind, params, dedup_key, blob_key, datetime.utcnow())
+            db.add(Job(id=job.id, sid=sid, kind=kind, dedup_key=dedup_key, status="queued", progress=0.0,
+                       params_json=json.dumps(params, ensure_ascii=False), blob_key=blob_key,
+                       owner=self.owner, lease_until=self._lease_until(), cancel_requested=False,
+                       created_at=job.created_at))
+            db.commit()
+            with self._lock:
+                self._jobs[job.id] = job
+                self.submitted += 1
+        job.future = self._executor.submit(self._run, job)
+        if time.monotonic() - self._last_prune > JOB_PRUNE_EVERY_S:
+            self.prune()
+        return job.public(), False
+
+    # ---- consulta ----
+    def get(self, sid: str, job_id: str, with_result: bool = True) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return job.public() if job.sid == sid else None
+        with self.session_factory() as db:
+            row = db.get(Job, job_id)
+            if row is None or row.sid != sid:
+                return None
+            return _row_public(row, with_result)
+
+    def peek(self, sid: str, job_id: str) -> Optional[Tuple[int, dict]]:
+        """(versión, estado) si el trabajo sigue activo en memoria de este worker; None si terminó,
+        no existe o lo corre otro worker (ver get)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.sid != sid:
+                return None
+            return job.version, job.public()
+
+    def list(self, sid: str, limit: int = JOB_LIST_MAX) -> List[dict]:
+        with self.session_factory() as db:
+            rows = db.query(Job).filter(Job.sid == sid).order_by(Job.created_at.desc()).limit(limit).all()
+            items = [_row_public(r, with_result=False) for r in rows]
+        with self._lock:
+            return [self._jobs[it["id"]].public() if it["id"] in self._jobs else it for it in items]
+
+    def cancel(self, sid: str, job_id: str) -> Optional[dict]:
+        """Marca cancel_requested en la fila (el dueño lo ve en su siguiente ctx.progress() o
+        renovación de lease); si lo corre este worker, además se cancela ya en memoria."""
+        now = datetime.utcnow()
+        with self.session_factory() as db:
+            mine = db.query(Job).filter(Job.id == job_id, Job.sid == sid, Job.status.in_(ACTIVE))
+            mine.update({"cancel_requested": True}, synchronize_session=False)
+            # sin dueño vivo nadie lo va a notar: se cierra acá
+            mine.filter(_lease_expired(now)).update({"status": "cancelled", "finished_at": now, "blob_key": None},
+                                                    synchronize_session=False)
+            db.commit()
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None and job.sid == sid:
+            self._cancel_local(job)
+        return self.get(sid, job_id, with_result=False)
+
+    def _cancel_local(self, job: _Job) -> None:
+        with self._lock:
+            if job.cancel.is_set():
+                return
+            job.cancel.set()
+            job.version += 1
+            # encolado: se saca de la cola; en curso: lo cancela su siguiente ctx.progress()
+            dequeued = job.status == "queued" and job.future is not None and job.future.cancel()
+        if dequeued:
+            if job.lost:
+                self._forget(job)
+            else:
+                self._finish(job, "cancelled")
+
+    # ---- ejecución ----
+    def _run(self, job: _Job) -> None:
+        if job.cancel.is_set():
+            if job.lost:
+                self._forget(job)
+            elif not self._stopping:
+                self._finish(job, "cancelled")
+            return
+        if not self._claim(job):
+            return
+        t0 = time.perf_counter()
+        try:
+            result = self._handlers[job.kind](JobContext(self, job))
+        except JobCancelled:
+            if job.lost:
+                self._forget(job)
+            elif self._stopping:
+                self._write(job.id, status="queued", progress=0.0, started_at=None,
+                            message="Interrumpido por apagado; se retoma al reiniciar")
+                self._forget(job)
+            else:
+                self._finish(job, "cancelled")
+        except ValueError as e:
+            self._finish(job, "error", error=str(e))
+        except Exception as e:
+            logger.exception("Trabajo %s (%s) fallido", job.id, job.kind)
+            self._finish(job, "error", error=f"Error interno: {e}")
+        else:
+            self._finish(job, "done", result=result)
+        finally:
+            with self._lock:
+                self.run_s += time.perf_counter() - t0
+
+    def _claim(self, job: _Job) -> bool:
+        """queued -> running, solo si la fila sigue siendo de este worker y nadie pidió cancelarla."""
+        started = datetime.utcnow()
+        with self.session_factory() as db:
+            claimed = db.query(Job).filter(Job.id == job.id, Job.owner == self.owner, Job.status == "queued",
+                                           Job.cancel_requested.isnot(True)).update(
+                {"status": "running", "started_at": started, "lease_until": self._lease_until()},
+                synchronize_session=False)
+            db.commit()
+            row = None if claimed else db.get(Job, job.id)
+        if claimed:
+            with self._lock:
+                job.status, job.started_at = "running", started
+                job.version += 1
+            return True
+        if row is not None and row.owner == self.owner and row.status == "queued":
+            self._finish(job, "cancelled")  # se pidió cancelar desde otro worker
+        else:
+            self._forget(job)  # lo retomó otro worker o ya terminó
+        return False
+
+    def _progress(self, job: _Job, fraction: Optional[float], message: Optional[str]) -> None:
+        if job.cancel.is_set():
+            raise JobCancelled()
+        now = time.monotonic()
+        with self._lock:
+            if fraction is not None:
+                job.progress = min(max(float(fraction), 0.0), 1.0)
+            if message is not None:
+                job.message = message[:256]
+            job.version += 1
+            due = now - job.persisted_at >= self.persist_every_s
+            if due:
+                job.persisted_at = now
+            progress, message = job.progress, job.message
+        if not due:
+            return
+        # de paso: renovar el lease y ver si se pidió cancelar (quizás desde otro worker)
+        with self.session_factory() as db:
+            owned = db.query(Job).filter(Job.id == job.id, Job.owner == self.owner).update(
+                {"progress": progress, "message": message, "lease_until": self._lease_until()},
+                synchronize_session=False)
+            cancel_requested = db.query(Job.cancel_requested).filter(Job.id == job.id).scalar() if owned else False
+            db.commit()
+        if not owned:
+            job.lost = True
+        if not owned or cancel_requested:
+            with self._lock:
+                job.cancel.set()
+                job.version += 1
+            raise JobCancelled()
+
+    def _finish(self, job: _Job, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        # primero la DB y después se suelta de memoria: quien consulte ve siempre un estado
+        values = {"status": status, "error": error, "finished_at": datetime.utcnow(), "blob_key": None}
+        if status == "done":
+            values.update(progress=1.0, message=None, result_json=dumps(result).decode("utf-8"))
+        try:
+            if not self._write(job.id, **values):
+                logger.warning("Trabajo %s: lo retomó otro worker; se descarta este resultado", job.id)
+                self._forget(job)
+                return
+        except Exception as e:
+            logger.exception("No se pudo guardar el trabajo %s", job.id)
+            if status == "done":
+                self._write(job.id, status="error", error=f"No se pudo guardar el resultado: {e}",
+                            finished_at=values["finished_at"], blob_key=None)
+                status = "error"
+        with self._lock:
+            self.finished[status] += 1
+        self._forget(job)
+
+    def _forget(self, job: _Job) -> None:
+        with self._lock:
+            self._jobs.pop(job.id, None)
+
+    def _write(self, job_id: str, **values) -> int:
+        """Actualiza la fila si sigue siendo de este worker. Devuelve filas escritas (0 o 1)."""
+        if values.get("status") == "queued":  # vuelve a la cola sin dueño: lo retoma cualquiera
+            values.update(owner=None, lease_until=None)
+        with self.session_factory() as db:
+            n = db.query(Job).filter(Job.id == job_id, Job.owner == self.owner).update(values, synchronize_session=False)
+            db.commit()
+        return n
+
+    def stats(self) -> dict:
+        with self._lock:
+            running = sum(1 for j in self._jobs.values() if j.status == "running")
+            return {
+                "owner": self.owner,
+                "lease_s": self.lease_s,
+                "workers": self.workers,
+                "active": len(self._jobs),
+                "running": running,
+                "queued": len(self._jobs) - running,
+                "max_active": self.max_active,
+                "max_per_session": self.max_per_session,
+                "submitted": self.submitted,
+                "deduplicated": self.deduplicated,
+                "rejected": self.rejected,
+                "recovered": self.recovered,
+                **self.finished,
+                "run_s": round(self.run_s, 3),
+            }
+
+
+job_queue = JobQueue(SessionLocal, JOB_WORKERS, JOB_MAX_ACTIVE, JOB_MAX_ACTIVE_PER_SESSION, JOB_PERSIST_EVERY_S, JOB_TTL_S)
@@ -1,26 +1,108 @@
 from fastapi import FastAPI, UploadFile, File, Form, Request, Response, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
-from pydantic import BaseModel, field_validator
-from typing import Dict, List, Optional
-import numpy as np, pandas as pd, io, logging, uuid, json, os, re, math
+from pydantic import BaseModel, ValidationError, field_validator
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np, pandas as pd, asyncio, logging, uuid, json, os, hashlib, threading, time
 from datetime import datetime
 from pathlib import Path
 
-from state_db import init_db, SessionLocal, TableState, ExcelState, ExcelFile, ExcelResultState
+from state_db import init_db, upsert_by_sid, SessionLocal, TableState, ExcelState, ExcelFile, ExcelResultState
+from excel_cache import excel_cache, file_kind, path_digest, read_excel_cached
+from columnar import write_sidecar, load_sidecar_frame, read_schema, remove_sidecar
+from moments import Moments, moments_cache, moments_for_path
+from solvers import solve_ols, ols_summary, residual_fields, COND_CHOLESKY_MAX, DEFAULT_CONF_LEVELS, RESULT_FIELDS, ROW_FIELDS
+from batch import BATCH_MAX_SPECS, BATCH_WORKERS, check_spec, fit_specs, get_pool, shutdown_pool
+from streaming import STREAM_CHUNK_ROWS, STREAM_THRESHOLD_BYTES, stream_fit
+import binary_format
+from fast_json import FastJSONResponse, fast_json, ndjson_stream, nullable, sse_event, sse_stream
+import distributions
+from offload import PoolSaturated, cpu_pool
+from result_cache import result_cache, result_key
+from estimators import Design, EstimatorSpec, arrays_digest, check_weights, design_cache, design_key, parse_spec
+from estimators import fit as fit_estimator
+from autosave import autosave_buffer
+from online import ONLINE_MAX_ROWS, OnlineRegression, online_sessions
+from model_search import CRITERIA as SEARCH_CRITERIA, STRATEGIES as SEARCH_STRATEGIES
+from model_search import SEARCH_MAX_CANDIDATES, SEARCH_TOP_MAX, SUBSET_MAX_CANDIDATES, SearchProblem, best_subsets, stepwise
+from jobs import JobContext, JobQueueFull, job_queue
+import metrics
+from metrics import SERVER_TIMING, observe_fit, stage, timed
+from profiling import profile_store
+from blob_store import BlobRef, UPLOAD_MAX_BYTES, UploadTooLarge, blob_gc, blob_store, release_blob, too_large_message
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("regresiones")
 
-app = FastAPI(title="API de Regresiones", version="1.0.0")
-
+app = FastAPI(title="API de Regresiones", version="1.0.0", default_response_class=FastJSONResponse)
+
+# Rechazo temprano por Content-Length, antes de que Starlette copie el multipart a disco.
+# Sin Content-Length (chunked) el límite se aplica igual al copiar al blob store.
+# ASGI puro: no envuelve las respuestas como BaseHTTPMiddleware.
+class UploadSizeLimit:
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST":
+            for name, value in scope["headers"]:
+                if name == b"content-length" and value.isdigit() and int(value) > self.max_bytes:
+                    resp = JSONResponse(status_code=413, content={"error": too_large_message(UPLOAD_MAX_BYTES)})
+                    await resp(scope, receive, send)
+                    return
+        await self.app(scope, receive, send)
+
+# Métricas por request (ver metrics.py): abre la traza, agrega Server-Timing (y X-Profile-Id si
+# se pidió perfil, ver profiling.py) a los headers de la respuesta y al final observa la duración
+# por ruta (la plantilla, p. ej. /api/jobs/{job_id}, no la URL: cardinalidad acotada).
+class RequestMetrics:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trace, token = metrics.begin_trace()
+        sampler = profile_store.begin(scope["path"]) if profile_store.wanted(scope) else None
+        t0 = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                if SERVER_TIMING:
+                    headers.append((b"server-timing", trace.server_timing(time.perf_counter() - t0).encode("latin-1")))
+                if sampler is not None:
+                    headers.append((b"x-profile-id", sampler.id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if sampler is not None:
+                profile_store.finish(sampler)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            metrics.registry.observe("request_seconds", time.perf_counter() - t0, method=scope["method"],
+                                     route=route, status=f"{status // 100}xx")
+            metrics.end_trace(token)
+
+app.add_middleware(UploadSizeLimit, max_bytes=UPLOAD_MAX_BYTES + 64 * 1024)  # + margen para el resto del form
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173", "http://127.0.0.1:5173"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile-Id"],
 )
+app.add_middleware(RequestMetrics)  # la más externa: también mide los 413 y el preflight CORS
 
 # -------------------- DB session dependency --------------------
 def get_db():
@@ -31,8 +113,7 @@ def get_db():
         db.close()
 
 # -------------------- Archivos --------------------
-UPLOAD_ROOT = Path(__file__).parent / "uploads"
-UPLOAD_ROOT.mkdir(parents=True, exist_ok=True)
+# uploads/blobs/: un archivo por contenido, compartido entre sesiones (ver blob_store.py)
 
 # -------------------- Session cookie --------------------
 COOKIE_NAME = "sid"
@@ -56,19 +137,25 @@ def _ensure_sid_lib(request: Request, response: Response) -> str:
     return _ensure_sid(request, response)
 
 # ---------------- utilidades ----------------
-def _is_number(x) -> bool:
-    return isinstance(x, (int, float)) and not (isinstance(x, float) and (np.isnan(x) or np.isinf(x)))
+# chequeo vectorizado (una pasada en C) en vez de isinstance/isnan por elemento
+def _all_finite(values) -> bool:
+    try:
+        arr = np.asarray(values, dtype=float)
+    except (TypeError, ValueError):
+        return False
+    return arr.ndim == 1 and bool(np.isfinite(arr).all())
 
 class RegressionJSONPayload(BaseModel):
     y: List[float]
     X: Dict[str, List[float]]
     fit_intercept: Optional[bool] = True
+    weights: Optional[List[float]] = None  # solo con ?method=wls
 
     @field_validator("y")
     def _check_y_numeric(cls, v: List[float]) -> List[float]:
         if not isinstance(v, list) or len(v) == 0:
             raise ValueError("'y' debe ser lista no vacía")
-        if not all(_is_number(t) for t in v):
+        if not _all_finite(v):
             raise ValueError("'y' debe contener únicamente números")
         return v
 
@@ -81,136 +168,270 @@ class RegressionJSONPayload(BaseModel):
                 raise ValueError("Llaves de 'X' deben ser strings no vacíos")
             if not isinstance(col, list) or len(col) == 0:
                 raise ValueError(f"Columna '{k}' debe ser lista no vacía")
-            if not all(_is_number(t) for t in col):
+            if not _all_finite(col):
                 raise ValueError(f"'{k}' debe contener únicamente números")
         return v
 
 # ---------------- OLS ----------------
-def _ols(y, X):
+@timed("ols")
+def _ols(y, X, fit_intercept=True, method="auto", conf_levels=DEFAULT_CONF_LEVELS, fields=()):
     n = y.shape[0]
-    XtX = X.T @ X
-    # Intentar inversión directa; si falla (singularidad), usar pseudo-inversa
-    try:
-        XtX_inv = np.linalg.inv(XtX)
-        beta = XtX_inv @ (X.T @ y)
-    except np.linalg.LinAlgError:
-        XtX_inv = np.linalg.pinv(XtX)
-        beta = XtX_inv @ (X.T @ y)
-    y_hat = X @ beta
-    residuals = y - y_hat
-    sse = float(residuals.T @ residuals)
+    # Cholesky / QR / SVD según el número de condición (ver solvers.py); nunca inv(X'X)
+    sol = solve_ols(X, y, method)
+    beta = sol.beta.reshape(-1, 1)
+    fitted = X @ beta
+    residuals = y - fitted
+    sse = float((residuals ** 2).sum())
     sst = float(((y - y.mean()) ** 2).sum())
-    r2 = 1.0 - (sse / sst if sst > 0 else 0.0)
-    k = X.shape[1]
-    dof = max(n - k, 1)
-    sigma2 = sse / dof
-    # Var(beta) = sigma^2 * (X'X)^{-1}. Aseguramos no tomar sqrt de valores negativos por redondeo
-    var_beta_diag = np.diag(sigma2 * XtX_inv)
-    se_beta = np.sqrt(np.clip(var_beta_diag, a_min=0.0, a_max=None))
-    # Evitar divisiones por cero en t-stats
-    with np.errstate(divide='ignore', invalid='ignore'):
-        t_stats_arr = np.where(se_beta > 0, beta.flatten() / se_beta, 0.0)
-    t_stats = t_stats_arr.tolist()
-    adj_r2 = 1.0 - (1.0 - r2) * (n - 1) / max(n - k, 1)
-    return {
-        "beta": beta.flatten().tolist(),
-        "se_beta": se_beta.tolist(),
-        "t_stats": t_stats,
-        "r2": float(r2),
-        "adj_r2": float(adj_r2),
-        "sse": float(sse),
-        "sigma2": float(sigma2),
-    }
-
-# Reemplaza NaN/Inf por 0.0 para respuestas JSON válidas
-def _sanitize_numbers(obj):
-    if isinstance(obj, dict):
-        return {k: _sanitize_numbers(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [_sanitize_numbers(v) for v in obj]
-    try:
-        if isinstance(obj, (np.floating, float)):
-            v = float(obj)
-            if not math.isfinite(v):
-                return 0.0
-            return v
-        if isinstance(obj, (np.integer, int)):
-            return int(obj)
-    except Exception:
-        pass
-    return obj
-
-def _prepare_matrix(y_list, X_dict, fit_intercept):
-    y = np.asarray(y_list, dtype=float).reshape(-1, 1)
-    Xc = [np.asarray(X_dict[n], dtype=float).reshape(-1, 1) for n in sorted(X_dict)]
-    if not Xc:
+    yty = float((y ** 2).sum())
+    out = ols_summary(beta, np.diag(sol.cov_unscaled), sse, sst, n, X.shape[1], sol,
+                      fit_intercept=fit_intercept, yty=yty, conf_levels=conf_levels, fields=fields)
+    out.update(residual_fields(residuals, fitted, out["sigma2"], fields))
+    return out
+
+# ?fields=fitted,residuals,diagnostics,cov & ?conf_levels=0.9,0.95 (campos pesados bajo demanda)
+CONF_LEVELS_MAX = 10
+
+def _inference_options(request: Request) -> Tuple[Tuple[str, ...], Tuple[float, ...]]:
+    raw = request.query_params.get("fields", "")
+    fields = tuple(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip()))
+    unknown = [f for f in fields if f not in RESULT_FIELDS]
+    if unknown:
+        raise ValueError(f"Campos desconocidos en 'fields': {', '.join(unknown)}. Opciones: {', '.join(RESULT_FIELDS)}")
+    raw = request.query_params.get("conf_levels", "")
+    try:
+        levels = tuple(dict.fromkeys(float(v) for v in raw.split(",") if v.strip())) or DEFAULT_CONF_LEVELS
+    except ValueError:
+        raise ValueError("'conf_levels' debe ser una lista de números separados por comas")
+    if len(levels) > CONF_LEVELS_MAX or any(not 0.0 < lv < 1.0 for lv in levels):
+        raise ValueError(f"'conf_levels' admite hasta {CONF_LEVELS_MAX} niveles, cada uno entre 0 y 1")
+    return fields, levels
+
+# ?method=ols|wls|hc0..hc3|ridge|huber (&weights=columna, &lambda=0.1,1,10, &huber_k=1.345); ver estimators.py
+# ?resample=pairs|residual|permutation (&B=1000, &seed=42) con los de mínimos cuadrados; ver resampling.py
+def _estimator_options(request: Request) -> EstimatorSpec:
+    q = request.query_params
+    return parse_spec(q.get("method"), q.get("weights"), q.get("lambda"), q.get("huber_k"),
+                      q.get("resample"), q.get("B"), q.get("seed"))
+
+def _solver_debug(out):
+    return {"solver": out["solver"], "condition_number": out["condition_number"], "rank": out["rank"]}
+
+@timed("prepare_matrix")
+def _prepare_matrix(y_src, X_dict, fit_intercept):
+    # Acepta listas, ndarrays, Series o memmaps: cada columna se copia una sola vez
+    # a una matriz float64 preasignada en orden Fortran (sin listas ni hstack intermedios)
+    names = sorted(X_dict)
+    if not names:
         raise ValueError("Se requiere al menos una columna en X")
-    X = np.hstack(Xc)
+    y = np.asarray(y_src, dtype=float).reshape(-1, 1)
+    n = y.shape[0]
+    off = 1 if fit_intercept else 0
+    X = np.empty((n, len(names) + off), dtype=float, order="F")
     if fit_intercept:
-        X = np.hstack([np.ones((X.shape[0], 1)), X])
+        X[:, 0] = 1.0
+    for j, name in enumerate(names):
+        col = np.asarray(X_dict[name], dtype=float)
+        if col.shape != (n,):
+            raise ValueError(f"La columna '{name}' no tiene la misma longitud que y")
+        X[:, j + off] = col
     return y, X
 
+def _ensure_numeric(s: pd.Series, name: str) -> np.ndarray:
+    coerced = pd.to_numeric(s, errors="coerce")
+    if coerced.isna().any():
+        idx_bad = list(s[coerced.isna()].index[:5])
+        raise ValueError(f"La columna '{name}' debe ser completamente numérica. Filas problemáticas: {idx_bad}")
+    return coerced.to_numpy(dtype=float)
+
+# etapa CPU de los endpoints Excel: coerción numérica + matriz de diseño + OLS -> (out, n)
+def _coerce_and_fit(df: pd.DataFrame, y_column: str, xs: List[str], fit_intercept: bool,
+                    conf_levels: Sequence[float] = DEFAULT_CONF_LEVELS, fields: Sequence[str] = ()):
+    with stage("ensure_numeric"):
+        y = _ensure_numeric(df[y_column], y_column)
+        X_cols = {c: _ensure_numeric(df[c], c) for c in xs}
+    y_arr, X_arr = _prepare_matrix(y, X_cols, fit_intercept)
+    return _ols(y_arr, X_arr, fit_intercept, conf_levels=conf_levels, fields=fields), int(y_arr.shape[0])
+
 def _format_response(features, fit_intercept, out):
     names = (["intercept"] if fit_intercept else []) + sorted(features)
-    return {
+    resp = {
         "coefficients": {n: out["beta"][i] for i, n in enumerate(names)},
         "std_errors": {n: out["se_beta"][i] for i, n in enumerate(names)},
         "t_stats": {n: out["t_stats"][i] for i, n in enumerate(names)},
+        "p_values": {n: out["p_values"][i] for i, n in enumerate(names)},
+        "conf_int": {lv: {n: ci[i] for i, n in enumerate(names)} for lv, ci in out["conf_int"].items()},
         "r2": out["r2"],
         "adj_r2": out["adj_r2"],
         "sse": out["sse"],
         "sigma2": out["sigma2"],
+        "dof_resid": out["dof_resid"],
+        "f_stat": out["f_stat"],
+        "f_pvalue": out["f_pvalue"],
+        "anova": out["anova"],
     }
+    if "cov" in out:
+        resp["cov"] = {"names": names, "matrix": out["cov"]}
+    for f in ("estimator", "resampling"):
+        if f in out:
+            resp[f] = out[f]
+    for f in ROW_FIELDS:
+        if f in out:
+            resp[f] = out[f]
+    return resp
+
+def _fit_from_moments(path: str, y_column: str, xs: List[str], fit_intercept: bool, sidecar_dir: Optional[str] = None,
+                      conf_levels: Sequence[float] = DEFAULT_CONF_LEVELS, fields: Sequence[str] = ()) -> Optional[dict]:
+    # Ajuste desde los momentos cacheados del archivo (no toca filas). None -> usar el camino normal,
+    # que además genera los mensajes de error (columna inexistente / no numérica) y los campos por fila.
+    if not xs or any(f in ROW_FIELDS for f in fields):
+        return None
+    try:
+        m = moments_for_path(path, sidecar_dir)
+    except Exception as e:
+        logger.warning("Momentos no disponibles para %s: %s", path, e)
+        return None
+    if not m.covers([y_column] + xs) or m.n == 0:
+        return None
+    out = m.fit(y_column, sorted(xs), fit_intercept, conf_levels, fields)
+    if out["condition_number"] > COND_CHOLESKY_MAX:
+        return None  # mal condicionado: mejor QR/SVD sobre las filas que resolver con X'X
+    return _fit_response(out, y_column, xs, fit_intercept, m.n, "moments")
+
+# Métodos distintos de OLS (estimators.py): la matriz de diseño y sus factorizaciones se cachean
+# por (hash del archivo, y, X, intercepto, pesos), así cambiar de método no relee ni refactoriza.
+def _design_from_frame(df: pd.DataFrame, y_column: str, xs: List[str], fit_intercept: bool, weights: Optional[str]) -> Design:
+    if y_column not in df.columns:
+        raise ValueError(f"Columna y '{y_column}' no existe en el archivo")
+    if not xs:
+        raise ValueError("Debes especificar al menos una columna X en 'x_columns'")
+    for c in xs + ([weights] if weights else []):
+        if c not in df.columns:
+            raise ValueError(f"La columna '{c}' no existe en el archivo")
+    with stage("ensure_numeric"):
+        y = _ensure_numeric(df[y_column], y_column)
+        X_cols = {c: _ensure_numeric(df[c], c) for c in xs}
+        w = _ensure_numeric(df[weights], weights) if weights else None
+    y_arr, X_arr = _prepare_matrix(y, X_cols, fit_intercept)
+    w = check_weights(w, y_arr.shape[0]) if weights else None
+    return Design(y_arr, X_arr, (["intercept"] if fit_intercept else []) + sorted(xs), fit_intercept, w)
+
+def _fit_file_estimator(path: str, y_column: str, xs: List[str], fit_intercept: bool, spec: EstimatorSpec,
+                        conf_levels: Sequence[float], fields: Sequence[str], sidecar_dir: Optional[str] = None,
+                        df: Optional[pd.DataFrame] = None, progress: Optional[Callable[[int, int], None]] = None) -> dict:
+    key = design_key(path_digest(path), y_column, xs, fit_intercept, spec.weights)
+    d = design_cache.get(key)
+    status = "hit" if d is not None else "miss"
+    if d is None:
+        if df is None:
+            try:
+                df = _read_frame(path, [y_column] + xs + ([spec.weights] if spec.weights else []), sidecar_dir)
+            except Exception as e:
+                raise ValueError(f"No se pudo leer el archivo: {e}")
+        d = _design_from_frame(df, y_column, xs, fit_intercept, spec.weights)
+        design_cache.put(key, d)
+    resp = _fit_response(fit_estimator(d, spec, conf_levels, fields, progress), y_column, xs, fit_intercept, d.n, "design")
+    resp["debug"]["design_cache"] = status
+    return resp
+
+def _fit_response(out: dict, y_column: str, xs: List[str], fit_intercept: bool, n: int, engine: str) -> dict:
+    resp = _format_response(xs, fit_intercept, out)
+    k = len(xs) + (1 if fit_intercept else 0)
+    observe_fit(engine, n, k)
+    resp.update({
+        "n": int(n),
+        "k": k,
+        "fit_intercept": fit_intercept,
+        "debug": {"design_matrix_shape": [int(n), k], "columns_used": {"y": y_column, "X": xs}, "engine": engine, **_solver_debug(out)},
+    })
+    return resp
+
+# Memo de resultados por (hash del archivo, especificación); ver result_cache.py.
+# Devuelve (clave, respuesta cacheada o None, estado para el header X-Result-Cache).
+# Los campos por fila no se cachean (tamaño O(n)).
+def _cached_result(path: str, y_column: str, xs: List[str], fit_intercept: bool, conf_levels: Sequence[float],
+                   fields: Sequence[str], spec: EstimatorSpec = EstimatorSpec()) -> Tuple[Optional[str], Optional[dict], str]:
+    if any(f in ROW_FIELDS for f in fields):
+        return None, None, "bypass"
+    key = result_key(path_digest(path), y_column, xs, fit_intercept, conf_levels, fields, spec.cache_key())
+    resp, status = result_cache.get(key)
+    if resp is not None:
+        resp["debug"]["columns_used"] = {"y": y_column, "X": xs}  # la clave ignora el orden de X
+        resp["debug"]["result_cache"] = status
+    return key, resp, status
+
+def _remember_result(key: Optional[str], resp: dict) -> None:
+    if key is not None:
+        result_cache.put(key, resp)
 
 # ---------------- helpers Excel state/result ----------------
-def _save_uploaded_file_for_sid(sid: str, content: bytes) -> str:
-    # guarda un único archivo ligado a la sesión (para /api/regression/excel/reuse)
-    path = UPLOAD_ROOT / f"{sid}.xlsx"
-    with open(path, "wb") as f:
-        f.write(content)
-    return str(path)
+# La subida se copia por bloques al blob store (hash y límite de tamaño al vuelo, ver
+# blob_store.py): el request nunca tiene el archivo completo en memoria y todo se parsea
+# desde la ruta. UploadTooLarge -> 413 (handler abajo).
+async def _receive_upload(file: UploadFile, kind: str) -> BlobRef:
+    ref = await run_in_threadpool(_put_upload, file, kind)
+    metrics.registry.inc("upload_bytes_total", ref.size)
+    return ref
+
+def _put_upload(file: UploadFile, kind: str) -> BlobRef:
+    with stage("upload"):
+        return blob_store.put_stream(file.file, kind)
+
+# sidecar columnar del blob; si el mismo archivo ya lo subió otra sesión y su sidecar sigue
+# vigente, no se vuelve a parsear. Un Excel ilegible se acepta igual (se verá al calcular).
+def _blob_sidecar(path: str, df: Optional[pd.DataFrame] = None) -> Optional[str]:
+    schema = read_schema(path)
+    if schema is not None:
+        return schema["dir"]
+    try:
+        return write_sidecar(path, df if df is not None else read_excel_cached(path))
+    except Exception as e:
+        logger.warning("Sin sidecar para %s: %s", path, e)
+        return None
+
+def _read_frame(path: str, columns: List[str], sidecar_dir: Optional[str] = None) -> pd.DataFrame:
+    # solo las columnas pedidas desde el sidecar columnar; si no hay, el Excel completo (cacheado)
+    df = load_sidecar_frame(path, columns, sidecar_dir)
+    if df is not None:
+        return df
+    return read_excel_cached(path)
+
+def _column_names(path: str, sidecar_dir: Optional[str] = None) -> List[str]:
+    # nombres de columna sin cargar datos si hay sidecar vigente
+    schema = read_schema(path, sidecar_dir)
+    if schema is not None:
+        return [c["name"] for c in schema["columns"]]
+    return list(read_excel_cached(path).columns)
+
+def _excel_state_values(y_column: str, x_columns_list: List[str], fit_intercept: bool, file_path: Optional[str]):
+    values = {
+        "y_column": y_column,
+        "x_columns": ",".join(x_columns_list or []),
+        "fit_intercept": bool(fit_intercept),
+        "file_path": file_path,
+        "updated_at": datetime.utcnow(),
+    }
+    # sin file_path se conserva el archivo ya guardado
+    update = values if file_path else {k: v for k, v in values.items() if k != "file_path"}
+    return values, update
 
 def _save_excel_state(db, sid: str, y_column: str, x_columns_list: List[str], fit_intercept: bool, file_path: Optional[str]):
-    row = db.query(ExcelState).filter(ExcelState.sid == sid).first()
-    now = datetime.utcnow()
-    x_join = ",".join(x_columns_list or [])
-    if row:
-        row.y_column = y_column
-        row.x_columns = x_join
-        row.fit_intercept = bool(fit_intercept)
-        if file_path:
-            row.file_path = file_path
-        row.updated_at = now
-    else:
-        row = ExcelState(
-            sid=sid,
-            y_column=y_column,
-            x_columns=x_join,
-            fit_intercept=bool(fit_intercept),
-            file_path=file_path,
-            updated_at=now,
-        )
-        db.add(row)
-    db.commit()
-    return row
+    # sin flush en curso: un autosave más viejo ya sacado del buffer no puede commitear después
+    with autosave_buffer.paused():
+        autosave_buffer.discard(ExcelState, sid)  # esta escritura es más reciente que el autosave pendiente
+        upsert_by_sid(db, ExcelState, sid, *_excel_state_values(y_column, x_columns_list, fit_intercept, file_path))
 
 def _get_excel_state(db, sid: str):
-    return db.query(ExcelState).filter(ExcelState.sid == sid).order_by(ExcelState.updated_at.desc()).first()
+    autosave_buffer.flush(sid)  # read-your-writes
+    return db.query(ExcelState).filter(ExcelState.sid == sid).first()
 
 def _save_excel_result(db, sid: str, result_dict: dict):
-    row = db.query(ExcelResultState).filter(ExcelResultState.sid == sid).first()
-    now = datetime.utcnow()
-    payload = json.dumps(result_dict, ensure_ascii=False)
-    if row:
-        row.result_json = payload
-        row.updated_at = now
-    else:
-        row = ExcelResultState(sid=sid, result_json=payload, updated_at=now)
-        db.add(row)
-    db.commit()
+    # los campos por fila (?fields=fitted,residuals) no se persisten
+    payload = json.dumps({k: v for k, v in result_dict.items() if k not in ROW_FIELDS}, ensure_ascii=False)
+    upsert_by_sid(db, ExcelResultState, sid, {"result_json": payload, "updated_at": datetime.utcnow()})
 
 def _get_excel_result(db, sid: str):
-    row = db.query(ExcelResultState).filter(ExcelResultState.sid == sid).order_by(ExcelResultState.updated_at.desc()).first()
+    row = db.query(ExcelResultState).filter(ExcelResultState.sid == sid).first()
     if not row or not row.result_json:
         return None
     try:
@@ -222,37 +443,356 @@ def _get_excel_result(db, sid: str):
 @app.on_event("startup")
 def _startup():
     init_db()
+    job_queue.start()
+    autosave_buffer.start()
+    blob_gc.start()
     logger.info("DB inicializada.")
 
+@app.on_event("shutdown")
+def _shutdown():
+    job_queue.stop()  # antes que el pool de procesos: un remuestreo en curso lo usa
+    autosave_buffer.stop()  # último flush de los autosaves pendientes
+    blob_gc.stop()
+    shutdown_pool()
+    cpu_pool.shutdown()
+
+@app.exception_handler(UploadTooLarge)
+async def _upload_too_large(request: Request, exc: UploadTooLarge):
+    return JSONResponse(status_code=413, content={"error": str(exc)})
+
+@app.exception_handler(PoolSaturated)
+async def _pool_saturated(request: Request, exc: PoolSaturated):
+    return JSONResponse(status_code=429, headers={"Retry-After": "1"},
+                        content={"error": "Servidor ocupado: demasiados cálculos en curso, reintenta en unos segundos"})
+
 @app.get("/")
 def root():
     return {"message": "API de Regresiones lista. Rutas: POST /api/regression/json, POST /api/regression/excel, estado en /api/state/*"}
 
+@app.get("/api/cache/stats")
+def cache_stats():
+    return {"excel": excel_cache.stats(), "moments": moments_cache.stats(), "results": result_cache.stats(),
+            "designs": design_cache.stats()}
+
+@app.get("/api/offload/stats")
+def offload_stats():
+    return cpu_pool.stats()
+
+# /metrics: histogramas y contadores de metrics.py + lo que ya reportan los stats() de cada módulo
+def _runtime_metrics():
+    caches = {"excel": excel_cache.stats(), "moments": moments_cache.stats(), "results": result_cache.stats(),
+              "designs": design_cache.stats()}
+    for name, st in caches.items():
+        st["hits"] = st.get("hits", st.get("hits_memory", 0) + st.get("hits_db", 0))
+    yield ("cache_hits_total", "counter", "Aciertos por cache",
+           [({"cache": c}, st["hits"]) for c, st in caches.items()])
+    yield ("cache_misses_total", "counter", "Fallos por cache", [({"cache": c}, st["misses"]) for c, st in caches.items()])
+    yield ("cache_hit_ratio", "gauge", "Aciertos / consultas desde el arranque",
+           [({"cache": c}, st["hit_ratio"]) for c, st in caches.items()])
+    yield ("cache_entries", "gauge", "Entradas por cache", [({"cache": c}, st["entries"]) for c, st in caches.items()])
+    pool = cpu_pool.stats()
+    yield ("cpu_pool_pending", "gauge", "Tareas en curso o en cola del cpu_pool", [({}, pool["pending"])])
+    yield ("cpu_pool_rejected_total", "counter", "Tareas rechazadas con 429", [({}, pool["rejected"])])
+    jobs = job_queue.stats()
+    yield ("jobs_active", "gauge", "Trabajos en segundo plano activos",
+           [({"status": "running"}, jobs["running"]), ({"status": "queued"}, jobs["queued"])])
+    yield ("jobs_finished_total", "counter", "Trabajos terminados",
+           [({"status": s}, jobs[s]) for s in ("done", "error", "cancelled")])
+    yield ("autosave_pending", "gauge", "Autosaves en memoria sin escribir", [({}, autosave_buffer.stats()["pending"])])
+    yield ("online_sessions", "gauge", "Sesiones de regresión incremental", [({}, online_sessions.stats()["sessions"])])
+
+metrics.registry.collector(_runtime_metrics)
+
+@app.get("/metrics")
+def metrics_endpoint():
+    return Response(metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Perfiles por muestreo (PROFILE_ENABLED=1 y ?profile=1 o X-Profile: 1 en el request)
+@app.get("/api/profiles")
+def profiles_list():
+    return {**profile_store.stats(), "items": profile_store.list()}
+
+@app.get("/api/profiles/{profile_id}")
+def profiles_get(profile_id: str):
+    prof = profile_store.get(profile_id)
+    if prof is None:
+        return JSONResponse(status_code=404, content={"error": "Perfil no encontrado"})
+    return prof
+
 @app.get("/api/session")
 def ensure_session(request: Request, response: Response):
     sid = _ensure_sid(request, response)
     return {"sid": sid}
 
 # ---- JSON regression
-@app.post("/api/regression/json")
-def regression_from_json(payload: RegressionJSONPayload):
-    lengths = {k: len(v) for k, v in payload.X.items()}
-    lengths["y"] = len(payload.y)
+# Acepta JSON (RegressionJSONPayload) o el formato binario columnar de binary_format.py
+# (Content-Type: application/x-regression-f64); con Accept: application/x-regression-f64
+# la respuesta también sale en binario.
+@app.post("/api/regression/json", openapi_extra={"requestBody": {"content": {
+    "application/json": {"schema": RegressionJSONPayload.model_json_schema()},
+    binary_format.MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}},
+}, "required": True}})
+async def regression_from_json(request: Request):
+    try:
+        fields, conf_levels = _inference_options(request)
+        spec = _estimator_options(request)
+        if spec.weights:
+            raise ValueError("En este endpoint los pesos van en el cuerpo ('weights'), no en la query")
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    body = await request.body()
+    ctype = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if ctype == binary_format.MEDIA_TYPE:
+        try:
+            y, X, fit_intercept, weights = _decode_binary_payload(body)
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
+    else:
+        try:
+            payload = RegressionJSONPayload.model_validate_json(body)
+        except ValidationError as e:
+            errors = [{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)]
+            return JSONResponse(status_code=422, content={"detail": jsonable_encoder(errors)})
+        y, X, fit_intercept, weights = payload.y, payload.X, payload.fit_intercept, payload.weights
+
+    lengths = {k: len(v) for k, v in X.items()}
+    lengths["y"] = len(y)
     if len(set(lengths.values())) != 1:
         return JSONResponse(status_code=400, content={"error": "Longitudes inconsistentes", "detalle": lengths})
     try:
+        resp = await cpu_pool.run("fit", _regression_json_compute, y, X, fit_intercept, conf_levels, fields, spec, weights)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    if binary_format.MEDIA_TYPE not in request.headers.get("accept", ""):
+        return fast_json(resp)
+    # binario: escalares en el header, vectores (coef, SE, t, p) como float64 en el orden de "names";
+    # fitted/residuals (si se pidieron) también como buffers
+    vectors = {f: resp.pop(f) for f in ("coefficients", "std_errors", "t_stats", "p_values")}
+    resp["names"] = list(vectors["coefficients"].keys())
+    arrays = {f: np.fromiter(v.values(), dtype=float) for f, v in vectors.items()}
+    arrays.update({f: resp.pop(f) for f in ("fitted", "residuals") if f in resp})
+    return Response(content=binary_format.encode(resp, arrays), media_type=binary_format.MEDIA_TYPE)
+
+def _decode_binary_payload(body: bytes):
+    header, cols = binary_format.decode(body)
+    y_name = header.get("y", "y")
+    w_name = header.get("weights")
+    fit_intercept = header.get("fit_intercept", True)
+    if not isinstance(fit_intercept, bool):
+        raise ValueError("'fit_intercept' debe ser booleano")
+    if y_name not in cols:
+        raise ValueError(f"Falta la columna y '{y_name}' en el cuerpo binario")
+    y = cols.pop(y_name)
+    if w_name is not None and w_name not in cols:
+        raise ValueError(f"Falta la columna de pesos '{w_name}' en el cuerpo binario")
+    weights = cols.pop(w_name) if w_name is not None else None
+    if len(y) == 0 or not _all_finite(y):
+        raise ValueError("'y' debe ser lista no vacía de números finitos")
+    if not cols:
+        raise ValueError("'X' debe tener al menos una columna")
+    for k, col in cols.items():
+        if not k.strip():
+            raise ValueError("Llaves de 'X' deben ser strings no vacíos")
+        if len(col) == 0 or not _all_finite(col):
+            raise ValueError(f"'{k}' debe contener únicamente números")
+    return y, cols, fit_intercept, weights
+
+# etapa CPU (corre en cpu_pool): lanza ValueError si la matriz no es válida
+def _regression_json_compute(y_src, X_src, fit_intercept, conf_levels=DEFAULT_CONF_LEVELS, fields=(),
+                             spec: EstimatorSpec = EstimatorSpec(), weights=None):
+    y, X = _prepare_matrix(y_src, X_src, fit_intercept)
+    if weights is not None and spec.method != "wls":
+        raise ValueError("'weights' solo aplica con method=wls")
+    if not spec.uses_design:
+        out = _ols(y, X, fit_intercept, conf_levels=conf_levels, fields=fields)
+    else:
+        # sin archivo: el diseño se cachea por hash de los datos recibidos
+        w = check_weights(weights, y.shape[0]) if weights is not None else None
+        key = design_key(arrays_digest(y, X, w), "", list(X_src.keys()), fit_intercept, "w" if w is not None else None)
+        d = design_cache.get(key)
+        if d is None:
+            d = Design(y, X, (["intercept"] if fit_intercept else []) + sorted(X_src), fit_intercept, w)
+            design_cache.put(key, d)
+        out = fit_estimator(d, spec, conf_levels, fields)
+    resp = _format_response(list(X_src.keys()), fit_intercept, out)
+    observe_fit("rows", int(y.shape[0]), int(X.shape[1]))
+    resp.update({
+        "n": int(y.shape[0]),
+        "k": X.shape[1],
+        "fit_intercept": fit_intercept,
+        "debug": {"columns": sorted(list(X_src.keys())), "design_matrix_shape": [int(X.shape[0]), int(X.shape[1])], **_solver_debug(out)},
+    })
+    return resp
+
+# ---- Sesión de regresión incremental (editor de tabla, ver online.py)
+# POST /api/regression/session crea la sesión con todas las filas; luego /delta aplica altas,
+# bajas y ediciones por índice y devuelve el ajuste actualizado sin reenviar la tabla.
+# 404 -> la sesión expiró (recrearla); 409 -> base_version no coincide (otra pestaña).
+class SessionRowOp(BaseModel):
+    op: str                      # "append" | "insert" | "set" | "delete"
+    index: Optional[int] = None  # opcional en "append"
+    row: Optional[Dict[str, Any]] = None  # {"y": ..., <columna X>: ...}
+
+class RegressionSessionDelta(BaseModel):
+    ops: List[SessionRowOp]
+    base_version: Optional[int] = None
+
+def _session_response(s: OnlineRegression, conf_levels: Sequence[float], fields: Sequence[str]) -> dict:
+    if s.n == 0:
+        return {"n": 0, "session": s.info()}
+    out = s.fit(conf_levels, fields)
+    resp = _format_response(s.names, s.fit_intercept, out)
+    resp.update({
+        "n": s.n,
+        "k": s.k,
+        "fit_intercept": s.fit_intercept,
+        "session": s.info(),
+        "debug": {"columns": s.names, "design_matrix_shape": [s.n, s.k], "engine": "online", **_solver_debug(out)},
+    })
+    return resp
+
+@app.post("/api/regression/session")
+def create_regression_session(payload: RegressionJSONPayload, request: Request, response: Response):
+    sid = _ensure_sid(request, response)
+    try:
+        fields, conf_levels = _inference_options(request)
+        if payload.weights is not None:
+            raise ValueError("Las sesiones incrementales solo admiten OLS (sin 'weights')")
         y, X = _prepare_matrix(payload.y, payload.X, payload.fit_intercept)
-        out = _ols(y, X)
-        resp = _format_response(list(payload.X.keys()), payload.fit_intercept, out)
-        resp.update({
-            "n": len(payload.y),
-            "k": X.shape[1],
-            "fit_intercept": payload.fit_intercept,
-            "debug": {"columns": sorted(list(payload.X.keys())), "design_matrix_shape": [int(X.shape[0]), int(X.shape[1])]},
-        })
-        return _sanitize_numbers(resp)
     except ValueError as e:
         return JSONResponse(status_code=400, content={"error": str(e)})
+    if y.shape[0] > ONLINE_MAX_ROWS:
+        return JSONResponse(status_code=400, content={"error": f"La sesión admite hasta {ONLINE_MAX_ROWS} filas"})
+    s = OnlineRegression(sorted(payload.X), bool(payload.fit_intercept))
+    with s.lock:
+        s.load(y, X)
+        online_sessions.put(sid, s)
+        return fast_json(_session_response(s, conf_levels, fields), response)
+
+@app.post("/api/regression/session/delta")
+def regression_session_delta(payload: RegressionSessionDelta, request: Request, response: Response):
+    sid = _ensure_sid(request, response)
+    try:
+        fields, conf_levels = _inference_options(request)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    s = online_sessions.get(sid)
+    if s is None:
+        return JSONResponse(status_code=404, content={"error": "No hay sesión de regresión activa; créala con las filas completas"})
+    with s.lock:
+        if payload.base_version is not None and payload.base_version != s.version:
+            return JSONResponse(status_code=409, content={"error": "La sesión cambió desde la última respuesta", "version": s.version})
+        try:
+            plan = s.plan([op.model_dump() for op in payload.ops])
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
+        s.apply(plan)
+        return fast_json(_session_response(s, conf_levels, fields), response)
+
+@app.get("/api/regression/session")
+def get_regression_session(request: Request, response: Response):
+    sid = _ensure_sid(request, response)
+    try:
+        fields, conf_levels = _inference_options(request)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    s = online_sessions.get(sid)
+    if s is None:
+        return JSONResponse(status_code=404, content={"error": "No hay sesión de regresión activa"})
+    with s.lock:
+        return fast_json(_session_response(s, conf_levels, fields), response)
+
+@app.delete("/api/regression/session")
+def delete_regression_session(request: Request, response: Response):
+    sid = _ensure_sid(request, response)
+    return {"ok": True, "deleted": online_sessions.discard(sid)}
+
+@app.get("/api/regression/session/stats")
+def regression_session_stats():
+    return online_sessions.stats()
+
+# ---- Lote: muchas especificaciones contra un mismo dataset (archivo de la biblioteca o JSON)
+class RegressionSpec(BaseModel):
+    y: str
+    x_columns: List[str]
+    fit_intercept: bool = True
+
+class RegressionBatchPayload(BaseModel):
+    file_id: Optional[int] = None
+    data: Optional[Dict[str, List[float]]] = None
+    specs: List[RegressionSpec]
+    parallel: bool = False
+
+    @field_validator("data")
+    def _check_data_numeric(cls, v: Optional[Dict[str, List[float]]]) -> Optional[Dict[str, List[float]]]:
+        if v is None:
+            return v
+        if not isinstance(v, dict) or len(v) == 0:
+            raise ValueError("'data' debe ser un diccionario no vacío")
+        for k, col in v.items():
+            if not isinstance(k, str) or not k.strip():
+                raise ValueError("Llaves de 'data' deben ser strings no vacíos")
+            if not isinstance(col, list) or len(col) == 0:
+                raise ValueError(f"Columna '{k}' debe ser lista no vacía")
+            if not _all_finite(col):
+                raise ValueError(f"'{k}' debe contener únicamente números")
+        return v
+
+@app.post("/api/regression/batch")
+def regression_batch(payload: RegressionBatchPayload, request: Request, response: Response, db=Depends(get_db)):
+    sid = _ensure_sid(request, response)
+    if (payload.file_id is None) == (payload.data is None):
+        return JSONResponse(status_code=400, content={"error": "Indica exactamente uno de 'file_id' o 'data'"})
+    if not payload.specs:
+        return JSONResponse(status_code=400, content={"error": "'specs' debe ser lista no vacía"})
+    if len(payload.specs) > BATCH_MAX_SPECS:
+        return JSONResponse(status_code=400, content={"error": f"Máximo {BATCH_MAX_SPECS} especificaciones por lote"})
+
+    if payload.file_id is not None:
+        row = db.query(ExcelFile).filter(ExcelFile.sid == sid, ExcelFile.id == payload.file_id).first()
+        if not row or not blob_store.materialize(row.file_path):
+            return JSONResponse(status_code=404, content={"error": "Archivo no encontrado"})
+        try:
+            m = moments_for_path(row.file_path, row.sidecar_path)
+        except Exception as e:
+            return JSONResponse(status_code=400, content={"error": f"No se pudo leer: {e}"})
+
+        def load_rows(cols):
+            df = _read_frame(row.file_path, cols, row.sidecar_path)
+            return {c: pd.to_numeric(df[c]).to_numpy(dtype=float) for c in cols}
+    else:
+        lengths = {k: len(v) for k, v in payload.data.items()}
+        if len(set(lengths.values())) != 1:
+            return JSONResponse(status_code=400, content={"error": "Longitudes inconsistentes", "detalle": lengths})
+        columns = {k.strip(): np.asarray(v, dtype=float) for k, v in payload.data.items()}
+        m = Moments.from_columns(columns)
+
+        def load_rows(cols):
+            return {c: columns[c] for c in cols}
+
+    specs = [{
+        "y": s.y.strip(),
+        # sin duplicados: una X repetida deja singular la matriz de momentos
+        "x_columns": list(dict.fromkeys(c.strip() for c in s.x_columns if c.strip())),
+        "fit_intercept": bool(s.fit_intercept),
+    } for s in payload.specs]
+
+    results = []
+    for spec, (status, out) in zip(specs, fit_specs(m, specs, payload.parallel)):
+        if status == "error":
+            results.append({"spec": spec, **out})
+            continue
+        y_col, xs, fi = spec["y"], spec["x_columns"], spec["fit_intercept"]
+        engine = "moments"
+        if status == "rows":
+            # mal condicionado para resolver desde X'X: QR/SVD sobre las filas
+            cols = load_rows([y_col] + xs)
+            y_arr, X_arr = _prepare_matrix(cols[y_col], {c: cols[c] for c in xs}, fi)
+            out = _ols(y_arr, X_arr, fi)
+            engine = "rows"
+        results.append({"spec": spec, **_fit_response(out, y_col, xs, fi, m.n, engine)})
+
+    return fast_json({"n": m.n, "count": len(results), "results": results}, response)
 
 # ---- Estado TABLA
 class SaveTableStatePayload(BaseModel):
@@ -262,7 +802,8 @@ class SaveTableStatePayload(BaseModel):
 @app.get("/api/state/table")
 def get_table_state(request: Request, response: Response, db=Depends(get_db)):
     sid = _ensure_sid(request, response)
-    row = db.query(TableState).filter(TableState.sid == sid).order_by(TableState.updated_at.desc()).first()
+    autosave_buffer.flush(sid)  # read-your-writes
+    row = db.query(TableState).filter(TableState.sid == sid).first()
     if not row:
         return {"exists": False, "rows_json": "[]", "fit_intercept": True, "updated_at": None}
     return {
@@ -273,25 +814,77 @@ def get_table_state(request: Request, response: Response, db=Depends(get_db)):
     }
 
 @app.post("/api/state/table")
-def save_table_state(payload: SaveTableStatePayload, request: Request, response: Response, db=Depends(get_db)):
+def save_table_state(payload: SaveTableStatePayload, request: Request, response: Response):
     sid = _ensure_sid(request, response)
-    row = db.query(TableState).filter(TableState.sid == sid).first()
     now = datetime.utcnow()
-    if row:
-        row.rows_json = payload.rows_json
-        row.fit_intercept = bool(payload.fit_intercept)
-        row.updated_at = now
-    else:
-        row = TableState(
-            sid=sid,
-            rows_json=payload.rows_json,
-            fit_intercept=bool(payload.fit_intercept),
-            updated_at=now,
-        )
-        db.add(row)
-    db.commit()
+    autosave_buffer.put(TableState, sid, {
+        "rows_json": payload.rows_json,
+        "fit_intercept": bool(payload.fit_intercept),
+        "updated_at": now,
+    })
     return {"ok": True, "updated_at": now.isoformat()}
 
+# Edición parcial de la tabla: lista de operaciones por índice de fila en vez del JSON completo.
+# Con base_updated_at (el updated_at que el cliente vio por última vez) se rechaza con 409 si
+# otra pestaña guardó entre medio.
+class TableRowOp(BaseModel):
+    op: str                      # "set" | "insert" | "delete"
+    index: int
+    row: Optional[Dict[str, Any]] = None
+
+class PatchTableStatePayload(BaseModel):
+    ops: List[TableRowOp]
+    fit_intercept: Optional[bool] = None
+    base_updated_at: Optional[str] = None
+
+def _apply_row_ops(rows: list, ops: List[TableRowOp]) -> list:
+    for i, op in enumerate(ops):
+        limit = len(rows) + (1 if op.op == "insert" else 0)
+        if op.op not in ("set", "insert", "delete"):
+            raise ValueError(f"Operación {i}: '{op.op}' no válida (set, insert, delete)")
+        if not 0 <= op.index < limit:
+            raise ValueError(f"Operación {i}: índice {op.index} fuera de rango (0..{limit - 1})")
+        if op.op != "delete" and op.row is None:
+            raise ValueError(f"Operación {i}: '{op.op}' requiere 'row'")
+        if op.op == "set":
+            rows[op.index] = op.row
+        elif op.op == "insert":
+            rows.insert(op.index, op.row)
+        else:
+            del rows[op.index]
+    return rows
+
+_table_patch_lock = threading.Lock()  # leer-modificar-escribir atómico entre parches concurrentes
+
+@app.post("/api/state/table/patch")
+def patch_table_state(payload: PatchTableStatePayload, request: Request, response: Response, db=Depends(get_db)):
+    sid = _ensure_sid(request, response)
+    # paused(): el estado actual está en el buffer o ya en la DB, no en un flush a medio commitear
+    with _table_patch_lock, autosave_buffer.paused():
+        current = autosave_buffer.get(TableState, sid)
+        if current is None:
+            row = db.query(TableState).filter(TableState.sid == sid).first()
+            current = {"rows_json": row.rows_json, "fit_intercept": row.fit_intercept, "updated_at": row.updated_at} if row else \
+                {"rows_json": "[]", "fit_intercept": True, "updated_at": None}
+        seen = current["updated_at"].isoformat() if current["updated_at"] else None
+        if payload.base_updated_at is not None and payload.base_updated_at != seen:
+            return JSONResponse(status_code=409, content={"error": "La tabla cambió desde la última lectura", "updated_at": seen})
+        try:
+            rows = json.loads(current["rows_json"] or "[]")
+            if not isinstance(rows, list):
+                raise ValueError("El estado guardado no es una lista de filas")
+            rows = _apply_row_ops(rows, payload.ops)
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
+        now = datetime.utcnow()
+        fit_intercept = current["fit_intercept"] if payload.fit_intercept is None else payload.fit_intercept
+        autosave_buffer.put(TableState, sid, {
+            "rows_json": json.dumps(rows, ensure_ascii=False, separators=(",", ":")),
+            "fit_intercept": bool(fit_intercept),
+            "updated_at": now,
+        })
+    return {"ok": True, "updated_at": now.isoformat(), "n_rows": len(rows)}
+
 # ---- Estado EXCEL (campos)
 class SaveExcelStatePayload(BaseModel):
     y_column: str
@@ -305,7 +898,7 @@ def get_excel_state(request: Request, response: Response, db=Depends(get_db)):
     if not row:
         return {"exists": False, "y_column": "", "x_columns": [], "fit_intercept": True, "updated_at": None, "has_file": False}
     xs = (row.x_columns or "").split(",") if row.x_columns else []
-    has_file = bool(row.file_path) and os.path.exists(row.file_path)
+    has_file = blob_store.materialize(row.file_path)
     return {
         "exists": True,
         "y_column": row.y_column or "",
@@ -316,11 +909,19 @@ def get_excel_state(request: Request, response: Response, db=Depends(get_db)):
     }
 
 @app.post("/api/state/excel")
-def save_excel_state(payload: SaveExcelStatePayload, request: Request, response: Response, db=Depends(get_db)):
+def save_excel_state(payload: SaveExcelStatePayload, request: Request, response: Response):
     sid = _ensure_sid(request, response)
-    _save_excel_state(db, sid, payload.y_column, payload.x_columns, payload.fit_intercept, file_path=None)
+    autosave_buffer.put(ExcelState, sid, *_excel_state_values(payload.y_column, payload.x_columns, payload.fit_intercept, None))
     return {"ok": True}
 
+@app.get("/api/storage/stats")
+def storage_stats():
+    return {"blobs": blob_store.stats(), "gc": blob_gc.stats()}
+
+@app.get("/api/state/stats")
+def state_stats():
+    return {"autosave": autosave_buffer.stats()}
+
 # ---- Resultado EXCEL (último)
 @app.get("/api/state/excel/result")
 def get_excel_last_result(request: Request, response: Response, db=Depends(get_db)):
@@ -340,15 +941,30 @@ async def regression_from_excel(
     y_column: str = Form(...),
     x_columns: str = Form(...),
     fit_intercept: bool = Form(True),
+    stream: bool = Form(False),
 ):
     sid = _ensure_sid(request, response)
-    content = await file.read()
     try:
-        df = pd.read_excel(io.BytesIO(content), engine="openpyxl")
+        fields, conf_levels = _inference_options(request)
+        spec = _estimator_options(request)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    kind = file_kind(file.filename)
+    if stream or (file.size or 0) > STREAM_THRESHOLD_BYTES:
+        if spec.uses_design:
+            return JSONResponse(status_code=400, content={"error": "En modo streaming solo está disponible method=ols (sin remuestreo)"})
+        return await _regression_from_upload_stream(db, sid, response, file, kind, y_column, x_columns, fit_intercept,
+                                                    conf_levels, fields)
+
+    timings = {}
+    ref = await _receive_upload(file, kind)
+    try:
+        df = await cpu_pool.run("parse", read_excel_cached, ref.path, kind, timings=timings)
+    except PoolSaturated:
+        raise
     except Exception as e:
         return JSONResponse(status_code=400, content={"error": f"No se pudo leer el Excel: {e}"})
 
-    df.columns = [str(c).strip() for c in df.columns]
     if y_column not in df.columns:
         return JSONResponse(status_code=400, content={"error": f"Columna y '{y_column}' no existe en el archivo"})
 
@@ -359,44 +975,54 @@ async def regression_from_excel(
         if c not in df.columns:
             return JSONResponse(status_code=400, content={"error": f"La columna X '{c}' no existe en el archivo"})
 
-    def ensure_numeric(s, name):
-        coerced = pd.to_numeric(s, errors="coerce")
-        if coerced.isna().any():
-            idx_bad = list(s[coerced.isna()].index[:5])
-            raise ValueError(f"La columna '{name}' debe ser completamente numérica. Filas problemáticas: {idx_bad}")
-        return coerced
-
-    try:
-        y = ensure_numeric(df[y_column], y_column).to_numpy().reshape(-1, 1)
-        X_cols = {c: ensure_numeric(df[c], c).to_numpy().tolist() for c in x_list}
-    except ValueError as e:
-        return JSONResponse(status_code=400, content={"error": str(e)})
-
     lengths = {c: len(df[c]) for c in [y_column] + x_list}
     if len(set(lengths.values())) != 1:
         return JSONResponse(status_code=400, content={"error": "Las columnas seleccionadas no tienen la misma longitud", "detalle": lengths})
 
     try:
-        y_list = y.flatten().tolist()
-        X = {c: X_cols[c] for c in x_list}
-        y_arr, X_arr = _prepare_matrix(y_list, X, fit_intercept)
-        out = _ols(y_arr, X_arr)
-        resp = _format_response(x_list, fit_intercept, out)
-        resp.update({
-            "n": int(y_arr.shape[0]),
-            "k": int(X_arr.shape[1]),
-            "fit_intercept": fit_intercept,
-            "debug": {"design_matrix_shape": [int(X_arr.shape[0]), int(X_arr.shape[1])], "columns_used": {"y": y_column, "X": x_list}},
-        })
-
-        # Guardar archivo y estado + resultado
-        path = _save_uploaded_file_for_sid(sid, content)
-        _save_excel_state(db, sid, y_column, x_list, fit_intercept, path)
-        _save_excel_result(db, sid, resp)
+        if not spec.uses_design:
+            out, n = await cpu_pool.run("fit", _coerce_and_fit, df, y_column, x_list, fit_intercept, conf_levels, fields, timings=timings)
+            resp = _fit_response(out, y_column, x_list, fit_intercept, n, "rows")
+        else:
+            resp = await cpu_pool.run("fit", _fit_file_estimator, ref.path, y_column, x_list, fit_intercept, spec,
+                                      conf_levels, fields, None, df, timings=timings)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
 
-        return _sanitize_numbers(resp)
+    # Guardar archivo (+ sidecar columnar) y estado + resultado
+    await cpu_pool.run("convert", _blob_sidecar, ref.path, df, timings=timings)
+    resp["debug"]["timings_ms"] = timings
+    _save_excel_state(db, sid, y_column, x_list, fit_intercept, ref.path)
+    _save_excel_result(db, sid, resp)
+    return fast_json(resp, response)
+
+# Modo streaming: el archivo se copia al blob store por bloques y se ajusta sin DataFrame completo
+async def _regression_from_upload_stream(db, sid: str, response: Response, file: UploadFile, kind: str, y_column: str, x_columns: str,
+                                         fit_intercept: bool, conf_levels: Sequence[float], fields: Sequence[str]):
+    row_fields = [f for f in fields if f in ROW_FIELDS]
+    if row_fields:
+        return JSONResponse(status_code=400, content={"error": f"Campos no disponibles en modo streaming: {', '.join(row_fields)}"})
+    x_list = [c.strip() for c in x_columns.split(",") if c.strip()]
+    timings = {}
+    # si el ajuste falla el blob queda sin referencias y lo borra el GC
+    ref = await _receive_upload(file, kind)
+    try:
+        # el sidecar sale de la misma pasada (si el blob ya lo tenía, no se reescribe)
+        out, n = await cpu_pool.run("stream", stream_fit, ref.path, kind, y_column, x_list, fit_intercept,
+                                    STREAM_CHUNK_ROWS, conf_levels, fields, read_schema(ref.path) is None,
+                                    timings=timings)
     except ValueError as e:
         return JSONResponse(status_code=400, content={"error": str(e)})
+    except PoolSaturated:
+        raise
+    except Exception as e:
+        return JSONResponse(status_code=400, content={"error": f"No se pudo leer el Excel: {e}"})
+
+    resp = _fit_response(out, y_column, x_list, fit_intercept, n, "stream")
+    resp["debug"]["timings_ms"] = timings
+    _save_excel_state(db, sid, y_column, x_list, fit_intercept, ref.path)
+    _save_excel_result(db, sid, resp)
+    return fast_json(resp, response)
 
 # ---- Recalcular usando el archivo guardado (sin re-subir)
 @app.post("/api/regression/excel/reuse")
@@ -410,35 +1036,50 @@ def regression_from_saved_file(
 ):
     sid = _ensure_sid(request, response)
     state = _get_excel_state(db, sid)
-    if not state or not state.file_path or not os.path.exists(state.file_path):
+    if not state or not blob_store.materialize(state.file_path):
         return JSONResponse(status_code=400, content={"error": "No hay archivo guardado para esta sesión. Sube un Excel primero."})
 
     try:
-        df = pd.read_excel(state.file_path, engine="openpyxl")
+        fields, conf_levels = _inference_options(request)
+        spec = _estimator_options(request)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    x_list = [c.strip() for c in x_columns.split(",") if c.strip()]
+    key, resp, status = _cached_result(state.file_path, y_column, x_list, fit_intercept, conf_levels, fields, spec)
+    response.headers["X-Result-Cache"] = status
+    if resp is None and spec.uses_design:
+        try:
+            resp = _fit_file_estimator(state.file_path, y_column, x_list, fit_intercept, spec, conf_levels, fields)
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
+        _remember_result(key, resp)
+    if resp is None:
+        resp = _fit_from_moments(state.file_path, y_column, x_list, fit_intercept, None, conf_levels, fields)
+        if resp is not None:
+            _remember_result(key, resp)
+    if resp is not None:
+        _save_excel_state(db, sid, y_column, x_list, fit_intercept, file_path=None)
+        _save_excel_result(db, sid, resp)
+        return fast_json(resp, response)
+
+    try:
+        df = _read_frame(state.file_path, [y_column] + x_list)
     except Exception as e:
         return JSONResponse(status_code=400, content={"error": f"No se pudo leer el archivo guardado: {e}"})
 
-    df.columns = [str(c).strip() for c in df.columns]
     if y_column not in df.columns:
         return JSONResponse(status_code=400, content={"error": f"Columna y '{y_column}' no existe en el archivo"})
 
-    x_list = [c.strip() for c in x_columns.split(",") if c.strip()]
     if not x_list:
         return JSONResponse(status_code=400, content={"error": "Debes especificar al menos una columna X en 'x_columns'"})
     for c in x_list:
         if c not in df.columns:
             return JSONResponse(status_code=400, content={"error": f"La columna X '{c}' no existe en el archivo"})
 
-    def ensure_numeric(s, name):
-        coerced = pd.to_numeric(s, errors="coerce")
-        if coerced.isna().any():
-            idx_bad = list(s[coerced.isna()].index[:5])
-            raise ValueError(f"La columna '{name}' debe ser completamente numérica. Filas problemáticas: {idx_bad}")
-        return coerced
-
     try:
-        y = ensure_numeric(df[y_column], y_column).to_numpy().reshape(-1, 1)
-        X_cols = {c: ensure_numeric(df[c], c).to_numpy().tolist() for c in x_list}
+        with stage("ensure_numeric"):
+            y = _ensure_numeric(df[y_column], y_column)
+            X_cols = {c: _ensure_numeric(df[c], c) for c in x_list}
     except ValueError as e:
         return JSONResponse(status_code=400, content={"error": str(e)})
 
@@ -447,22 +1088,22 @@ def regression_from_saved_file(
         return JSONResponse(status_code=400, content={"error": "Las columnas seleccionadas no tienen la misma longitud", "detalle": lengths})
 
     try:
-        y_list = y.flatten().tolist()
-        X = {c: X_cols[c] for c in x_list}
-        y_arr, X_arr = _prepare_matrix(y_list, X, fit_intercept)
-        out = _ols(y_arr, X_arr)
+        y_arr, X_arr = _prepare_matrix(y, X_cols, fit_intercept)
+        out = _ols(y_arr, X_arr, fit_intercept, conf_levels=conf_levels, fields=fields)
         resp = _format_response(x_list, fit_intercept, out)
+        observe_fit("rows", int(y_arr.shape[0]), int(X_arr.shape[1]))
         resp.update({
             "n": int(y_arr.shape[0]),
             "k": int(X_arr.shape[1]),
             "fit_intercept": fit_intercept,
-            "debug": {"design_matrix_shape": [int(X_arr.shape[0]), int(X_arr.shape[1])], "columns_used": {"y": y_column, "X": x_list}},
+            "debug": {"design_matrix_shape": [int(X_arr.shape[0]), int(X_arr.shape[1])], "columns_used": {"y": y_column, "X": x_list}, **_solver_debug(out)},
         })
+        _remember_result(key, resp)
 
         _save_excel_state(db, sid, y_column, x_list, fit_intercept, file_path=None)
         _save_excel_result(db, sid, resp)
 
-        return _sanitize_numbers(resp)
+        return fast_json(resp, response)
     except ValueError as e:
         return JSONResponse(status_code=400, content={"error": str(e)})
 
@@ -477,32 +1118,30 @@ async def library_upload_excel(
     db=Depends(get_db),
 ):
     sid = _ensure_sid_lib(request, response)
-    user_dir = UPLOAD_ROOT / sid
-    user_dir.mkdir(parents=True, exist_ok=True)
-
     base = Path(file.filename or "archivo.xlsx").name
-    safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", base)
-    fname = f"{uuid.uuid4().hex}_{safe}"
-    fpath = user_dir / fname
 
-    content = await file.read()
-    with open(fpath, "wb") as fh:
-        fh.write(content)
+    ref = await _receive_upload(file, file_kind(base))
+    sidecar = await cpu_pool.run("convert", _blob_sidecar, ref.path)
 
     row = ExcelFile(
         sid=sid,
         filename=base,
-        file_path=str(fpath),
-        size_bytes=len(content),
+        file_path=ref.path,
+        size_bytes=ref.size,
         kind="auto",
+        sidecar_path=sidecar,
+        blob_key=ref.key,
     )
     db.add(row); db.commit(); db.refresh(row)
+    return _uploaded_file(row, ref.deduplicated)
 
+def _uploaded_file(row, deduplicated: bool) -> dict:
     return {"ok": True, "file": {
         "id": row.id,
         "filename": row.filename,
         "size_kb": round((row.size_bytes or 0)/1024.0, 1),
-        "uploaded_at": row.uploaded_at.isoformat()
+        "uploaded_at": row.uploaded_at.isoformat(),
+        "deduplicated": deduplicated,
     }}
 
 # Listar archivos en biblioteca (formato que espera FileLibrary: {items: [...]})
@@ -518,7 +1157,9 @@ def library_list_excel(request: Request, response: Response, db=Depends(get_db))
     } for r in rows]
     return {"items": items}
 
-# Enviar contenido del archivo a la tabla (tolerante a x/x1 y case-insensitive)
+# Enviar contenido del archivo a la tabla (tolerante a x/x1 y case-insensitive).
+# Solo se cargan las columnas resueltas; offset/limit paginan y layout="columns"
+# devuelve {"columns": {"x": [...], "y": [...]}} en vez de una lista de filas.
 @app.post("/api/library/excel/to_table")
 def library_to_table(
     request: Request,
@@ -527,24 +1168,30 @@ def library_to_table(
     y_column: str = Form("y"),
     x1_column: str = Form("x"),
     x2_column: Optional[str] = Form(None),
+    offset: int = Form(0),
+    limit: Optional[int] = Form(None),
+    layout: str = Form("rows"),
     db=Depends(get_db)
 ):
     sid = _ensure_sid_lib(request, response)
     row = db.query(ExcelFile).filter(ExcelFile.sid == sid, ExcelFile.id == file_id).first()
-    if not row or not os.path.exists(row.file_path):
+    if not row or not blob_store.materialize(row.file_path):
         return JSONResponse(status_code=404, content={"error": "Archivo no encontrado"})
+    if layout not in ("rows", "columns"):
+        return JSONResponse(status_code=400, content={"error": "layout debe ser 'rows' o 'columns'"})
+    if offset < 0 or (limit is not None and limit < 0):
+        return JSONResponse(status_code=400, content={"error": "offset y limit no pueden ser negativos"})
 
     try:
-        with open(row.file_path, "rb") as fh:
-            content = fh.read()
-        df = pd.read_excel(io.BytesIO(content), engine="openpyxl")
+        names = _column_names(row.file_path, row.sidecar_path)
     except Exception as e:
         return JSONResponse(status_code=400, content={"error": f"No se pudo leer: {e}"})
 
-    # normaliza a minúsculas/trim para hacer matching flexible
-    df2 = df.copy()
-    df2.columns = [str(c).strip().lower() for c in df2.columns]
-    cols = set(df2.columns)
+    # matching flexible: minúsculas/trim -> nombre original (la primera si se repite)
+    by_lower: Dict[str, str] = {}
+    for name in names:
+        by_lower.setdefault(str(name).strip().lower(), name)
+    cols = set(by_lower)
 
     y_req  = (y_column or "y").strip().lower()
     x1_req = (x1_column or "x").strip().lower()
@@ -572,15 +1219,34 @@ def library_to_table(
         elif x2_req == "x2" and "x2" in cols:
             x2_name = "x2"
 
-    # construir filas
-    out_rows = []
-    for _, r in df2.iterrows():
-        item = {"x": str(r[x1_name]), "y": str(r[y_req])}
-        if x2_name:
-            item["x2"] = str(r[x2_name])
-        out_rows.append(item)
+    wanted = {"x": x1_name, "y": y_req}
+    if x2_name:
+        wanted["x2"] = x2_name
+    try:
+        df = _read_frame(row.file_path, [by_lower[c] for c in wanted.values()], row.sidecar_path)
+    except Exception as e:
+        return JSONResponse(status_code=400, content={"error": f"No se pudo leer: {e}"})
 
-    return {"rows": out_rows, "columns_used": {"y": y_req, "x1": x1_name, "x2": x2_name}}
+    total = len(df)
+    stop = total if limit is None else min(total, offset + limit)
+    page = df.iloc[offset:stop]
+    # conversión vectorizada a texto, columna por columna
+    data = {key: page[by_lower[c]].astype(str).tolist() for key, c in wanted.items()}
+
+    meta = {"columns_used": {"y": y_req, "x1": x1_name, "x2": x2_name}, "total_rows": total, "offset": offset}
+    if layout == "columns":
+        return fast_json({"columns": data, **meta}, response)
+    keys = list(data)
+    out_rows = [dict(zip(keys, vals)) for vals in zip(*data.values())]
+    return fast_json({"rows": out_rows, **meta}, response)
+
+# metadatos del archivo + cache último resultado
+def _record_library_calc(db, sid: str, row, y_column: str, xs: List[str], resp: dict):
+    row.kind = "simple" if len(xs) == 1 else "multiple"
+    row.y_column = y_column
+    row.x_columns = ",".join(xs)
+    db.add(row); db.commit()
+    _save_excel_result(db, sid, resp)
 
 # Calcular desde biblioteca (acepta id o file_id)
 @app.post("/api/library/excel/calc")
@@ -592,68 +1258,228 @@ async def library_calc(request: Request, response: Response, db=Depends(get_db))
     y_column = (form.get("y_column") or "").strip()
     x_columns = (form.get("x_columns") or "").strip()
     fit_intercept = (form.get("fit_intercept") or "true").lower() in ("1","true","t","yes","y")
+    try:
+        fields, conf_levels = _inference_options(request)
+        spec = _estimator_options(request)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
 
     row = db.query(ExcelFile).filter(ExcelFile.sid == sid, ExcelFile.id == file_id).first()
-    if not row or not os.path.exists(row.file_path):
+    if not row or not blob_store.materialize(row.file_path):
         return JSONResponse(status_code=404, content={"error": "Archivo no encontrado"})
 
+    xs = [c.strip() for c in x_columns.split(",") if c.strip()]
+    key, resp, status = await run_in_threadpool(_cached_result, row.file_path, y_column, xs, fit_intercept, conf_levels, fields, spec)
+    response.headers["X-Result-Cache"] = status
+    if resp is not None:
+        _record_library_calc(db, sid, row, y_column, xs, resp)
+        return fast_json(resp, response)
+
+    timings = {}
+    if spec.uses_design:
+        try:
+            resp = await cpu_pool.run("fit", _fit_file_estimator, row.file_path, y_column, xs, fit_intercept, spec,
+                                      conf_levels, fields, row.sidecar_path, timings=timings)
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
+        _remember_result(key, resp)
+        resp["debug"]["timings_ms"] = timings
+        _record_library_calc(db, sid, row, y_column, xs, resp)
+        return fast_json(resp, response)
+
+    resp = await cpu_pool.run("moments", _fit_from_moments, row.file_path, y_column, xs, fit_intercept, row.sidecar_path,
+                              conf_levels, fields, timings=timings)
+    if resp is not None:
+        _remember_result(key, resp)
+        resp["debug"]["timings_ms"] = timings
+        _record_library_calc(db, sid, row, y_column, xs, resp)
+        return fast_json(resp, response)
+
     try:
-        with open(row.file_path, "rb") as fh:
-            content = fh.read()
-        df = pd.read_excel(io.BytesIO(content), engine="openpyxl")
+        df = await cpu_pool.run("parse", _read_frame, row.file_path, [y_column] + xs, row.sidecar_path, timings=timings)
+    except PoolSaturated:
+        raise
     except Exception as e:
         return JSONResponse(status_code=400, content={"error": f"No se pudo leer: {e}"})
 
-    df.columns = [str(c).strip() for c in df.columns]
     if y_column not in df.columns:
         return JSONResponse(status_code=400, content={"error": f"Columna y '{y_column}' no existe"})
-    xs = [c.strip() for c in x_columns.split(",") if c.strip()]
     if not xs:
         return JSONResponse(status_code=400, content={"error": "Debes especificar al menos una X en 'x_columns'"})
     for c in xs:
         if c not in df.columns:
             return JSONResponse(status_code=400, content={"error": f"La columna X '{c}' no existe"})
 
-    def ensure_numeric(s, name):
-        coerced = pd.to_numeric(s, errors="coerce")
-        if coerced.isna().any():
-            idx_bad = list(s[coerced.isna()].index[:5])
-            raise ValueError(f"La columna '{name}' debe ser completamente numérica. Filas problemáticas: {idx_bad}")
-        return coerced
+    lengths = {c: len(df[c]) for c in [y_column] + xs}
+    if len(set(lengths.values())) != 1:
+        return JSONResponse(status_code=400, content={"error": "Longitudes inconsistentes", "detalle": lengths})
 
     try:
-        y = ensure_numeric(df[y_column], y_column).to_numpy().reshape(-1, 1)
-        X_cols = {c: ensure_numeric(df[c], c).to_numpy().tolist() for c in xs}
+        out, n = await cpu_pool.run("fit", _coerce_and_fit, df, y_column, xs, fit_intercept, conf_levels, fields, timings=timings)
     except ValueError as e:
         return JSONResponse(status_code=400, content={"error": str(e)})
+    resp = _fit_response(out, y_column, xs, fit_intercept, n, "rows")
+    _remember_result(key, resp)
+    resp["debug"]["timings_ms"] = timings
+    _record_library_calc(db, sid, row, y_column, xs, resp)
+    return fast_json(resp, response)
+
+# Búsqueda de modelos sobre un archivo de la biblioteca (ver model_search.py): stepwise por
+# AIC/BIC/adj R² o best subsets exhaustivo, todo desde los momentos cacheados del archivo.
+# Respuesta NDJSON: {"type": "start"}, luego "step" (stepwise) o "progress" con el top
+# parcial (best subsets), y al final "result" con los mejores modelos reajustados.
+SEARCH_TOP_DEFAULT = 10
+
+def _search_params(form) -> dict:
+    strategy = (form.get("strategy") or "stepwise").strip().lower()
+    criterion = (form.get("criterion") or "aic").strip().lower()
+    if strategy not in SEARCH_STRATEGIES:
+        raise ValueError(f"Estrategia desconocida '{strategy}'. Opciones: {', '.join(SEARCH_STRATEGIES)}")
+    if criterion not in SEARCH_CRITERIA:
+        raise ValueError(f"Criterio desconocido '{criterion}'. Opciones: {', '.join(SEARCH_CRITERIA)}")
+    try:
+        max_k = int(form["max_k"]) if (form.get("max_k") or "").strip() else None
+        top = int(form.get("top") or SEARCH_TOP_DEFAULT)
+    except ValueError:
+        raise ValueError("'max_k' y 'top' deben ser enteros")
+    if max_k is not None and max_k < 1:
+        raise ValueError("'max_k' debe ser al menos 1")
+    if not 1 <= top <= SEARCH_TOP_MAX:
+        raise ValueError(f"'top' debe estar entre 1 y {SEARCH_TOP_MAX}")
+    parallel = (form.get("parallel") or "true").lower() in ("1", "true", "t", "yes", "y")
+    return {"strategy": strategy, "criterion": criterion, "max_k": max_k, "top": top, "parallel": parallel}
+
+def _search_model(m: Moments, problem: SearchProblem, cols: List[str]) -> dict:
+    # reajuste exacto desde los momentos (no desde la matriz barrida); beta en el orden de
+    # _format_response (X ordenadas), no en el de las candidatas
+    out = m.fit(problem.y, sorted(cols), problem.fit_intercept)
+    k = len(cols) + problem.k0
+    return {"columns": cols, problem.criterion: problem.crit.value(out["sse"], k),
+            "fit": _fit_response(out, problem.y, cols, problem.fit_intercept, m.n, "moments")}
+
+def _search_problem(m: Moments, y_column: str, x_columns: str, fit_intercept: bool, params: dict) -> SearchProblem:
+    # sin x_columns: todas las columnas numéricas salvo y
+    xs = list(dict.fromkeys(c.strip() for c in x_columns.split(",") if c.strip())) or [c for c in m.names if c != y_column]
+    err = check_spec(m, {"y": y_column, "x_columns": xs})
+    if err:
+        raise ValueError(err)
+    limit = SUBSET_MAX_CANDIDATES if params["strategy"] == "best_subset" else SEARCH_MAX_CANDIDATES
+    if len(xs) > limit:
+        raise ValueError(f"Máximo {limit} columnas candidatas para '{params['strategy']}'")
+    if m.n < 3:
+        raise ValueError("Se necesitan al menos 3 filas para comparar modelos")
+    return SearchProblem(m, y_column, xs, fit_intercept, params["criterion"])
+
+def _search_events(m: Moments, problem: SearchProblem, params: dict):
+    crit = params["criterion"]
+    t0 = time.perf_counter()
+    yield {"type": "start", "strategy": params["strategy"], "criterion": crit, "y": problem.y,
+           "candidates": problem.candidates, "fit_intercept": problem.fit_intercept, "n": m.n}
+    try:
+        if params["strategy"] != "best_subset":
+            for ev in stepwise(problem, params["strategy"], params["max_k"]):
+                if ev.get("done"):
+                    final = [_search_model(m, problem, ev["columns"])] if ev["columns"] else []
+                    yield {"type": "result", "steps": ev["steps"], "ranked": final,
+                           "elapsed_ms": (time.perf_counter() - t0) * 1000}
+                else:
+                    yield {"type": "step", **ev}
+            return
+        pool = get_pool() if params["parallel"] and BATCH_WORKERS > 1 else None
+        for ev in best_subsets(problem, params["max_k"], params["top"], pool, BATCH_WORKERS):
+            if not ev.get("done"):
+                ranked = [{"columns": problem.names(c), crit: problem.crit.value(e, len(c) + problem.k0)}
+                          for _, e, c in ev["ranked"]]
+                yield {"type": "progress", "tasks_done": ev["tasks_done"], "tasks_total": ev["tasks_total"],
+                       "models": ev["models"], "ranked": ranked}
+                continue
+            final = [_search_model(m, problem, problem.names(c)) for _, _, c in ev["ranked"]]
+            sign = -1.0 if crit == "adj_r2" else 1.0
+            final.sort(key=lambda r: sign * r[crit])
+            by_size = [{"size": size, "columns": problem.names(c), crit: problem.crit.value(e, size + problem.k0)}
+                       for size, (_, e, c) in sorted(ev["by_size"].items())]
+            yield {"type": "result", "models": ev["models"], "ranked": final, "best_by_size": by_size,
+                   "parallel": pool is not None, "elapsed_ms": (time.perf_counter() - t0) * 1000}
+    except Exception as e:
+        logger.exception("Búsqueda de modelos fallida")
+        yield {"type": "error", "error": str(e)}
 
-    lengths = {c: len(df[c]) for c in [y_column] + xs}
-    if len(set(lengths.values())) != 1:
-        return JSONResponse(status_code=400, content={"error": "Longitudes inconsistentes", "detalle": lengths})
+@app.post("/api/library/excel/search")
+async def library_search(request: Request, response: Response, db=Depends(get_db)):
+    sid = _ensure_sid_lib(request, response)
+    form = await request.form()
 
+    file_id = int((form.get("id") or form.get("file_id") or 0))
+    y_column = (form.get("y_column") or "").strip()
+    x_columns = (form.get("x_columns") or "").strip()
+    fit_intercept = (form.get("fit_intercept") or "true").lower() in ("1","true","t","yes","y")
     try:
-        y_list = y.flatten().tolist()
-        X = {c: X_cols[c] for c in xs}
-        y_arr, X_arr = _prepare_matrix(y_list, X, fit_intercept)
-        out = _ols(y_arr, X_arr)
-        resp = _format_response(xs, fit_intercept, out)
-        resp.update({
-            "n": int(y_arr.shape[0]),
-            "k": int(X_arr.shape[1]),
-            "fit_intercept": fit_intercept,
-            "debug": {"design_matrix_shape": [int(X_arr.shape[0]), int(X_arr.shape[1])], "columns_used": {"y": y_column, "X": xs}},
-        })
+        params = _search_params(form)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
 
-        # metadatos + cache último resultado
-        row.kind = "simple" if len(xs) == 1 else "multiple"
-        row.y_column = y_column
-        row.x_columns = ",".join(xs)
-        db.add(row); db.commit()
-        _save_excel_result(db, sid, resp)
+    row = db.query(ExcelFile).filter(ExcelFile.sid == sid, ExcelFile.id == file_id).first()
+    if not row or not blob_store.materialize(row.file_path):
+        return JSONResponse(status_code=404, content={"error": "Archivo no encontrado"})
+    try:
+        m = await cpu_pool.run("moments", moments_for_path, row.file_path, row.sidecar_path)
+    except PoolSaturated:
+        raise
+    except Exception as e:
+        return JSONResponse(status_code=400, content={"error": f"No se pudo leer: {e}"})
 
-        return _sanitize_numbers(resp)
+    try:
+        problem = _search_problem(m, y_column, x_columns, fit_intercept, params)
     except ValueError as e:
         return JSONResponse(status_code=400, content={"error": str(e)})
+    return ndjson_stream(_search_events(m, problem, params), response)
+
+# Columnas de un archivo de la biblioteca (p. ej. "z" o "t" para las gráficas de distribución)
+# sin mandar el libro completo: solo las pedidas, desde el sidecar columnar o el cache.
+# Se descartan las filas con alguna celda no numérica en esas columnas (quedan alineadas).
+# JSON por defecto; binario RGF1 con Accept: application/x-regression-f64. ETag/If-None-Match.
+LIBRARY_COLUMNS_MAX = 16
+
+@app.get("/api/library/excel/columns")
+def library_columns(request: Request, response: Response, id: int, columns: str, db=Depends(get_db)):
+    sid = _ensure_sid_lib(request, response)
+    row = db.query(ExcelFile).filter(ExcelFile.sid == sid, ExcelFile.id == id).first()
+    if not row or not blob_store.materialize(row.file_path):
+        return JSONResponse(status_code=404, content={"error": "Archivo no encontrado"})
+
+    cols = list(dict.fromkeys(c.strip() for c in columns.split(",") if c.strip()))
+    if not cols:
+        return JSONResponse(status_code=400, content={"error": "Debes especificar al menos una columna en 'columns'"})
+    if len(cols) > LIBRARY_COLUMNS_MAX:
+        return JSONResponse(status_code=400, content={"error": f"Máximo {LIBRARY_COLUMNS_MAX} columnas por petición"})
+
+    binary = binary_format.MEDIA_TYPE in request.headers.get("accept", "")
+    tag = "\x1f".join([path_digest(row.file_path), *cols, "bin" if binary else "json"])
+    etag = '"' + hashlib.sha1(tag.encode("utf-8")).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept, Cookie"}
+    if etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    try:
+        df = _read_frame(row.file_path, cols, row.sidecar_path)
+    except Exception as e:
+        return JSONResponse(status_code=400, content={"error": f"No se pudo leer: {e}"})
+    for c in cols:
+        if c not in df.columns:
+            return JSONResponse(status_code=400, content={"error": f"La columna '{c}' no existe"})
+
+    values = {c: pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=float) for c in cols}
+    keep = np.logical_and.reduce([np.isfinite(v) for v in values.values()])
+    values = {c: v[keep] for c, v in values.items()}
+    meta = {"id": row.id, "filename": row.filename, "n": int(keep.sum()), "dropped": int(keep.size - keep.sum())}
+
+    if binary:
+        out = Response(content=binary_format.encode(meta, values), media_type=binary_format.MEDIA_TYPE, headers=headers)
+        out.raw_headers.extend(h for h in response.raw_headers if h[0] != b"content-length")
+        return out
+    out = fast_json({**meta, "columns": values}, response)
+    out.headers.update(headers)
+    return out
 
 # Eliminar archivo (acepta JSON { id } y también form id/file_id por compatibilidad)
 @app.post("/api/library/excel/delete")
@@ -677,12 +1503,297 @@ async def library_delete_excel(request: Request, response: Response, db=Depends(
     if not row:
         return JSONResponse(status_code=404, content={"error": "Archivo no encontrado"})
 
-    try:
-        if row.file_path and os.path.exists(row.file_path):
-            os.remove(row.file_path)
-    except Exception:
-        pass
+    key = row.blob_key
+    if not key:  # archivo del esquema anterior (uploads/<sid>/...), no compartido
+        try:
+            if row.file_path and os.path.exists(row.file_path):
+                os.remove(row.file_path)
+            if row.file_path:
+                remove_sidecar(row.file_path, row.sidecar_path)
+        except Exception:
+            pass
 
     db.delete(row)
     db.commit()
+    # el blob se borra solo si era la última referencia; si no, queda para las otras sesiones
+    release_blob(db, blob_store, key)
     return {"ok": True}
+
+# ===================== Trabajos en segundo plano (ver jobs.py) =====================
+# Para libros enormes o modos caros (bootstrap con B grande, best subsets) sin chocar con los
+# timeouts: POST /api/jobs con kind=calc|search|convert y los mismos campos (y query params)
+# que /api/library/excel/calc, /search y /upload -> 202 {"job": {...}}. Después
+# GET /api/jobs/{id} (trae "result" al terminar) o GET /api/jobs/{id}/events (SSE: eventos
+# "progress" y uno final "done" | "error" | "cancelled"). Un envío idéntico a un trabajo aún
+# activo de la misma sesión devuelve ese trabajo ("deduplicated": true).
+JOB_SSE_POLL_S = float(os.getenv("JOB_SSE_POLL_S", "0.25"))
+JOB_SSE_HEARTBEAT_S = 15.0
+
+def _job_key(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def _job_file(db, sid: str, file_id: int):
+    row = db.query(ExcelFile).filter(ExcelFile.sid == sid, ExcelFile.id == file_id).first()
+    if not row or not blob_store.materialize(row.file_path):
+        raise ValueError("Archivo no encontrado")
+    return row
+
+def _library_fit(ctx: JobContext, row, y_column: str, xs: List[str], fit_intercept: bool,
+                 conf_levels: Sequence[float], fields: Sequence[str], spec: EstimatorSpec) -> dict:
+    # mismo orden que library_calc (estimador -> momentos -> filas), en el hilo del trabajo
+    if spec.uses_design:
+        def blocks(done: int, total: int) -> None:
+            ctx.progress(0.1 + 0.85 * done / total, f"Remuestreo: bloque {done} de {total}")
+        return _fit_file_estimator(row.file_path, y_column, xs, fit_intercept, spec, conf_levels, fields,
+                                   row.sidecar_path, progress=blocks)
+    resp = _fit_from_moments(row.file_path, y_column, xs, fit_intercept, row.sidecar_path, conf_levels, fields)
+    if resp is not None:
+        return resp
+    ctx.progress(0.3, "Leyendo filas")
+    try:
+        df = _read_frame(row.file_path, [y_column] + xs, row.sidecar_path)
+    except Exception as e:
+        raise ValueError(f"No se pudo leer: {e}")
+    if y_column not in df.columns:
+        raise ValueError(f"Columna y '{y_column}' no existe")
+    for c in xs:
+        if c not in df.columns:
+            raise ValueError(f"La columna X '{c}' no existe")
+    ctx.progress(0.6, "Ajustando")
+    out, n = _coerce_and_fit(df, y_column, xs, fit_intercept, conf_levels, fields)
+    return _fit_response(out, y_column, xs, fit_intercept, n, "rows")
+
+def _job_calc(ctx: JobContext) -> dict:
+    p = ctx.params
+    spec = EstimatorSpec(**{**p["spec"], "lambdas": tuple(p["spec"]["lambdas"])})
+    conf_levels, fields = tuple(p["conf_levels"]), tuple(p["fields"])
+    y_column, xs, fit_intercept = p["y_column"], p["x_columns"], p["fit_intercept"]
+    # la sesión de DB no queda abierta durante el cálculo
+    with SessionLocal() as db:
+        row = _job_file(db, ctx.sid, p["file_id"])
+    ctx.progress(0.05, "Ajustando")
+    key, resp, _ = _cached_result(row.file_path, y_column, xs, fit_intercept, conf_levels, fields, spec)
+    if resp is None:
+        resp = _library_fit(ctx, row, y_column, xs, fit_intercept, conf_levels, fields, spec)
+        _remember_result(key, resp)
+    with SessionLocal() as db:
+        row = db.query(ExcelFile).filter(ExcelFile.sid == ctx.sid, ExcelFile.id == p["file_id"]).first()
+        if row is not None:
+            _record_library_calc(db, ctx.sid, row, y_column, xs, resp)
+    return resp
+
+def _job_search(ctx: JobContext) -> dict:
+    p = ctx.params
+    with SessionLocal() as db:
+        row = _job_file(db, ctx.sid, p["file_id"])
+    ctx.progress(0.02, "Calculando momentos")
+    try:
+        m = moments_for_path(row.file_path, row.sidecar_path)
+    except Exception as e:
+        raise ValueError(f"No se pudo leer: {e}")
+    problem = _search_problem(m, p["y_column"], p["x_columns"], p["fit_intercept"], p["search"])
+    events = _search_events(m, problem, p["search"])
+    try:
+        for ev in events:
+            if ev["type"] == "progress":
+                ctx.progress(0.05 + 0.9 * ev["tasks_done"] / ev["tasks_total"], f"{ev['models']} modelos evaluados")
+            elif ev["type"] == "step" and ev["action"] != "start":
+                ctx.progress(None, f"Paso {ev['step']}: {ev['action']} {ev['variable']}")
+            elif ev["type"] == "error":
+                raise ValueError(ev["error"])
+            elif ev["type"] == "result":
+                return {k: v for k, v in ev.items() if k != "type"}
+    finally:
+        events.close()  # cancelado: best_subsets descarta las tareas pendientes
+    raise ValueError("La búsqueda terminó sin resultado")
+
+def _job_convert(ctx: JobContext) -> dict:
+    # la subida ya está en el blob store; aquí el parseo, el sidecar y los momentos
+    p = ctx.params
+    if not blob_store.materialize(p["path"]):
+        raise ValueError("El archivo subido ya no está disponible")
+    ctx.progress(0.05, "Convirtiendo a formato columnar")
+    sidecar = _blob_sidecar(p["path"])
+    ctx.progress(0.7, "Calculando momentos")
+    try:
+        moments_for_path(p["path"], sidecar)
+    except Exception as e:
+        logger.warning("Momentos no disponibles para %s: %s", p["path"], e)
+    ctx.progress(0.95, "Agregando a la biblioteca")
+    with SessionLocal() as db:
+        row = ExcelFile(sid=ctx.sid, filename=p["filename"], file_path=p["path"], size_bytes=p["size"],
+                        kind="auto", sidecar_path=sidecar, blob_key=p["blob_key"])
+        db.add(row); db.commit(); db.refresh(row)
+        return _uploaded_file(row, p["deduplicated"])
+
+job_queue.register("calc", _job_calc)
+job_queue.register("search", _job_search)
+job_queue.register("convert", _job_convert)
+
+@app.post("/api/jobs")
+async def jobs_submit(request: Request, response: Response, db=Depends(get_db)):
+    sid = _ensure_sid_lib(request, response)
+    form = await request.form()
+    kind = (form.get("kind") or "").strip().lower()
+    blob_key = None
+    if kind == "convert":
+        file = form.get("file")
+        if file is None or isinstance(file, str):
+            return JSONResponse(status_code=400, content={"error": "Falta el archivo ('file')"})
+        base = Path(file.filename or "archivo.xlsx").name
+        ref = await _receive_upload(file, file_kind(base))
+        params = {"filename": base, "path": ref.path, "size": ref.size, "blob_key": ref.key,
+                  "deduplicated": ref.deduplicated}
+        key = _job_key(sid, kind, ref.key, base)
+        blob_key = ref.key
+    elif kind in ("calc", "search"):
+        file_id = int((form.get("id") or form.get("file_id") or 0))
+        row = db.query(ExcelFile).filter(ExcelFile.sid == sid, ExcelFile.id == file_id).first()
+        if not row or not blob_store.materialize(row.file_path):
+            return JSONResponse(status_code=404, content={"error": "Archivo no encontrado"})
+        params = {"file_id": file_id, "y_column": (form.get("y_column") or "").strip(),
+                  "fit_intercept": (form.get("fit_intercept") or "true").lower() in ("1","true","t","yes","y")}
+        x_columns = (form.get("x_columns") or "").strip()
+        try:
+            if not params["y_column"]:
+                raise ValueError("Debes especificar la columna y en 'y_column'")
+            if kind == "calc":
+                fields, conf_levels = _inference_options(request)
+                spec = _estimator_options(request)
+                xs = [c.strip() for c in x_columns.split(",") if c.strip()]
+                if not xs:
+                    raise ValueError("Debes especificar al menos una X en 'x_columns'")
+                params.update(x_columns=xs, fields=list(fields), conf_levels=list(conf_levels), spec=spec._asdict())
+            else:
+                params.update(x_columns=x_columns, search=_search_params(form))
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
+        key = _job_key(sid, kind, await run_in_threadpool(path_digest, row.file_path), params)
+    else:
+        return JSONResponse(status_code=400, content={"error": f"Tipo de trabajo desconocido '{kind}'. Opciones: {', '.join(job_queue.kinds)}"})
+
+    try:
+        job, deduplicated = job_queue.submit(sid, kind, params, key, blob_key)
+    except JobQueueFull:
+        return JSONResponse(status_code=429, headers={"Retry-After": "5"},
+                            content={"error": "Demasiados trabajos activos; espera a que termine alguno"})
+    return fast_json({"job": job, "deduplicated": deduplicated}, response, status_code=202)
+
+@app.get("/api/jobs")
+def jobs_list(request: Request, response: Response):
+    sid = _ensure_sid_lib(request, response)
+    return {"items": job_queue.list(sid)}
+
+@app.get("/api/jobs/stats")
+def jobs_stats():
+    return job_queue.stats()
+
+@app.get("/api/jobs/{job_id}")
+def jobs_get(job_id: str, request: Request, response: Response):
+    sid = _ensure_sid_lib(request, response)
+    job = job_queue.get(sid, job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Trabajo no encontrado"})
+    return fast_json(job, response)
+
+@app.post("/api/jobs/{job_id}/cancel")
+def jobs_cancel(job_id: str, request: Request, response: Response):
+    sid = _ensure_sid_lib(request, response)
+    job = job_queue.cancel(sid, job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Trabajo no encontrado"})
+    return fast_json(job, response)
+
+async def _job_events(sid: str, job_id: str):
+    # sondea el estado en memoria (barato) y solo emite si cambió; al terminar, el estado final de la DB.
+    # Si lo corre otro worker se sondea su fila, que se actualiza cada JOB_PERSIST_EVERY_S.
+    last, quiet = None, 0.0
+    while True:
+        snap = job_queue.peek(sid, job_id)
+        poll_s = JOB_SSE_POLL_S
+        if snap is None:
+            job = await run_in_threadpool(job_queue.get, sid, job_id)
+            if job is None:
+                return
+            if job["status"] not in ("queued", "running"):
+                yield sse_event(job["status"], job)
+                return
+            snap = ((job["status"], job["progress"], job["message"], job["cancel_requested"]), job)
+            poll_s = max(JOB_SSE_POLL_S, job_queue.persist_every_s)
+        version, job = snap
+        if version != last:
+            yield sse_event("progress", job, version if isinstance(version, int) else None)
+            last, quiet = version, 0.0
+        elif quiet >= JOB_SSE_HEARTBEAT_S:
+            yield b": ping\n\n"
+            quiet = 0.0
+        await asyncio.sleep(poll_s)
+        quiet += poll_s
+
+@app.get("/api/jobs/{job_id}/events")
+async def jobs_events(job_id: str, request: Request, response: Response):
+    sid = _ensure_sid_lib(request, response)
+    if await run_in_threadpool(job_queue.get, sid, job_id, False) is None:
+        return JSONResponse(status_code=404, content={"error": "Trabajo no encontrado"})
+    return sse_stream(_job_events(sid, job_id), response)
+
+# ===================== Distribuciones muestrales =====================
+# pdf/cdf/sf/ppf de t, chi², F, exponencial y normal sobre una grilla completa
+# (puntos x valores de parámetros) en una sola llamada; ver distributions.py.
+class DistGrid(BaseModel):
+    start: float
+    stop: float
+    num: int = 201
+
+class DistEvalPayload(BaseModel):
+    dist: str
+    fn: str = "pdf"
+    x: Optional[List[float]] = None
+    grid: Optional[DistGrid] = None
+    params: Dict[str, Union[float, List[float]]] = {}
+
+@app.get("/api/dist")
+def dist_list():
+    return {"distributions": distributions.describe(), "functions": list(distributions.FUNCTIONS)}
+
+@app.post("/api/dist/eval")
+def dist_eval(payload: DistEvalPayload):
+    if (payload.x is None) == (payload.grid is None):
+        return JSONResponse(status_code=400, content={"error": "Indica exactamente uno de 'x' o 'grid'"})
+    try:
+        if payload.grid is not None:
+            x = distributions.grid(payload.grid.start, payload.grid.stop, payload.grid.num)
+        else:
+            x = np.asarray(payload.x, dtype=float)
+        values = distributions.evaluate(payload.dist, payload.fn, x, payload.params)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    return fast_json({"dist": payload.dist, "fn": payload.fn, "x": x, "values": nullable(values)})
+
+# Tabla de cuantiles memoizada: /api/dist/table?dist=t&probs=0.95,0.975&df=1,2,3
+# (para t y chi² sin df se usan los grados de libertad habituales 1..30, 40, 60, 120)
+@app.get("/api/dist/table")
+def dist_table(request: Request, dist: str, probs: Optional[str] = None):
+    if dist not in distributions.DISTRIBUTIONS:
+        return JSONResponse(status_code=400, content={"error": f"Distribución desconocida '{dist}'"})
+    names = distributions.DISTRIBUTIONS[dist][0]
+    try:
+        p = tuple(float(v) for v in probs.split(",")) if probs else distributions.COMMON_PROBS
+        given = {n: [float(v) for v in request.query_params[n].split(",")] for n in names if n in request.query_params}
+    except ValueError:
+        return JSONResponse(status_code=400, content={"error": "probs y parámetros deben ser números separados por comas"})
+    if names == ("df",) and "df" not in given:
+        given["df"] = list(distributions.COMMON_DF)
+    try:
+        cols = distributions.param_arrays(dist, given)
+        combos = tuple(zip(*(c.tolist() for c in cols)))
+        table = distributions.quantile_table(dist, p, combos)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    return fast_json({
+        "dist": dist,
+        "probs": list(p),
+        "params": {n: c for n, c in zip(names, cols)},
+        "quantiles": nullable(table),
+    })
+
@@ -0,0 +1,257 @@
+# backend/metrics.py
+# Instrumentación del pipeline de regresión, sin dependencias: histogramas por etapa (subida,
+# read_excel, coerción numérica, matriz de diseño, OLS, serialización, DB), bytes y filas
+# parseadas, filas/columnas ajustadas y contadores de los caches, en /metrics (formato de
+# texto de Prometheus) y por request en el header Server-Timing. Cada request abre una Trace
+# (contextvar) que acumula el tiempo por etapa y las consultas a la DB; stage("x") mide un
+# bloque y lo suma a la traza activa y al histograma global. El contexto viaja a los hilos de
+# run_in_threadpool y del cpu_pool en modo "thread"; en modo "process" las subetapas del hijo
+# no se ven (solo la etapa completa del pool).
+import bisect
+import contextvars
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+
+METRICS_PREFIX = os.getenv("METRICS_PREFIX", "regresiones_")
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1").lower() not in ("0", "false", "no")
+
+TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+ROW_BUCKETS = (10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+COLUMN_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+_Labels = Tuple[Tuple[str, str], ...]
+# (nombre, tipo, ayuda, [(labels, valor)]) que produce un collector al renderizar
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)   # no acumulados; +Inf = count
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        if i < len(self.counts):
+            self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(labels: _Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in items) + "}"
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class Registry:
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Tuple[str, str, Optional[Tuple[float, ...]]]] = {}  # nombre -> (tipo, ayuda, buckets)
+        self._counters: Dict[Tuple[str, _Labels], float] = {}
+        self._hists: Dict[Tuple[str, _Labels], _Histogram] = {}
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def counter(self, name: str, help: str) -> None:
+        self._meta[name] = ("counter", help, None)
+
+    def histogram(self, name: str, help: str, buckets: Tuple[float, ...] = TIME_BUCKETS) -> None:
+        self._meta[name] = ("histogram", help, tuple(buckets))
+
+    def collector(self, fn: Callable[[], Iterable[Family]]) -> None:
+        """fn() -> familias (gauges/counters) leídas al momento de /metrics, p. ej. de los stats()."""
+        self._collectors.append(fn)
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            h = self._hists.get(key)
+            if h is None:
+                h = self._hists[key] = _Histogram(self._meta[name][2])
+            h.observe(value)
+
+    def render(self) -> str:
+        """Formato de exposición de texto de Prometheus (0.0.4)."""
+        with self._lock:
+            counters = dict(self._counters)
+            hists = {k: (list(h.counts), h.sum, h.count, h.buckets) for k, h in self._hists.items()}
+        lines: List[str] = []
+        for name, (kind, help, _) in self._meta.items():
+            full = self.prefix + name
+            lines.append(f"# HELP {full} {help}")
+            lines.append(f"# TYPE {full} {kind}")
+            if kind == "counter":
+                for (n, labels), v in counters.items():
+                    if n == name:
+                        lines.append(f"{full}{_fmt_labels(labels)} {_fmt_value(v)}")
+                continue
+            for (n, labels), (counts, total, count, buckets) in hists.items():
+                if n != name:
+                    continue
+                acc = 0
+                for le, c in zip(buckets, counts):
+                    acc += c
+                    lines.append(f"{full}_bucket{_fmt_labels(labels, ('le', _fmt_value(le)))} {acc}")
+                lines.append(f"{full}_bucket{_fmt_labels(labels, ('le', '+Inf'))} {count}")
+                lines.append(f"{full}_sum{_fmt_labels(labels)} {_fmt_value(total)}")
+                lines.append(f"{full}_count{_fmt_labels(labels)} {count}")
+        for fn in self._collectors:
+            for name, kind, help, samples in fn():
+                full = self.prefix + name
+                lines.append(f"# HELP {full} {help}")
+                lines.append(f"# TYPE {full} {kind}")
+                for labels, v in samples:
+                    lines.append(f"{full}{_fmt_labels(tuple(sorted(labels.items())))} {_fmt_value(v)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry(METRICS_PREFIX)
+registry.histogram("request_seconds", "Duración de los requests HTTP (hasta el último byte)")
+registry.histogram("stage_seconds", "Duración de cada etapa del pipeline")
+registry.histogram("stage_wait_seconds", "Espera en cola del cpu_pool antes de cada etapa")
+registry.histogram("db_query_seconds", "Duración de las consultas SQL")
+registry.histogram("db_commit_seconds", "Duración de los COMMIT")
+registry.histogram("fit_rows", "Filas por ajuste", ROW_BUCKETS)
+registry.histogram("fit_columns", "Columnas de la matriz de diseño por ajuste", COLUMN_BUCKETS)
+registry.counter("bytes_parsed_total", "Bytes de Excel/CSV parseados (fallos del excel_cache)")
+registry.counter("rows_parsed_total", "Filas de Excel/CSV parseadas (fallos del excel_cache)")
+registry.counter("upload_bytes_total", "Bytes recibidos en subidas")
+
+
+# ---------------- traza por request ----------------
+class Trace:
+    """Tiempo por etapa y consultas a la DB del request en curso (para Server-Timing)."""
+
+    __slots__ = ("stages", "db_queries", "db_s", "_lock")
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}  # en orden de primera aparición
+        self.db_queries = 0
+        self.db_s = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_db(self, seconds: float, query: bool = True) -> None:
+        with self._lock:
+            self.db_queries += 1 if query else 0
+            self.db_s += seconds
+
+    def server_timing(self, total_s: float) -> str:
+        with self._lock:
+            parts = [f"{name};dur={s * 1000.0:.2f}" for name, s in self.stages.items()]
+            if self.db_queries or self.db_s:
+                parts.append(f'db;dur={self.db_s * 1000.0:.2f};desc="{self.db_queries} consultas"')
+        parts.append(f"total;dur={total_s * 1000.0:.2f}")
+        return ", ".join(parts)
+
+
+_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+
+
+def begin_trace() -> Tuple[Trace, contextvars.Token]:
+    trace = Trace()
+    return trace, _trace.set(trace)
+
+
+def end_trace(token: contextvars.Token) -> None:
+    _trace.reset(token)
+
+
+def record_stage(name: str, seconds: float, wait_s: Optional[float] = None) -> None:
+    """Etapa medida por fuera (p. ej. cpu_pool.run): histograma + traza activa."""
+    registry.observe("stage_seconds", seconds, stage=name)
+    if wait_s is not None:
+        registry.observe("stage_wait_seconds", wait_s, stage=name)
+    trace = _trace.get()
+    if trace is not None:
+        trace.add(name, seconds)
+        if wait_s is not None:
+            trace.add("queue", wait_s)
+
+
+@contextmanager
+def stage(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - t0)
+
+
+def timed(name: str):
+    """Decorador: cada llamada es una etapa `name`."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def observe_fit(engine: str, n: int, k: int) -> None:
+    registry.observe("fit_rows", n, engine=engine)
+    registry.observe("fit_columns", k, engine=engine)
+
+
+# ---------------- SQLAlchemy ----------------
+_SQL_OPS = ("select", "insert", "update", "delete")
+
+
+def instrument_engine(engine) -> None:
+    """Tiempo y conteo de consultas por tipo, y tiempo de los COMMIT, del engine."""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_t0", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        dt = time.perf_counter() - conn.info["query_t0"].pop()
+        op = statement.lstrip()[:6].lower()
+        registry.observe("db_query_seconds", dt, op=op if op in _SQL_OPS else "other")
+        trace = _trace.get()
+        if trace is not None:
+            trace.add_db(dt)
+
+    # el COMMIT de pysqlite no pasa por el cursor: se mide en el dialecto de este engine
+    do_commit = engine.dialect.do_commit
+
+    def timed_commit(dbapi_connection):
+        t0 = time.perf_counter()
+        do_commit(dbapi_connection)
+        dt = time.perf_counter() - t0
+        registry.observe("db_commit_seconds", dt)
+        trace = _trace.get()
+        if trace is not None:
+            trace.add_db(dt, query=False)
+
+    engine.dialect.do_commit = timed_commit
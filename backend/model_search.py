@@ -0,0 +1,283 @@
+# backend/model_search.py
+# Búsqueda de modelos (subconjuntos de X) sobre los momentos del archivo: una sola matriz
+# de productos cruzados S = [X y]'[X y] (centrada si hay intercepto) y el operador sweep.
+# Barrer la columna j "mete" x_j al modelo y barrerla en reversa la saca, en O(p^2);
+# tras barrer el conjunto J, S[y, y] = SSE del modelo J, y el cambio de SSE al agregar o
+# quitar una variable se lee de S en O(1):
+#   agregar j ∉ J:  SSE - S[j, y]^2 / S[j, j]
+#   quitar  j ∈ J:  SSE + S[j, y]^2 / (-S[j, j])
+# stepwise (forward / backward / ambos) avanza un paso por sweep; best subsets recorre los
+# subconjuntos en orden Gray (vecinos difieren en una variable => un sweep por modelo),
+# repartiendo prefijos fijos entre procesos. Los mejores modelos se reajustan al final con
+# Moments.fit para que las estadísticas publicadas no dependan del error acumulado.
+import heapq
+import math
+import os
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from moments import Moments
+
+STRATEGIES = ("forward", "backward", "stepwise", "best_subset")
+CRITERIA = ("aic", "bic", "adj_r2")
+SEARCH_MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", "200"))
+SUBSET_MAX_CANDIDATES = int(os.getenv("SUBSET_MAX_CANDIDATES", "20"))
+SUBSET_TASK_BITS = int(os.getenv("SUBSET_TASK_BITS", "14"))   # 2^bits modelos por tarea (acota la deriva)
+SUBSET_PARALLEL_MIN_MODELS = int(os.getenv("SUBSET_PARALLEL_MIN_MODELS", "32768"))
+SEARCH_TOP_MAX = 100
+# pivote mínimo (relativo a la suma de cuadrados original de x_j): por debajo, colineal
+SWEEP_TOL = 1e-10
+
+
+def sweep(A: np.ndarray, k: int) -> None:
+    """Barre el pivote k (in place)."""
+    d = A[k, k]
+    r = A[k].copy()
+    A -= np.outer(r, r) / d
+    A[k] = A[:, k] = r / d
+    A[k, k] = -1.0 / d
+
+
+def unsweep(A: np.ndarray, k: int) -> None:
+    """Inversa de sweep(A, k)."""
+    d = A[k, k]
+    r = A[k].copy()
+    A -= np.outer(r, r) / d
+    A[k] = A[:, k] = -r / d
+    A[k, k] = -1.0 / d
+
+
+class Criterion:
+    """Puntaje "menor es mejor" a partir de SSE y del número de parámetros k."""
+
+    def __init__(self, name: str, n: int, sst: float):
+        self.name = name
+        self.n = n
+        self.sst = sst
+        self.log_n = math.log(n) if n > 0 else 0.0
+
+    def score(self, sse: float, k: int) -> float:
+        n = self.n
+        if self.name == "adj_r2":
+            return -self.value(sse, k)
+        ll = n * math.log(max(sse, 1e-300) / n)
+        return ll + (2.0 if self.name == "aic" else self.log_n) * k
+
+    def value(self, sse: float, k: int) -> float:
+        """Valor publicado (adj R² en su signo natural)."""
+        if self.name != "adj_r2":
+            return self.score(sse, k)
+        r2 = 1.0 - (sse / self.sst if self.sst > 0 else 0.0)
+        return 1.0 - (1.0 - r2) * (self.n - 1) / max(self.n - k, 1)
+
+
+class SearchProblem:
+    """S (p+1)x(p+1) para las candidatas + y (última fila/columna) a partir de los momentos."""
+
+    def __init__(self, m: Moments, y: str, candidates: List[str], fit_intercept: bool, criterion: str):
+        self.y = y
+        self.candidates = list(candidates)
+        self.fit_intercept = bool(fit_intercept)
+        self.n = m.n
+        idx = [m.index[c] for c in self.candidates] + [m.index[y]]
+        S = m.comoment[np.ix_(idx, idx)].astype(float)
+        if not self.fit_intercept:
+            mu = m.mean[idx]
+            S = S + m.n * np.outer(mu, mu)
+        self.S0 = S
+        self.sst = float(m.comoment[m.index[y], m.index[y]])
+        self.criterion = criterion
+        self.crit = Criterion(criterion, self.n, self.sst)
+        self.k0 = 1 if self.fit_intercept else 0
+
+    @property
+    def p(self) -> int:
+        return len(self.candidates)
+
+    def state(self) -> tuple:
+        # lo mínimo para reconstruir el problema en un proceso hijo
+        return (self.S0, self.n, self.sst, self.criterion, self.k0)
+
+    def names(self, cols: Sequence[int]) -> List[str]:
+        return [self.candidates[j] for j in sorted(cols)]
+
+
+# ---------------- stepwise ----------------
+def stepwise(problem: SearchProblem, strategy: str, max_k: Optional[int] = None) -> Iterator[dict]:
+    """Un dict por paso (agregar/quitar) y un último {"done": True, ...} con el modelo elegido."""
+    p, k0, crit = problem.p, problem.k0, problem.crit
+    max_k = p if max_k is None else min(max_k, p)
+    A = problem.S0.copy()
+    diag0 = np.diag(problem.S0)[:p].copy()
+    y = p
+    current = set()
+    aliased = []  # colineales con las anteriores: fuera del modelo completo inicial
+    if strategy == "backward":
+        for j in range(p):
+            if A[j, j] <= SWEEP_TOL * diag0[j]:
+                aliased.append(problem.candidates[j])
+                continue
+            sweep(A, j)
+            current.add(j)
+    sse = float(A[y, y])
+    score = crit.score(sse, len(current) + k0)
+    yield {"step": 0, "action": "start", "variable": None, "columns": problem.names(current),
+           "sse": sse, problem.criterion: crit.value(sse, len(current) + k0), "aliased": aliased}
+
+    step = 0
+    while True:
+        best = None  # (score, action, j, sse)
+        if strategy in ("forward", "stepwise") and len(current) < max_k:
+            for j in range(p):
+                if j in current or A[j, j] <= SWEEP_TOL * diag0[j]:
+                    continue
+                k = len(current) + 1 + k0
+                if k >= problem.n:
+                    continue
+                s_new = max(sse - A[j, y] ** 2 / A[j, j], 0.0)
+                sc = crit.score(s_new, k)
+                if best is None or sc < best[0]:
+                    best = (sc, "add", j, s_new)
+        if strategy in ("backward", "stepwise") and current:
+            for j in current:
+                s_new = sse + A[j, y] ** 2 / -A[j, j]
+                sc = crit.score(s_new, len(current) - 1 + k0)
+                if best is None or sc < best[0]:
+                    best = (sc, "remove", j, s_new)
+        if best is None or not best[0] < score - 1e-12 * max(1.0, abs(score)):
+            break
+        score, action, j, _ = best
+        if action == "add":
+            sweep(A, j)
+            current.add(j)
+        else:
+            unsweep(A, j)
+            current.discard(j)
+        sse = max(float(A[y, y]), 0.0)
+        step += 1
+        yield {"step": step, "action": action, "variable": problem.candidates[j], "columns": problem.names(current),
+               "sse": sse, problem.criterion: crit.value(sse, len(current) + k0)}
+    yield {"done": True, "columns": problem.names(current), "steps": step}
+
+
+# ---------------- best subsets ----------------
+def _subset_task(state: tuple, p: int, prefix_bits: int, prefix: int, max_k: int, top: int) -> dict:
+    """Recorre en orden Gray los subconjuntos con los `prefix_bits` primeros bits fijos en `prefix`.
+
+    Devuelve el top global y el mejor por tamaño como [(score, sse, (j, ...))]. Corre en un proceso hijo.
+    """
+    S0, n, sst, criterion, k0 = state
+    crit = Criterion(criterion, n, sst)
+    A = S0.copy()
+    diag0 = np.diag(S0)[:p].copy()
+    y = p
+    swept = set()    # barridas de verdad
+    pending = set()  # "dentro" del subconjunto pero colineales: el modelo no se evalúa
+    heap: List[Tuple[float, float, tuple]] = []  # max-heap por -score (los top peores salen primero)
+    by_size: Dict[int, Tuple[float, float, tuple]] = {}
+    models = 0
+
+    def toggle(j: int) -> None:
+        if j in pending:
+            pending.discard(j)
+        elif j in swept:
+            unsweep(A, j)
+            swept.discard(j)
+            # sin j, una variable pendiente puede haber dejado de ser colineal
+            for i in sorted(pending):
+                if A[i, i] > SWEEP_TOL * diag0[i]:
+                    sweep(A, i)
+                    pending.discard(i)
+                    swept.add(i)
+        elif A[j, j] <= SWEEP_TOL * diag0[j]:
+            pending.add(j)
+        else:
+            sweep(A, j)
+            swept.add(j)
+
+    def visit() -> None:
+        nonlocal models
+        size = len(swept)
+        if pending or not 1 <= size <= max_k or size + k0 >= n:
+            return
+        models += 1
+        sse = max(float(A[y, y]), 0.0)
+        sc = crit.score(sse, size + k0)
+        cols = tuple(sorted(swept))
+        prev = by_size.get(size)
+        if prev is None or sc < prev[0]:
+            by_size[size] = (sc, sse, cols)
+        item = (-sc, sse, cols)
+        if len(heap) < top:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    for b in range(prefix_bits):
+        if prefix >> b & 1:
+            toggle(b)
+    visit()
+    free = p - prefix_bits
+    for i in range(1, 1 << free):
+        toggle(prefix_bits + ((i & -i).bit_length() - 1))
+        visit()
+    ranked = sorted(((-s, e, c) for s, e, c in heap))
+    return {"models": models, "ranked": ranked, "by_size": by_size}
+
+
+def subset_tasks(p: int, parallel: bool, workers: int) -> Tuple[int, List[int]]:
+    """(bits de prefijo, prefijos): tareas de a lo más 2^SUBSET_TASK_BITS modelos, y suficientes
+    para repartir entre `workers` procesos si corresponde."""
+    bits = max(p - SUBSET_TASK_BITS, 0)
+    if parallel and workers > 1 and (1 << p) >= SUBSET_PARALLEL_MIN_MODELS:
+        bits = max(bits, min(p, math.ceil(math.log2(workers * 4))))
+    return bits, list(range(1 << bits))
+
+
+def merge_ranked(acc: List[tuple], new: List[tuple], top: int) -> List[tuple]:
+    return heapq.nsmallest(top, acc + new)
+
+
+def merge_by_size(acc: dict, new: dict) -> dict:
+    for size, item in new.items():
+        if size not in acc or item[0] < acc[size][0]:
+            acc[size] = item
+    return acc
+
+
+def best_subsets(problem: SearchProblem, max_k: Optional[int], top: int, pool=None, workers: int = 1) -> Iterator[dict]:
+    """Un dict de progreso por tarea terminada (con el top parcial) y uno final {"done": True, ...}."""
+    p = problem.p
+    max_k = p if max_k is None else min(max_k, p)
+    bits, prefixes = subset_tasks(p, pool is not None, workers)
+    state = problem.state()
+    ranked: List[tuple] = []
+    by_size: dict = {}
+    models = 0
+    done = 0
+    if pool is None:
+        results = (_subset_task(state, p, bits, pre, max_k, top) for pre in prefixes)
+    else:
+        results = _as_completed(pool, [(state, p, bits, pre, max_k, top) for pre in prefixes])
+    for res in results:
+        done += 1
+        models += res["models"]
+        ranked = merge_ranked(ranked, res["ranked"], top)
+        by_size = merge_by_size(by_size, res["by_size"])
+        yield {"tasks_done": done, "tasks_total": len(prefixes), "models": models, "ranked": ranked}
+    yield {"done": True, "models": models, "ranked": ranked, "by_size": by_size}
+
+
+def _as_completed(pool, jobs: List[tuple]) -> Iterator[dict]:
+    # como concurrent.futures.as_completed, pero cancela lo pendiente si el consumidor se va
+    futures = {pool.submit(_subset_task, *job) for job in jobs}
+    try:
+        while futures:
+            finished, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for f in finished:
+                yield f.result()
+    finally:
+        for f in futures:
+            f.cancel()
@@ -0,0 +1,199 @@
+# backend/moments.py
+# Estadísticos suficientes por archivo: con n, medias y la matriz de co-momentos
+# centrada de TODAS las columnas numéricas se ajusta cualquier subconjunto (y, X)
+# en O(k^3) sin volver a tocar las filas.
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from columnar import read_schema
+from excel_cache import path_digest, read_excel_cached
+from solvers import DEFAULT_CONF_LEVELS, ols_summary, solve_gram
+
+MOMENTS_CACHE_MAX_ENTRIES = int(os.getenv("MOMENTS_CACHE_MAX_ENTRIES", "256"))
+
+
+class Moments:
+    """n, medias y C = (Z - media)'(Z - media) sobre las columnas numéricas Z.
+
+    Se guardan centrados (no la Gram cruda Z'Z) para no elevar al cuadrado el
+    número de condición en modelos con intercepto; la Gram cruda se reconstruye
+    como C + n·m·m' cuando hace falta (sin intercepto).
+    """
+
+    def __init__(self, names: List[str], n: int, mean: np.ndarray, comoment: np.ndarray, non_numeric: Iterable[str] = ()):
+        self.names = list(names)
+        self.non_numeric = list(non_numeric)  # columnas del archivo que no se pueden usar
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.n = int(n)
+        self.mean = mean
+        self.comoment = comoment
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray], non_numeric: Iterable[str] = ()) -> "Moments":
+        names = list(columns)
+        n = len(next(iter(columns.values()))) if columns else 0
+        A = np.empty((n, len(names)), dtype=float, order="F")
+        for j, name in enumerate(names):
+            A[:, j] = columns[name]
+        mean = A.mean(axis=0) if n else np.zeros(len(names))
+        A -= mean
+        return cls(names, n, mean, A.T @ A, non_numeric)
+
+    def covers(self, columns: List[str]) -> bool:
+        return all(c in self.index for c in columns)
+
+    def fit(self, y_column: str, x_columns: List[str], fit_intercept: bool,
+            conf_levels: Sequence[float] = DEFAULT_CONF_LEVELS, fields: Sequence[str] = ()) -> dict:
+        """Mismo dict que _ols (sin campos por fila); beta en orden [intercept] + x_columns."""
+        n = self.n
+        iy = self.index[y_column]
+        ix = [self.index[c] for c in x_columns]
+        C = self.comoment
+        syy = float(C[iy, iy])
+        if fit_intercept:
+            S = C[np.ix_(ix, ix)]
+            s = C[ix, iy]
+        else:
+            m = self.mean
+            S = C[np.ix_(ix, ix)] + n * np.outer(m[ix], m[ix])
+            s = C[ix, iy] + n * m[ix] * m[iy]
+            syy = syy + n * m[iy] * m[iy]
+
+        sol = solve_gram(S, s)
+        S_inv = sol.cov_unscaled
+        b = sol.beta
+        sse = max(float(syy - s @ b), 0.0)
+        sst = float(C[iy, iy])
+        yty = sst + n * float(self.mean[iy]) ** 2
+
+        k = len(ix) + (1 if fit_intercept else 0)
+        if fit_intercept:
+            # intercepto = media(y) - media(x)'b; Var = sigma^2 (1/n + mx' S^{-1} mx),
+            # Cov(b0, b) = -S^{-1} mx
+            mx = self.mean[ix]
+            b0 = float(self.mean[iy] - mx @ b)
+            beta = np.concatenate([[b0], b])
+            Smx = S_inv @ mx
+            cov = np.empty((k, k))
+            cov[0, 0] = 1.0 / n + mx @ Smx
+            cov[0, 1:] = cov[1:, 0] = -Smx
+            cov[1:, 1:] = S_inv
+            sol = sol._replace(beta=beta, cov_unscaled=cov, rank=sol.rank + 1)
+        else:
+            beta = b
+        return ols_summary(beta, np.diag(sol.cov_unscaled), sse, sst, n, k, sol,
+                           fit_intercept=fit_intercept, yty=yty, conf_levels=conf_levels, fields=fields)
+
+
+class MomentsAccumulator:
+    """Momentos acumulados por bloques de filas (fusión estable de Chan et al.).
+
+    Para cada bloque B: C = C_a + C_b + d d' · n_a n_b / n, con d = media_b - media_a.
+    """
+
+    def __init__(self, names: List[str]):
+        self.names = list(names)
+        p = len(self.names)
+        self.n = 0
+        self.mean = np.zeros(p)
+        self.comoment = np.zeros((p, p))
+
+    def update(self, A: np.ndarray) -> None:
+        nb = A.shape[0]
+        if nb == 0:
+            return
+        mean_b = A.mean(axis=0)
+        Ac = A - mean_b
+        C_b = Ac.T @ Ac
+        na = self.n
+        n = na + nb
+        d = mean_b - self.mean
+        self.comoment += C_b + np.outer(d, d) * (na * nb / n)
+        self.mean += d * (nb / n)
+        self.n = n
+
+    def result(self) -> Moments:
+        return Moments(self.names, self.n, self.mean.copy(), self.comoment.copy())
+
+
+class MomentsCache:
+    """LRU por hash de contenido del archivo (las matrices son chicas: p x p)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._items: "OrderedDict[str, Moments]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Moments]:
+        with self._lock:
+            m = self._items.get(key)
+            if m is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return m
+
+    def put(self, key: str, m: Moments) -> None:
+        with self._lock:
+            self._items[key] = m
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+            }
+
+
+moments_cache = MomentsCache(MOMENTS_CACHE_MAX_ENTRIES)
+
+
+def _numeric_columns(path: str, sidecar_dir: Optional[str]) -> Tuple[Dict[str, np.ndarray], List[str]]:
+    schema = read_schema(path, sidecar_dir)
+    if schema is not None:
+        sdir = Path(schema["dir"])
+        numeric = {
+            c["name"]: np.load(sdir / c["file"], mmap_mode="r", allow_pickle=False)
+            for c in schema["columns"] if c.get("numeric")
+        }
+        return numeric, [c["name"] for c in schema["columns"] if not c.get("numeric")]
+    df = read_excel_cached(path)
+    numeric, other = {}, []
+    for name in df.columns:
+        coerced = pd.to_numeric(df[name], errors="coerce")
+        if coerced.isna().any():
+            other.append(name)
+        else:
+            numeric[name] = coerced.to_numpy(dtype=float)
+    return numeric, other
+
+
+def moments_for_path(path: str, sidecar_dir: Optional[str] = None) -> Moments:
+    """Momentos del archivo (cacheados por hash de contenido, compartidos entre sesiones)."""
+    key = path_digest(path)
+    m = moments_cache.get(key)
+    if m is not None:
+        return m
+    m = Moments.from_columns(*_numeric_columns(path, sidecar_dir))
+    moments_cache.put(key, m)
+    return m
@@ -0,0 +1,114 @@
+# backend/offload.py
+# Pool acotado para las etapas CPU (parseo de Excel, coerción numérica, OLS) de los
+# endpoints async: así no bloquean el event loop y las rutas livianas (/api/state/*)
+# siguen respondiendo. Si el pool está saturado se rechaza con 429 en vez de encolar
+# sin límite. En modo "process" cada worker tiene sus propios cachés (excel_cache,
+# moments_cache), así que conviene solo con pocos workers de larga vida.
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from metrics import record_stage
+
+OFFLOAD_MODE = os.getenv("OFFLOAD_MODE", "thread")  # "thread" | "process"
+OFFLOAD_WORKERS = int(os.getenv("OFFLOAD_WORKERS", str(min(4, os.cpu_count() or 1))))
+OFFLOAD_MAX_PENDING = int(os.getenv("OFFLOAD_MAX_PENDING", str(OFFLOAD_WORKERS * 4)))
+
+
+class PoolSaturated(Exception):
+    """Hay OFFLOAD_MAX_PENDING tareas en curso o en cola."""
+
+
+def _timed_call(fn: Callable, args: tuple):
+    # corre en el worker (hilo o proceso): mide solo la ejecución, no la espera en cola
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t0
+
+
+class CpuPool:
+    def __init__(self, mode: str, workers: int, max_pending: int):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"OFFLOAD_MODE desconocido: '{mode}'")
+        self.mode = mode
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._rejected = 0
+        self._stages: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="cpu")
+        return self._executor
+
+    def _record(self, stage: str, wait: float, run: float) -> None:
+        with self._lock:
+            st = self._stages.setdefault(stage, {"count": 0, "run_s": 0.0, "wait_s": 0.0, "max_run_s": 0.0})
+            st["count"] += 1
+            st["run_s"] += run
+            st["wait_s"] += wait
+            st["max_run_s"] = max(st["max_run_s"], run)
+
+    async def run(self, stage: str, fn: Callable, *args: Any, timings: Optional[Dict[str, float]] = None):
+        """Ejecuta fn(*args) en el pool. En modo "process" fn y args deben ser picklables."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise PoolSaturated()
+            self._pending += 1
+        t0 = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            if self.mode == "thread":
+                # run_in_executor no copia el contexto: sin esto las subetapas no llegan a la traza del request
+                ctx = contextvars.copy_context()
+                result, run = await loop.run_in_executor(self._get_executor(), ctx.run, _timed_call, fn, args)
+            else:
+                result, run = await loop.run_in_executor(self._get_executor(), _timed_call, fn, args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+        total = time.perf_counter() - t0
+        self._record(stage, total - run, run)
+        record_stage(stage, run, total - run)
+        if timings is not None:
+            timings[stage] = round(timings.get(stage, 0.0) + total * 1000.0, 3)
+        return result
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            stages = {
+                name: {
+                    "count": int(st["count"]),
+                    "avg_run_ms": st["run_s"] / st["count"] * 1000.0,
+                    "avg_wait_ms": st["wait_s"] / st["count"] * 1000.0,
+                    "max_run_ms": st["max_run_s"] * 1000.0,
+                }
+                for name, st in self._stages.items()
+            }
+            return {
+                "mode": self.mode,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "rejected": self._rejected,
+                "stages": stages,
+            }
+
+
+cpu_pool = CpuPool(OFFLOAD_MODE, OFFLOAD_WORKERS, OFFLOAD_MAX_PENDING)
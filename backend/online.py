@@ -0,0 +1,365 @@
+# backend/online.py
+# Sesiones de regresión incrementales para el editor de tabla: en vez de re-enviar todas
+# las filas y reajustar desde cero, la sesión guarda el factor R (triangular superior) de
+# la matriz aumentada [X | y] y cada alta/baja/edición de fila lo actualiza con una
+# rotación de rango uno en O(k^2):
+#   alta:  R'R + z z'  (rotaciones de Givens)
+#   baja:  R'R - z z'  (rotaciones hiperbólicas; pueden fallar si la fila "sostenía" el rango)
+# De R salen beta = R_xx^{-1} r_xy y SSE = R[k, k]^2 sin volver a tocar las filas.
+# Cada ONLINE_REFACTOR_EVERY ediciones (o si una baja falla) se refactoriza con QR desde
+# las filas guardadas para acotar el error acumulado.
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy.linalg import solve_triangular
+
+from solvers import DEFAULT_CONF_LEVELS, SVD_RCOND, Solution, _scaled_cond_R, ols_summary, residual_fields, solve_ols
+
+ONLINE_REFACTOR_EVERY = int(os.getenv("ONLINE_REFACTOR_EVERY", "256"))
+ONLINE_SESSIONS_MAX = int(os.getenv("ONLINE_SESSIONS_MAX", "1000"))
+ONLINE_SESSION_TTL_S = float(os.getenv("ONLINE_SESSION_TTL_S", "3600"))
+ONLINE_MAX_ROWS = int(os.getenv("ONLINE_MAX_ROWS", "200000"))
+ONLINE_MAX_OPS = int(os.getenv("ONLINE_MAX_OPS", "10000"))
+# una baja que deja un pivote por debajo de esto (relativo) se considera perdida de precisión
+DOWNDATE_RTOL = 1e-8
+
+OPS = ("append", "insert", "set", "delete")
+
+
+class DowndateFailed(Exception):
+    """La baja dejaría R'R no definida positiva (o casi): hay que refactorizar."""
+
+
+def chol_update(R: np.ndarray, z: np.ndarray) -> None:
+    """R <- R' con R'^T R' = R^T R + z z^T (Givens, in place). Admite pivotes nulos."""
+    z = np.array(z, dtype=float)
+    m = R.shape[0]
+    for i in range(m):
+        a, b = R[i, i], z[i]
+        if b == 0.0:
+            continue
+        r = np.hypot(a, b)
+        c, s = a / r, b / r
+        R[i, i] = r
+        if i + 1 < m:
+            Ri = R[i, i + 1:].copy()
+            R[i, i + 1:] = c * Ri + s * z[i + 1:]
+            z[i + 1:] = c * z[i + 1:] - s * Ri
+
+
+def chol_downdate(R: np.ndarray, z: np.ndarray) -> None:
+    """R <- R' con R'^T R' = R^T R - z z^T (hiperbólicas, in place).
+
+    Lanza DowndateFailed sin modificar R si algún pivote se anula o pierde precisión.
+    """
+    R_new = R.copy()
+    z = np.array(z, dtype=float)
+    m = R.shape[0]
+    for i in range(m):
+        a, b = R_new[i, i], z[i]
+        if b == 0.0:
+            continue
+        r2 = (a - b) * (a + b)
+        if a <= 0.0 or r2 <= DOWNDATE_RTOL * a * a:
+            raise DowndateFailed(i)
+        r = np.sqrt(r2)
+        c, s = r / a, b / a
+        R_new[i, i] = r
+        if i + 1 < m:
+            R_new[i, i + 1:] = (R_new[i, i + 1:] - s * z[i + 1:]) / c
+            z[i + 1:] = c * z[i + 1:] - s * R_new[i, i + 1:]
+    R[...] = R_new
+
+
+def _qr_r(A: np.ndarray) -> np.ndarray:
+    """Factor R cuadrado (m x m) de A con diagonal >= 0 (también si A tiene menos filas que columnas)."""
+    m = A.shape[1]
+    R = np.zeros((m, m))
+    if A.shape[0]:
+        Rq = np.linalg.qr(A, mode="r")
+        R[:Rq.shape[0]] = Rq
+    sign = np.where(np.diag(R) < 0, -1.0, 1.0)
+    return R * sign[:, None]
+
+
+class OnlineRegression:
+    """Estado de una sesión: filas aumentadas [1?, x..., y], factor R y media/M2 de y (Welford)."""
+
+    def __init__(self, names: List[str], fit_intercept: bool, refactor_every: int = ONLINE_REFACTOR_EVERY):
+        self.names = list(names)          # columnas X (ordenadas, como _prepare_matrix)
+        self.fit_intercept = bool(fit_intercept)
+        self.k = len(self.names) + (1 if self.fit_intercept else 0)
+        self.refactor_every = refactor_every
+        self.rows: List[np.ndarray] = []
+        self.R = np.zeros((self.k + 1, self.k + 1))
+        self.y_mean = 0.0
+        self.y_m2 = 0.0
+        self.version = 0
+        self.since_refactor = 0
+        self.deltas = 0
+        self.updates = 0
+        self.downdates = 0
+        self.refactors = 0
+        self.forced_refactors = 0
+        self.last_drift = 0.0
+        self.lock = threading.Lock()
+        self.touched = time.monotonic()
+
+    @property
+    def n(self) -> int:
+        return len(self.rows)
+
+    def make_row(self, values: Dict[str, float], where: str) -> np.ndarray:
+        if not isinstance(values, dict):
+            raise ValueError(f"{where}: 'row' debe ser un objeto con 'y' y las columnas de X")
+        missing = [c for c in ["y"] + self.names if c not in values]
+        extra = [c for c in values if c != "y" and c not in self.names]
+        if missing or extra:
+            detail = "; ".join(p for p in (missing and f"faltan {', '.join(missing)}", extra and f"sobran {', '.join(extra)}") if p)
+            raise ValueError(f"{where}: columnas de 'row' no coinciden con la sesión ({detail})")
+        try:
+            z = np.array([1.0] * (self.k - len(self.names)) + [float(values[c]) for c in self.names] + [float(values["y"])])
+        except (TypeError, ValueError):
+            raise ValueError(f"{where}: 'row' debe contener únicamente números")
+        if not np.isfinite(z).all():
+            raise ValueError(f"{where}: 'row' debe contener únicamente números")
+        return z
+
+    # ---- estado completo
+    def load(self, y: np.ndarray, X: np.ndarray) -> None:
+        """Carga inicial (X ya incluye la columna de unos si corresponde)."""
+        A = np.column_stack([X, y.reshape(-1)])
+        self.rows = list(A)
+        self.refactor()
+        self.version += 1
+
+    def refactor(self, forced: bool = False) -> None:
+        A = np.vstack(self.rows) if self.rows else np.zeros((0, self.k + 1))
+        R = _qr_r(A)
+        if self.n and self.since_refactor and not forced:
+            # deriva acumulada desde la última refactorización (solo informativo)
+            old, new = self._beta_or_none(self.R), self._beta_or_none(R)
+            if old is not None and new is not None:
+                scale = max(float(np.linalg.norm(new)), 1e-300)
+                self.last_drift = float(np.linalg.norm(old - new)) / scale
+        self.R = R
+        y = A[:, -1]
+        self.y_mean = float(y.mean()) if self.n else 0.0
+        self.y_m2 = float(((y - self.y_mean) ** 2).sum()) if self.n else 0.0
+        self.since_refactor = 0
+        self.refactors += 1
+        if forced:
+            self.forced_refactors += 1
+
+    # ---- ediciones O(k^2)
+    def _add(self, z: np.ndarray) -> None:
+        chol_update(self.R, z)
+        self.updates += 1
+        n = self.n  # ya incluye la fila nueva
+        d = z[-1] - self.y_mean
+        self.y_mean += d / n
+        self.y_m2 += d * (z[-1] - self.y_mean)
+
+    def _remove(self, z: np.ndarray) -> None:
+        n = self.n  # ya sin la fila
+        if n == 0:
+            self.R[...] = 0.0
+            self.y_mean = self.y_m2 = 0.0
+            return
+        try:
+            chol_downdate(self.R, z)
+        except DowndateFailed:
+            self.refactor(forced=True)
+            return
+        self.downdates += 1
+        d = z[-1] - self.y_mean
+        self.y_mean -= d / n
+        self.y_m2 = max(self.y_m2 - d * (z[-1] - self.y_mean), 0.0)
+
+    def _replace(self, old: np.ndarray, z: np.ndarray) -> None:
+        # alta antes que baja: la baja nunca deja R singular a mitad de camino
+        chol_update(self.R, z)
+        self.updates += 1
+        try:
+            chol_downdate(self.R, old)
+        except DowndateFailed:
+            self.refactor(forced=True)
+            return
+        self.downdates += 1
+        d = z[-1] - old[-1]
+        prev = self.y_mean
+        self.y_mean += d / self.n
+        self.y_m2 = max(self.y_m2 + d * (z[-1] - self.y_mean + old[-1] - prev), 0.0)
+
+    def apply(self, ops: Sequence[tuple]) -> None:
+        """Aplica [(op, index, z)] ya validadas por `plan`; refactoriza si toca."""
+        if not ops:
+            return
+        for op, index, z in ops:
+            if op in ("append", "insert"):
+                self.rows.insert(index, z)
+                self._add(z)
+            elif op == "set":
+                old = self.rows[index]
+                self.rows[index] = z
+                self._replace(old, z)
+            else:
+                old = self.rows.pop(index)
+                self._remove(old)
+            self.since_refactor += 1
+            if self.since_refactor >= self.refactor_every:
+                self.refactor()
+        self.version += 1
+        self.deltas += 1
+
+    def plan(self, ops: Sequence[dict]) -> List[tuple]:
+        """Valida todas las operaciones (índices contra el largo simulado) antes de tocar nada."""
+        if len(ops) > ONLINE_MAX_OPS:
+            raise ValueError(f"Máximo {ONLINE_MAX_OPS} operaciones por delta")
+        n = self.n
+        out = []
+        for i, op in enumerate(ops):
+            kind, index, row = op.get("op"), op.get("index"), op.get("row")
+            where = f"Operación {i}"
+            if kind not in OPS:
+                raise ValueError(f"{where}: '{kind}' no válida ({', '.join(OPS)})")
+            if kind == "append":
+                index = n if index is None else index
+                if index != n:
+                    raise ValueError(f"{where}: 'append' agrega al final (índice {n})")
+            limit = n + 1 if kind in ("append", "insert") else n
+            if index is None or not 0 <= index < limit:
+                raise ValueError(f"{where}: índice {index} fuera de rango (0..{limit - 1})")
+            if kind == "delete":
+                out.append((kind, index, None))
+                n -= 1
+                continue
+            if row is None:
+                raise ValueError(f"{where}: '{kind}' requiere 'row'")
+            out.append((kind, index, self.make_row(row, where)))
+            if kind != "set":
+                n += 1
+                if n > ONLINE_MAX_ROWS:
+                    raise ValueError(f"La sesión admite hasta {ONLINE_MAX_ROWS} filas")
+        return out
+
+    # ---- ajuste
+    def _beta_or_none(self, R: np.ndarray) -> Optional[np.ndarray]:
+        k = self.k
+        diag = np.abs(np.diag(R)[:k])
+        if k == 0 or self.n < k or diag.min() <= diag.max() * SVD_RCOND:
+            return None
+        return solve_triangular(R[:k, :k], R[:k, k])
+
+    def fit(self, conf_levels: Sequence[float] = DEFAULT_CONF_LEVELS, fields: Sequence[str] = ()) -> dict:
+        """Mismo dict que _ols. Desde R si tiene rango completo; si no, sobre las filas (SVD)."""
+        n, k = self.n, self.k
+        if n == 0:
+            raise ValueError("La sesión no tiene filas")
+        sst = self.y_m2
+        yty = sst + n * self.y_mean ** 2
+        Rxx = np.triu(self.R[:k, :k])
+        beta = self._beta_or_none(self.R)
+        A = None
+        if beta is not None:
+            R_inv = solve_triangular(Rxx, np.eye(k))
+            sol = Solution(beta, R_inv @ R_inv.T, "online-qr", _scaled_cond_R(Rxx), k)
+            sse = float(self.R[k, k]) ** 2
+        else:
+            # deficiente en rango (p. ej. menos filas que columnas): pseudo-inversa sobre las filas
+            A = np.vstack(self.rows)
+            sol = solve_ols(A[:, :k], A[:, k], "svd")
+            e = A[:, k] - A[:, :k] @ sol.beta
+            sse = float(e @ e)
+        out = ols_summary(sol.beta, np.diag(sol.cov_unscaled), sse, sst, n, k, sol,
+                          fit_intercept=self.fit_intercept, yty=yty, conf_levels=conf_levels, fields=fields)
+        if any(f in fields for f in ("fitted", "residuals", "diagnostics")):
+            A = np.vstack(self.rows) if A is None else A
+            fitted = A[:, :k] @ sol.beta
+            out.update(residual_fields(A[:, k] - fitted, fitted, out["sigma2"], fields))
+        return out
+
+    def info(self) -> dict:
+        return {
+            "version": self.version,
+            "n_rows": self.n,
+            "columns": self.names,
+            "fit_intercept": self.fit_intercept,
+            "edits_since_refactor": self.since_refactor,
+            "refactor_every": self.refactor_every,
+            "last_drift": self.last_drift,
+        }
+
+
+class OnlineSessionStore:
+    """Sesiones por sid en memoria (LRU + expiración por inactividad). Son estado derivado:
+    si se pierden (reinicio, expulsión) el cliente recrea la sesión con las filas completas."""
+
+    def __init__(self, max_sessions: int, ttl_s: float):
+        self.max_sessions = max_sessions
+        self.ttl_s = ttl_s
+        self._items: "OrderedDict[str, OnlineRegression]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def _expire(self, now: float) -> None:
+        while self._items:
+            sid, s = next(iter(self._items.items()))
+            if now - s.touched <= self.ttl_s:
+                break
+            del self._items[sid]
+            self.expired += 1
+
+    def get(self, sid: str) -> Optional[OnlineRegression]:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            s = self._items.get(sid)
+            if s is not None:
+                s.touched = now
+                self._items.move_to_end(sid)
+            return s
+
+    def put(self, sid: str, s: OnlineRegression) -> None:
+        now = time.monotonic()
+        with self._lock:
+            s.touched = now
+            self._items[sid] = s
+            self._items.move_to_end(sid)
+            self.created += 1
+            self._expire(now)
+            while len(self._items) > self.max_sessions:
+                self._items.popitem(last=False)
+                self.evicted += 1
+
+    def discard(self, sid: str) -> bool:
+        with self._lock:
+            return self._items.pop(sid, None) is not None
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions = list(self._items.values())
+            return {
+                "sessions": len(sessions),
+                "max_sessions": self.max_sessions,
+                "ttl_s": self.ttl_s,
+                "rows": sum(s.n for s in sessions),
+                "created": self.created,
+                "evicted": self.evicted,
+                "expired": self.expired,
+                "deltas": sum(s.deltas for s in sessions),
+                "updates": sum(s.updates for s in sessions),
+                "downdates": sum(s.downdates for s in sessions),
+                "refactors": sum(s.refactors for s in sessions),
+                "forced_refactors": sum(s.forced_refactors for s in sessions),
+                "max_drift": max((s.last_drift for s in sessions), default=0.0),
+            }
+
+
+online_sessions = OnlineSessionStore(ONLINE_SESSIONS_MAX, ONLINE_SESSION_TTL_S)
@@ -0,0 +1,148 @@
+# backend/profiling.py
+# Perfilador por muestreo, opcional y por request: con PROFILE_ENABLED=1, un request con
+# ?profile=1 o el header "X-Profile: 1" arranca un hilo que cada PROFILE_INTERVAL_MS toma
+# sys._current_frames() y cuenta las pilas de los hilos ocupados (se descartan los que
+# esperan en una cola, un lock o el selector del event loop). Los requests que no lo piden no
+# pagan nada. El resultado queda en memoria (los últimos PROFILE_KEEP) y se lee en
+# GET /api/profiles/{id}, con el id en el header X-Profile-Id: funciones con más muestras y
+# pilas en formato "folded" (flamegraph.pl / speedscope). Muestrea todo el proceso: con otros
+# requests en paralelo sus pilas se mezclan, así que conviene usarlo con poca carga.
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Optional
+
+PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "0").lower() in ("1", "true", "yes")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_MAX_S = float(os.getenv("PROFILE_MAX_S", "60"))   # tope de muestreo por request
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+PROFILE_MAX_DEPTH = 64
+PROFILE_TOP = 30
+
+# hoja de la pila de un hilo que no está trabajando: (archivo, función)
+_IDLE = {("threading.py", "wait"), ("selectors.py", "select"), ("thread.py", "_worker"),
+         ("queue.py", "get"), ("base_events.py", "_run_once")}
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({Path(code.co_filename).name})"
+
+
+class Sampler:
+    def __init__(self, path: str, interval_s: float, max_s: float):
+        self.id = uuid.uuid4().hex[:16]
+        self.path = path
+        self.interval_s = interval_s
+        self.max_s = max_s
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._t0 = time.perf_counter()
+        self.elapsed_s = 0.0
+        self._thread = threading.Thread(target=self._loop, name=f"profile-{self.id}", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def _loop(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval_s) and time.perf_counter() - self._t0 < self.max_s:
+            for tid, frame in sys._current_frames().items():
+                if tid == own:
+                    continue
+                code = frame.f_code
+                if (Path(code.co_filename).name, code.co_name) in _IDLE:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < PROFILE_MAX_DEPTH:
+                    stack.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def stop(self) -> dict:
+        self._stop.set()
+        self._thread.join()
+        self.elapsed_s = time.perf_counter() - self._t0
+        return self.result()
+
+    def result(self) -> dict:
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, n in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += n
+            for f in set(frames):
+                total[f] += n
+        top = [{"function": f, "self": n, "total": total[f]} for f, n in own.most_common(PROFILE_TOP)]
+        return {
+            "id": self.id,
+            "path": self.path,
+            "samples": self.samples,
+            "interval_ms": self.interval_s * 1000.0,
+            "duration_ms": round(self.elapsed_s * 1000.0, 3),
+            "top": top,
+            "folded": [f"{s} {n}" for s, n in self.stacks.most_common()],
+        }
+
+
+class ProfileStore:
+    def __init__(self, enabled: bool, interval_ms: float, max_s: float, keep: int):
+        self.enabled = enabled
+        self.interval_s = interval_ms / 1000.0
+        self.max_s = max_s
+        self.keep = keep
+        self._items: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.started = 0
+
+    def wanted(self, scope) -> bool:
+        """?profile=1 o header X-Profile: 1 (solo si está habilitado)."""
+        if not self.enabled:
+            return False
+        for name, value in scope.get("headers", ()):
+            if name == b"x-profile" and value.strip() in (b"1", b"true"):
+                return True
+        query = scope.get("query_string", b"").split(b"&")
+        return b"profile=1" in query or b"profile=true" in query
+
+    def begin(self, path: str) -> Sampler:
+        s = Sampler(path, self.interval_s, self.max_s)
+        with self._lock:
+            self.started += 1
+            self._items[s.id] = {"id": s.id, "path": path, "status": "running"}
+            self._trim()
+        s.start()
+        return s
+
+    def finish(self, s: Sampler) -> None:
+        out = s.stop()
+        out["status"] = "done"
+        with self._lock:
+            self._items[s.id] = out
+            self._trim()
+
+    def _trim(self) -> None:
+        while len(self._items) > self.keep:
+            self._items.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        with self._lock:
+            return self._items.get(profile_id)
+
+    def list(self) -> list:
+        with self._lock:
+            return [{"id": p["id"], "path": p["path"], "status": p["status"], "samples": p.get("samples"),
+                     "duration_ms": p.get("duration_ms")} for p in reversed(self._items.values())]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"enabled": self.enabled, "interval_ms": self.interval_s * 1000.0, "kept": len(self._items),
+                    "started": self.started}
+
+
+profile_store = ProfileStore(PROFILE_ENABLED, PROFILE_INTERVAL_MS, PROFILE_MAX_S, PROFILE_KEEP)
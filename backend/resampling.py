@@ -0,0 +1,259 @@
+# backend/resampling.py
+# Inferencia por remuestreo para los estimadores de mínimos cuadrados (?resample=...):
+#   pairs        bootstrap de pares (filas): pesos por conteo W (B x n) y soluciones en lote
+#                G_b = X' diag(w_b) X, g_b = X' diag(w_b) y (np.linalg.solve apilado)
+#   residual     bootstrap de residuos: y* = Xb + e*, beta* = beta + e* X (X'X)^{-1} (un matmul)
+#   permutation  test de permutación por coeficiente (Freedman-Lane): se permutan los
+#                residuos del modelo sin x_j y se compara |t_j*| con el t observado
+# Las réplicas se generan por bloques de RESAMPLE_BLOCK con semillas hijas de
+# SeedSequence(seed): el resultado es el mismo con o sin procesos y con cualquier número
+# de workers. Intervalos percentil y BCa (aceleración por jackknife en forma cerrada).
+import math
+import os
+import time
+from concurrent.futures import Executor
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+from scipy.special import ndtr, ndtri
+
+RESAMPLE_METHODS = ("pairs", "residual", "permutation")
+RESAMPLE_B_DEFAULT = 1000
+RESAMPLE_B_MIN = 20
+RESAMPLE_B_MAX = int(os.getenv("RESAMPLE_B_MAX", "100000"))
+RESAMPLE_BLOCK = 500                     # réplicas por semilla hija (fijo: define la secuencia)
+RESAMPLE_BATCH_ELEMS = int(os.getenv("RESAMPLE_BATCH_ELEMS", str(4_000_000)))  # tope b·n·k por lote
+RESAMPLE_PARALLEL_MIN_WORK = float(os.getenv("RESAMPLE_PARALLEL_MIN_WORK", "2e8"))  # B·n·k
+
+
+def parse_resample(kind: Optional[str], n_boot: Optional[str], seed: Optional[str]):
+    """(método | None, B, semilla | None). Sin semilla queda None: la sortea resample() y la
+    devuelve en la respuesta, y la clave de cache/dedup es la misma para pedidos iguales."""
+    kind = (kind or "").strip().lower() or None
+    if kind is None:
+        if n_boot or seed:
+            raise ValueError("'B' y 'seed' solo aplican con 'resample'")
+        return None, 0, None
+    if kind not in RESAMPLE_METHODS:
+        raise ValueError(f"Remuestreo desconocido '{kind}'. Opciones: {', '.join(RESAMPLE_METHODS)}")
+    try:
+        B = int(n_boot) if n_boot else RESAMPLE_B_DEFAULT
+        s = int(seed) if seed else None
+    except ValueError:
+        raise ValueError("'B' y 'seed' deben ser enteros")
+    if not RESAMPLE_B_MIN <= B <= RESAMPLE_B_MAX:
+        raise ValueError(f"'B' debe estar entre {RESAMPLE_B_MIN} y {RESAMPLE_B_MAX}")
+    if s is not None and s < 0:
+        raise ValueError("'seed' debe ser un entero no negativo")
+    return kind, B, s
+
+
+def _batch_rows(n: int, k: int, size: int) -> int:
+    return max(1, min(size, RESAMPLE_BATCH_ELEMS // max(n * k, 1)))
+
+
+def _pairs_block(X: np.ndarray, y: np.ndarray, size: int, seq: np.random.SeedSequence) -> np.ndarray:
+    rng = np.random.default_rng(seq)
+    n, k = X.shape
+    out = np.full((size, k), np.nan)
+    # productos por fila x_i x_i' (n x k^2) y x_i y_i: G y g de todas las réplicas en un solo GEMM
+    outer = n * k * k <= RESAMPLE_BATCH_ELEMS
+    if outer:
+        XX = (X[:, :, None] * X[:, None, :]).reshape(n, k * k)
+        Xy = X * y[:, None]
+    step = _batch_rows(n, 1 if outer else k, size)
+    for start in range(0, size, step):
+        b = min(step, size - start)
+        idx = rng.integers(0, n, size=(b, n))
+        # conteos por réplica (matriz de índices apilada -> pesos enteros)
+        W = np.bincount((idx + (np.arange(b) * n)[:, None]).ravel(), minlength=b * n).reshape(b, n).astype(float)
+        if outer:
+            G = (W @ XX).reshape(b, k, k)
+            g = W @ Xy
+        else:
+            WX = W[:, :, None] * X                              # (b, n, k)
+            G = np.einsum("bnk,nj->bkj", WX, X, optimize=True)
+            g = np.einsum("bnk,n->bk", WX, y, optimize=True)
+        try:
+            out[start:start + b] = np.linalg.solve(G, g[:, :, None])[:, :, 0]
+        except np.linalg.LinAlgError:
+            # alguna réplica singular (p. ej. pocas filas distintas): se resuelven una a una
+            for i in range(b):
+                try:
+                    out[start + i] = np.linalg.solve(G[i], g[i])
+                except np.linalg.LinAlgError:
+                    pass
+    return out
+
+
+def _residual_block(resid: np.ndarray, PT: np.ndarray, beta: np.ndarray,
+                    size: int, seq: np.random.SeedSequence) -> np.ndarray:
+    rng = np.random.default_rng(seq)
+    n, k = PT.shape
+    out = np.empty((size, k))
+    step = _batch_rows(n, 1, size)
+    for start in range(0, size, step):
+        b = min(step, size - start)
+        E = resid[rng.integers(0, n, size=(b, n))]
+        out[start:start + b] = beta + E @ PT
+    return out
+
+
+def _permutation_block(X: np.ndarray, PT: np.ndarray, xtx_diag: np.ndarray, reduced: List[Optional[tuple]],
+                       size: int, seq: np.random.SeedSequence) -> np.ndarray:
+    """|t_j*| para cada coeficiente j con modelo reducido (NaN donde no se prueba)."""
+    rng = np.random.default_rng(seq)
+    n, k = X.shape
+    dof = max(n - k, 1)
+    out = np.full((size, k), np.nan)
+    step = _batch_rows(n, 2, size)
+    base = np.arange(n)
+    for start in range(0, size, step):
+        b = min(step, size - start)
+        perm = rng.permuted(np.broadcast_to(base, (b, n)), axis=1)
+        for j, red in enumerate(reduced):
+            if red is None:
+                continue
+            fitted_r, resid_r = red
+            Y = fitted_r + resid_r[perm]                      # (b, n)
+            Bt = Y @ PT                                       # (b, k)
+            R = Y - Bt @ X.T
+            se = np.sqrt((R * R).sum(axis=1) / dof * xtx_diag[j])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                out[start:start + b, j] = np.abs(Bt[:, j]) / se
+    return out
+
+
+def _blocks(B: int, seed: int):
+    sizes = [min(RESAMPLE_BLOCK, B - i) for i in range(0, B, RESAMPLE_BLOCK)]
+    return list(zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))))
+
+
+def _run_blocks(fn, args: tuple, blocks, pool: Optional[Executor],
+                progress: Optional[Callable[[int, int], None]] = None) -> np.ndarray:
+    # progress(hechos, total) tras cada bloque; si lanza (trabajo cancelado) se descarta lo pendiente
+    out = []
+    if pool is None:
+        for size, seq in blocks:
+            out.append(fn(*args, size, seq))
+            if progress is not None:
+                progress(len(out), len(blocks))
+        return np.vstack(out)
+    futures = [pool.submit(fn, *args, size, seq) for size, seq in blocks]
+    try:
+        for f in futures:  # en orden de bloque: reproducible
+            out.append(f.result())
+            if progress is not None:
+                progress(len(out), len(blocks))
+    finally:
+        for f in futures:
+            f.cancel()
+    return np.vstack(out)
+
+
+def _bca_limits(reps: np.ndarray, beta: np.ndarray, jack_u: np.ndarray, alphas: np.ndarray) -> np.ndarray:
+    """Cuantiles BCa ajustados (k x len(alphas)) a partir de las réplicas válidas."""
+    B = reps.shape[0]
+    prop = (reps < beta).mean(axis=0) + 0.5 * (reps == beta).mean(axis=0)
+    z0 = ndtri(np.clip(prop, 1.0 / (B + 1), B / (B + 1.0)))
+    num = (jack_u ** 3).sum(axis=0)
+    den = 6.0 * (jack_u ** 2).sum(axis=0) ** 1.5
+    with np.errstate(divide="ignore", invalid="ignore"):
+        a = np.where(den > 0, num / den, 0.0)
+    z = ndtri(alphas)[None, :]
+    zz = z0[:, None] + z
+    with np.errstate(divide="ignore", invalid="ignore"):
+        adj = ndtr(z0[:, None] + zz / (1.0 - a[:, None] * zz))
+    return np.nan_to_num(adj, nan=0.5)
+
+
+def _intervals(reps: np.ndarray, beta: np.ndarray, jack_u: np.ndarray, names: List[str],
+               conf_levels: Sequence[float]) -> dict:
+    pct, bca = {}, {}
+    for level in conf_levels:
+        lo_hi = np.array([(1.0 - level) / 2.0, (1.0 + level) / 2.0])
+        q = np.quantile(reps, lo_hi, axis=0).T                 # (k, 2)
+        adj = _bca_limits(reps, beta, jack_u, lo_hi)
+        qb = np.array([np.quantile(reps[:, j], adj[j]) for j in range(reps.shape[1])])
+        key = f"{level:g}"
+        pct[key] = {nm: q[j].tolist() for j, nm in enumerate(names)}
+        bca[key] = {nm: qb[j].tolist() for j, nm in enumerate(names)}
+    return {"percentile": pct, "bca": bca}
+
+
+def resample(X: np.ndarray, y: np.ndarray, beta: np.ndarray, xtx_inv: np.ndarray, names: List[str],
+             fit_intercept: bool, kind: str, B: int, seed: Optional[int], conf_levels: Sequence[float],
+             pool_factory: Optional[Callable[[], Executor]] = None,
+             progress: Optional[Callable[[int, int], None]] = None) -> dict:
+    """Bloque "resampling" de la respuesta. X, y ya ponderados si es WLS; beta = solución de X, y.
+
+    Sin `seed` se sortea una; va en la respuesta ("seed_drawn": true) para poder repetir el resultado.
+    """
+    t0 = time.perf_counter()
+    drawn = seed is None
+    if drawn:
+        seed = int(np.random.SeedSequence().generate_state(1)[0])
+    n, k = X.shape
+    beta = np.asarray(beta, dtype=float).reshape(-1)
+    fitted = X @ beta
+    resid = y - fitted
+    PT = X @ xtx_inv                                           # (n, k): beta(y) = y @ PT
+    blocks = _blocks(B, seed)
+    parallel = pool_factory is not None and B * n * k >= RESAMPLE_PARALLEL_MIN_WORK and len(blocks) > 1
+    use_pool = pool_factory() if parallel else None
+    out = {"method": kind, "B": B, "seed": seed, "seed_drawn": drawn, "blocks": len(blocks),
+           "parallel": use_pool is not None}
+
+    if kind == "permutation":
+        # Freedman-Lane: modelo reducido sin x_j (el intercepto no se prueba)
+        reduced: List[Optional[tuple]] = []
+        for j in range(k):
+            if fit_intercept and j == 0:
+                reduced.append(None)
+                continue
+            Xr = np.delete(X, j, axis=1)
+            fr = Xr @ np.linalg.lstsq(Xr, y, rcond=None)[0] if Xr.shape[1] else np.zeros(n)
+            reduced.append((fr, y - fr))
+        dof = max(n - k, 1)
+        se_obs = np.sqrt(float(resid @ resid) / dof * np.diag(xtx_inv))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t_obs = np.where(se_obs > 0, np.abs(beta) / se_obs, 0.0)
+        t_star = _run_blocks(_permutation_block, (X, PT, np.diag(xtx_inv), reduced), blocks, use_pool, progress)
+        # tolerancia relativa: empates numéricos cuentan como "al menos tan extremo"
+        hits = (t_star >= t_obs * (1.0 - 1e-10)).sum(axis=0)
+        p = (1.0 + hits) / (B + 1.0)
+        out["p_values"] = {nm: (None if reduced[j] is None else float(p[j])) for j, nm in enumerate(names)}
+        out["elapsed_ms"] = (time.perf_counter() - t0) * 1000
+        return out
+
+    if kind == "pairs":
+        # pendientes centradas (x - m·c, con c la columna del intercepto: unos, o sqrt(w) en WLS):
+        # misma recta de soluciones, G mejor condicionada; el intercepto se recupera después
+        off = 1 if fit_intercept else 0
+        mean = X[:, off:].mean(axis=0) if off else None
+        Xc = X.copy()
+        if off:
+            Xc[:, off:] -= np.outer(X[:, 0], mean)
+        reps = _run_blocks(_pairs_block, (Xc, y), blocks, use_pool, progress)
+        if off:
+            reps[:, 0] -= reps[:, off:] @ mean
+    else:
+        # residuos centrados y reescalados por sqrt(n / (n - k)) (varianza insesgada)
+        e = (resid - resid.mean()) * math.sqrt(n / max(n - k, 1))
+        reps = _run_blocks(_residual_block, (e, PT, beta), blocks, use_pool, progress)
+
+    ok = np.isfinite(reps).all(axis=1)
+    reps = reps[ok]
+    out["failed"] = int((~ok).sum())
+    if reps.shape[0] < 2:
+        raise ValueError("El remuestreo no produjo réplicas válidas (datos degenerados)")
+    # jackknife en forma cerrada: beta_(i) = beta - (X'X)^{-1} x_i e_i / (1 - h_i)
+    h = np.einsum("ij,ij->i", PT, X)
+    D = PT * (resid / np.clip(1.0 - h, np.finfo(float).eps, None))[:, None]
+    jack_u = D - D.mean(axis=0)
+    se = reps.std(axis=0, ddof=1)
+    out["std_errors"] = dict(zip(names, se.tolist()))
+    out["bias"] = dict(zip(names, (reps.mean(axis=0) - beta).tolist()))
+    out["conf_int"] = _intervals(reps, beta, jack_u, names, conf_levels)
+    out["elapsed_ms"] = (time.perf_counter() - t0) * 1000
+    return out
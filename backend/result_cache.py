@@ -0,0 +1,148 @@
+# backend/result_cache.py
+# Memo de respuestas de regresión por (hash de contenido del archivo, especificación
+# normalizada): reenviar la misma especificación, o pedirla desde otra sesión que subió
+# el mismo archivo, no recalcula. Nivel en memoria (LRU con TTL) + nivel persistente
+# opcional en SQLite que sobrevive reinicios.
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence, Tuple
+
+from state_db import ResultCacheEntry, SessionLocal
+
+logger = logging.getLogger("regresiones")
+
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024"))
+RESULT_CACHE_TTL_S = float(os.getenv("RESULT_CACHE_TTL_S", str(24 * 3600)))
+RESULT_CACHE_PERSIST = os.getenv("RESULT_CACHE_PERSIST", "1").lower() not in ("0", "false", "no")
+RESULT_CACHE_DB_MAX_ROWS = int(os.getenv("RESULT_CACHE_DB_MAX_ROWS", "20000"))
+RESULT_FORMAT_VERSION = 1  # subir si cambia el formato de las respuestas (invalida lo persistido)
+_PRUNE_EVERY = 200
+
+
+def result_key(file_digest: str, y_column: str, xs: List[str], fit_intercept: bool,
+               conf_levels: Sequence[float], fields: Sequence[str], estimator: Optional[dict] = None) -> str:
+    spec = {
+        "v": RESULT_FORMAT_VERSION,
+        "file": file_digest,
+        "y": y_column,
+        "X": sorted(xs),
+        "fit_intercept": bool(fit_intercept),
+        "conf_levels": sorted(float(v) for v in conf_levels),
+        "fields": sorted(fields),
+    }
+    if estimator:  # solo métodos distintos de OLS: las claves de OLS no cambian
+        spec["estimator"] = estimator
+    return hashlib.sha256(json.dumps(spec, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Las respuestas se guardan serializadas: cada get devuelve una copia nueva."""
+
+    def __init__(self, max_entries: int, ttl_s: float, persist: bool, db_max_rows: int):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.persist = persist
+        self.db_max_rows = db_max_rows
+        self._items: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.hits_memory = 0
+        self.hits_db = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Tuple[Optional[dict], str]:
+        """(respuesta, "memory" | "db") o (None, "miss")."""
+        now = time.time()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and now - item[0] <= self.ttl_s:
+                self._items.move_to_end(key)
+                self.hits_memory += 1
+                return json.loads(item[1]), "memory"
+            if item is not None:
+                del self._items[key]
+        payload = self._db_get(key, now) if self.persist else None
+        with self._lock:
+            if payload is None:
+                self.misses += 1
+                return None, "miss"
+            self.hits_db += 1
+            self._store(key, payload, now)
+        return json.loads(payload), "db"
+
+    def put(self, key: str, resp: dict) -> None:
+        payload = json.dumps(resp, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._store(key, payload, now)
+            self._puts += 1
+            prune = self._puts % _PRUNE_EVERY == 0
+        if self.persist:
+            self._db_put(key, payload, prune)
+
+    def _store(self, key: str, payload: str, ts: float) -> None:
+        self._items[key] = (ts, payload)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    def _db_get(self, key: str, now: float) -> Optional[str]:
+        try:
+            with SessionLocal() as db:
+                row = db.get(ResultCacheEntry, key)
+                if row is None:
+                    return None
+                if row.created_at < datetime.utcfromtimestamp(now) - timedelta(seconds=self.ttl_s):
+                    db.delete(row)
+                    db.commit()
+                    return None
+                return row.result_json
+        except Exception as e:  # el nivel persistente es opcional: nunca rompe el cálculo
+            logger.warning("Cache de resultados (SQLite) no disponible: %s", e)
+            return None
+
+    def _db_put(self, key: str, payload: str, prune: bool) -> None:
+        try:
+            with SessionLocal() as db:
+                db.merge(ResultCacheEntry(key=key, result_json=payload, created_at=datetime.utcnow()))
+                if prune:
+                    self._db_prune(db)
+                db.commit()
+        except Exception as e:
+            logger.warning("No se pudo persistir el resultado en cache: %s", e)
+
+    def _db_prune(self, db) -> None:
+        # vencidos por TTL y, si sobran filas, las más antiguas
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_s)
+        db.query(ResultCacheEntry).filter(ResultCacheEntry.created_at < cutoff).delete(synchronize_session=False)
+        keep = (db.query(ResultCacheEntry.created_at).order_by(ResultCacheEntry.created_at.desc())
+                .offset(self.db_max_rows).limit(1).scalar())
+        if keep is not None:
+            db.query(ResultCacheEntry).filter(ResultCacheEntry.created_at <= keep).delete(synchronize_session=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits_memory + self.hits_db + self.misses
+            return {
+                "entries": len(self._items),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "persist": self.persist,
+                "hits_memory": self.hits_memory,
+                "hits_db": self.hits_db,
+                "misses": self.misses,
+                "hit_ratio": ((self.hits_memory + self.hits_db) / total) if total else 0.0,
+            }
+
+
+result_cache = ResultCache(RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_TTL_S, RESULT_CACHE_PERSIST, RESULT_CACHE_DB_MAX_ROWS)
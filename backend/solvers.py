@@ -0,0 +1,259 @@
+# backend/solvers.py
+# Resolución de mínimos cuadrados sin invertir X'X explícitamente.
+#   cholesky: rápido, válido si X está bien condicionada (el error crece con cond(X)^2)
+#   qr:       estable, error ~ cond(X)
+#   svd:      deficiente en rango / casi singular (pseudo-inversa truncada)
+# "auto" elige según el número de condición de X con columnas equilibradas.
+import os
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+from scipy.linalg import cho_solve, solve_triangular
+
+import distributions
+
+COND_CHOLESKY_MAX = float(os.getenv("OLS_COND_CHOLESKY_MAX", "1e4"))
+COND_QR_MAX = float(os.getenv("OLS_COND_QR_MAX", "1e10"))
+SVD_RCOND = 1e-12
+COND_CAP = 1.0 / np.finfo(float).eps  # "al menos así de grande" (JSON no admite inf)
+
+METHODS = ("auto", "cholesky", "qr", "svd")
+DEFAULT_CONF_LEVELS = (0.95,)
+# campos pesados bajo demanda (?fields=...); los de ROW_FIELDS necesitan los residuos por fila
+ROW_FIELDS = ("fitted", "residuals", "diagnostics")
+RESULT_FIELDS = ROW_FIELDS + ("cov",)
+
+
+class Solution(NamedTuple):
+    beta: np.ndarray          # (k,)
+    cov_unscaled: np.ndarray  # (X'X)^{-1} (o su pseudo-inversa), k x k
+    method: str
+    cond: float               # número de condición de X equilibrada
+    rank: int
+
+
+def _scaled_gram_cond(G: np.ndarray) -> float:
+    """cond(X) a partir de G = X'X, equilibrando columnas (cond independiente de unidades).
+
+    Desde G la estimación satura alrededor de 1e8 (cond(G) = cond(X)^2); sirve para
+    decidir si Cholesky es seguro, no para medir casos peores.
+    """
+    d = np.sqrt(np.diag(G))
+    d[d == 0] = 1.0
+    ev = np.linalg.eigvalsh(G / np.outer(d, d))
+    lo, hi = float(ev[0]), float(ev[-1])
+    if hi <= 0 or lo <= hi / COND_CAP:
+        return COND_CAP
+    return float(np.sqrt(hi / lo))
+
+
+def _scaled_cond_R(R: np.ndarray) -> float:
+    """cond(X) exacto desde el factor R de X = QR (misma equilibración por columnas)."""
+    d = np.linalg.norm(R, axis=0)
+    d[d == 0] = 1.0
+    s = np.linalg.svd(R / d, compute_uv=False)
+    if s.size == 0 or s[-1] <= s[0] / COND_CAP:
+        return COND_CAP
+    return float(s[0] / s[-1])
+
+
+def choose_method(cond: float) -> str:
+    # desde X'X solo se distingue "seguro para Cholesky" o no; QR decide luego si hace falta SVD
+    return "cholesky" if cond <= COND_CHOLESKY_MAX else "qr"
+
+
+def _cholesky_gram(G: np.ndarray, g: np.ndarray):
+    L = np.linalg.cholesky(G)
+    # L es triangular inferior: sustitución hacia adelante, no una solve general LU
+    L_inv = solve_triangular(L, np.eye(G.shape[0]), lower=True)
+    return cho_solve((L, True), g), L_inv.T @ L_inv
+
+
+def _eigh_gram(G: np.ndarray, g: np.ndarray):
+    # SVD de una matriz simétrica PSD == eigh; pseudo-inversa con truncado relativo
+    w, V = np.linalg.eigh(G)
+    # los autovalores de G solo son exactos hasta ~eps·max(w): por debajo se consideran cero
+    cutoff = max(float(w[-1]), 0.0) * G.shape[0] * np.finfo(float).eps if w.size else 0.0
+    keep = w > cutoff
+    inv_w = np.zeros_like(w)
+    inv_w[keep] = 1.0 / w[keep]
+    G_inv = (V * inv_w) @ V.T
+    return G_inv @ g, G_inv, int(keep.sum())
+
+
+def solve_gram(G: np.ndarray, g: np.ndarray, method: str = "auto") -> Solution:
+    """Resuelve G b = g cuando solo se dispone de G = X'X y g = X'y (sin filas).
+
+    Sin filas no hay QR: "qr"/"svd" se resuelven por descomposición espectral de G.
+    """
+    g = np.asarray(g, dtype=float).reshape(-1)
+    k = G.shape[0]
+    cond = _scaled_gram_cond(G) if k else 1.0
+    if method == "auto":
+        method = choose_method(cond)
+    if method == "cholesky":
+        try:
+            beta, G_inv = _cholesky_gram(G, g)
+            return Solution(beta, G_inv, "cholesky", cond, k)
+        except np.linalg.LinAlgError:
+            pass
+    beta, G_inv, rank = _eigh_gram(G, g)
+    return Solution(beta, G_inv, "eigh", cond, rank)
+
+
+def solve_ols(X: np.ndarray, y: np.ndarray, method: str = "auto") -> Solution:
+    """Mínimos cuadrados sobre las filas: min ||y - X b||."""
+    if method not in METHODS:
+        raise ValueError(f"Método de resolución desconocido: '{method}'")
+    y = np.asarray(y, dtype=float).reshape(-1)
+    k = X.shape[1]
+    auto = method == "auto"
+    cond = None
+    if method in ("auto", "cholesky"):
+        G = X.T @ X
+        cond = _scaled_gram_cond(G) if k else 1.0
+        if auto:
+            method = choose_method(cond)
+
+    if method == "cholesky":
+        try:
+            beta, G_inv = _cholesky_gram(G, X.T @ y)
+            return Solution(beta, G_inv, "cholesky", cond, k)
+        except np.linalg.LinAlgError:
+            method = "qr"  # no es definida positiva en aritmética finita
+
+    if method == "qr":
+        Q, R = np.linalg.qr(X, mode="reduced")
+        cond = _scaled_cond_R(R) if k else 1.0
+        diag = np.abs(np.diag(R))
+        full_rank = diag.size and diag.min() > diag.max() * SVD_RCOND
+        if full_rank and not (auto and cond > COND_QR_MAX):
+            R_inv = solve_triangular(R, np.eye(k))
+            beta = solve_triangular(R, Q.T @ y)
+            return Solution(beta, R_inv @ R_inv.T, "qr", cond, k)
+
+    U, s, Vt = np.linalg.svd(X, full_matrices=False)
+    if cond is None:
+        cond = _scaled_gram_cond(X.T @ X) if k else 1.0
+    keep = s > (s[0] * SVD_RCOND if s.size else 0.0)
+    inv_s = np.zeros_like(s)
+    inv_s[keep] = 1.0 / s[keep]
+    beta = Vt.T @ (inv_s * (U.T @ y))
+    cov = (Vt.T * inv_s ** 2) @ Vt
+    return Solution(beta, cov, "svd", cond, int(keep.sum()))
+
+
+def finite(arr) -> np.ndarray:
+    """NaN/Inf -> 0.0 de forma vectorizada (JSON no admite valores no finitos)."""
+    return np.nan_to_num(np.asarray(arr, dtype=float), nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def finite_scalar(x) -> float:
+    x = float(x)
+    return x if np.isfinite(x) else 0.0
+
+
+def ols_summary(beta: np.ndarray, var_unscaled: Optional[np.ndarray], sse: float, sst: float, n: int, k: int, sol: Solution,
+                fit_intercept: bool = True, yty: Optional[float] = None,
+                conf_levels: Sequence[float] = DEFAULT_CONF_LEVELS, fields: Sequence[str] = (),
+                cov_beta: Optional[np.ndarray] = None, dof: Optional[float] = None) -> dict:
+    """Estadísticos e inferencia de la regresión a partir de beta, diag((X'X)^{-1}), SSE y SST.
+
+    Todo sale de cantidades ya calculadas por el solver (sin otra pasada por los datos).
+    Sin intercepto, el F/ANOVA usa la suma de cuadrados no centrada `yty` (y'y).
+    Con `cov_beta` (covarianza completa de beta: robusta, ridge, Huber) los errores estándar
+    salen de ahí y el F global es el test de Wald de las pendientes; `dof` reemplaza n - k.
+    """
+    dof = max(n - k, 1) if dof is None else max(dof, 1.0)
+    sigma2 = sse / dof
+    # Var(beta) = sigma^2 * (X'X)^{-1}. Aseguramos no tomar sqrt de valores negativos por redondeo
+    var_beta = np.diag(cov_beta) if cov_beta is not None else sigma2 * np.asarray(var_unscaled, dtype=float)
+    se_beta = np.sqrt(np.clip(var_beta, a_min=0.0, a_max=None))
+    beta = np.asarray(beta, dtype=float).reshape(-1)
+    # Evitar divisiones por cero en t-stats
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_stats = np.where(se_beta > 0, beta / se_beta, 0.0)
+    r2 = 1.0 - (sse / sst if sst > 0 else 0.0)
+    adj_r2 = 1.0 - (1.0 - r2) * (n - 1) / max(n - k, 1)
+
+    # ANOVA y F global: modelo vs. solo intercepto (o vs. el modelo nulo si no hay intercepto)
+    df_model = k - 1 if fit_intercept else k
+    ss_total = sst if fit_intercept or yty is None else yty
+    ss_model = max(ss_total - sse, 0.0)
+    ms_model = ss_model / df_model if df_model > 0 else 0.0
+    if cov_beta is not None and df_model > 0:
+        slopes = slice(1 if fit_intercept else 0, None)
+        b_s = beta[slopes]
+        f_stat = float(b_s @ np.linalg.pinv(cov_beta[slopes, slopes]) @ b_s) / df_model
+    elif df_model > 0 and sigma2 > 0:
+        f_stat = ms_model / sigma2
+    else:
+        f_stat = np.inf if df_model > 0 and ms_model > 0 else 0.0  # ajuste perfecto
+    f_p = distributions.f_pvalue(f_stat, df_model, dof) if df_model > 0 and np.isfinite(f_stat) else 0.0
+    anova = {
+        "model": {"df": df_model, "ss": finite_scalar(ss_model), "ms": finite_scalar(ms_model),
+                  "f": finite_scalar(f_stat), "p_value": finite_scalar(f_p)},
+        "residual": {"df": dof, "ss": finite_scalar(sse), "ms": finite_scalar(sigma2)},
+        "total": {"df": df_model + dof, "ss": finite_scalar(ss_total)},
+    }
+
+    conf_int = {}
+    for level in conf_levels:
+        half = distributions.t_critical(level, dof) * se_beta
+        conf_int[f"{level:g}"] = finite(np.column_stack([beta - half, beta + half])).tolist()
+
+    # NaN/Inf -> 0.0 aquí, sobre arrays, para que las respuestas ya salgan JSON-válidas
+    out = {
+        "beta": finite(beta).tolist(),
+        "se_beta": finite(se_beta).tolist(),
+        "t_stats": finite(t_stats).tolist(),
+        "p_values": finite(distributions.t_pvalues(t_stats, dof)).tolist(),
+        "conf_int": conf_int,
+        "r2": finite_scalar(r2),
+        "adj_r2": finite_scalar(adj_r2),
+        "sse": finite_scalar(sse),
+        "sigma2": finite_scalar(sigma2),
+        "dof_resid": dof,
+        "f_stat": finite_scalar(f_stat),
+        "f_pvalue": finite_scalar(f_p),
+        "anova": anova,
+        "solver": sol.method,
+        "condition_number": finite_scalar(sol.cond),
+        "rank": int(sol.rank),
+    }
+    if "cov" in fields:
+        cov = cov_beta if cov_beta is not None else sigma2 * np.asarray(sol.cov_unscaled, dtype=float)
+        out["cov"] = finite(cov).tolist()
+    return out
+
+
+def residual_fields(residuals: np.ndarray, fitted: np.ndarray, sigma2: float, fields: Sequence[str]) -> dict:
+    """Campos por fila pedidos en `fields` a partir de residuos/ajustados ya calculados."""
+    out = {}
+    e = np.asarray(residuals, dtype=float).reshape(-1)
+    if "fitted" in fields:
+        out["fitted"] = finite(np.asarray(fitted).reshape(-1))
+    if "residuals" in fields:
+        out["residuals"] = finite(e)
+    if "diagnostics" in fields and e.size:
+        n = e.size
+        ssr = float(e @ e)
+        c = e - e.mean()
+        m2 = float(c @ c) / n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dw = float(np.sum(np.diff(e) ** 2)) / ssr if ssr > 0 else 0.0
+            skew = float(np.mean(c ** 3)) / m2 ** 1.5 if m2 > 0 else 0.0
+            kurt = float(np.mean(c ** 4)) / m2 ** 2 if m2 > 0 else 0.0
+            std_max = float(np.max(np.abs(e))) / np.sqrt(sigma2) if sigma2 > 0 else 0.0
+        jb = n / 6.0 * (skew ** 2 + (kurt - 3.0) ** 2 / 4.0)
+        out["diagnostics"] = {
+            "durbin_watson": finite_scalar(dw),
+            "skewness": finite_scalar(skew),
+            "kurtosis": finite_scalar(kurt),
+            "jarque_bera": finite_scalar(jb),
+            "jarque_bera_pvalue": finite_scalar(distributions.chi2_pvalue(jb, 2)),
+            "max_abs_std_residual": finite_scalar(std_max),
+            "residual_min": finite_scalar(e.min()),
+            "residual_max": finite_scalar(e.max()),
+        }
+    return out
@@ -1,20 +1,46 @@
 # backend/state_db.py
+import os
 from datetime import datetime
 from pathlib import Path
+from typing import Optional, Union
 
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Boolean
+from sqlalchemy import create_engine, event, inspect, text, Column, Index, Integer, String, DateTime, Text, Boolean, Float
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import declarative_base, sessionmaker
 
+from metrics import instrument_engine
+
 DB_PATH = Path(__file__).parent / "app.db"
-engine = create_engine(f"sqlite:///{DB_PATH}", connect_args={"check_same_thread": False})
+SQLITE_WAL = os.getenv("SQLITE_WAL", "1").lower() not in ("0", "false", "no")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+def make_engine(path: Union[str, Path], wal: bool = SQLITE_WAL):
+    eng = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+
+    # WAL: las lecturas no bloquean a la escritura (autosave cada 500 ms + GETs en paralelo);
+    # con WAL, synchronous=NORMAL solo hace fsync en los checkpoints y sigue siendo consistente
+    @event.listens_for(eng, "connect")
+    def _pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        if wal:
+            cur.execute("PRAGMA journal_mode=WAL")
+            cur.execute("PRAGMA synchronous=NORMAL")
+        cur.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cur.close()
+
+    return eng
+
+engine = make_engine(DB_PATH)
+instrument_engine(engine)  # consultas y COMMIT en /metrics y Server-Timing
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 Base = declarative_base()
 
 # Estado de la tabla (Tabla Simple)
 class TableState(Base):
     __tablename__ = "table_state"
+    __table_args__ = (Index("ux_table_state_sid", "sid", unique=True),)
     id = Column(Integer, primary_key=True, index=True)
-    sid = Column(String(64), index=True)          # cookie session id
+    sid = Column(String(64))                      # cookie session id (una fila por sesión)
     rows_json = Column(Text)                      # JSON como string
     fit_intercept = Column(Boolean, default=True)
     updated_at = Column(DateTime, default=datetime.utcnow)
@@ -22,8 +48,9 @@ class TableState(Base):
 # Estado de la sección Excel (últimos parámetros usados)
 class ExcelState(Base):
     __tablename__ = "excel_state"
+    __table_args__ = (Index("ux_excel_state_sid", "sid", unique=True),)
     id = Column(Integer, primary_key=True, index=True)
-    sid = Column(String(64), index=True)
+    sid = Column(String(64))
     y_column = Column(String(128))
     x_columns = Column(String(512))               # "x1,x2,x3"
     fit_intercept = Column(Boolean, default=True)
@@ -33,24 +60,118 @@ class ExcelState(Base):
 # Biblioteca de archivos subidos
 class ExcelFile(Base):
     __tablename__ = "excel_files"
+    # el listado filtra por sid y ordena por uploaded_at desc: un solo recorrido del índice
+    __table_args__ = (
+        Index("ix_excel_files_sid_uploaded_at", "sid", "uploaded_at"),
+        Index("ix_excel_files_blob_key", "blob_key"),  # conteo de referencias por blob
+    )
     id = Column(Integer, primary_key=True, index=True)
-    sid = Column(String(64), index=True)        # por sesión (cookie)
+    sid = Column(String(64))                    # por sesión (cookie)
     filename = Column(String(256))
     file_path = Column(String(1024))
     size_bytes = Column(Integer, default=0)
     kind = Column(String(32), default="auto")   # "simple" | "multiple" | "auto"
     y_column = Column(String(128), nullable=True)
     x_columns = Column(String(512), nullable=True)
+    sidecar_path = Column(String(1024), nullable=True)  # dir columnar (.npy por columna), ver columnar.py
+    blob_key = Column(String(80), nullable=True)  # "<sha256>.<ext>" en blob_store.py; None = esquema anterior
     uploaded_at = Column(DateTime, default=datetime.utcnow)
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+    _migrate_indexes()
+
+# create_all no altera tablas ya existentes: agrega a mano las columnas nuevas
+def _add_missing_columns():
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not insp.has_table(table.name):
+                continue
+            existing = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name not in existing:
+                    ddl_type = col.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {col.name} {ddl_type}"))
+
+# índices simples sobre sid de versiones anteriores (reemplazados por los de __table_args__)
+_OBSOLETE_INDEXES = ("ix_table_state_sid", "ix_excel_state_sid", "ix_excel_result_state_sid", "ix_excel_files_sid")
+
+# create_all tampoco crea índices en tablas existentes. Antes del índice único por sid se
+# deja solo la fila más reciente de cada sesión (las versiones anteriores podían duplicar).
+def _migrate_indexes():
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {ix["name"] for ix in insp.get_indexes(table.name)}
+            for idx in table.indexes:
+                if idx.name in existing:
+                    continue
+                if idx.unique and [c.name for c in idx.columns] == ["sid"]:
+                    conn.execute(text(
+                        f"DELETE FROM {table.name} WHERE id NOT IN ("
+                        f"SELECT id FROM (SELECT id, ROW_NUMBER() OVER "
+                        f"(PARTITION BY sid ORDER BY updated_at DESC, id DESC) AS rn FROM {table.name}) WHERE rn = 1)"
+                    ))
+                idx.create(bind=conn)
+            for name in _OBSOLETE_INDEXES:
+                if name in existing:
+                    conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+# INSERT ... ON CONFLICT(sid) DO UPDATE: una sola sentencia, sin SELECT previo ni carrera
+# entre dos autosaves de la misma sesión. `update` = columnas a pisar si la fila ya existe
+# (por defecto todas las de `values`).
+def upsert_stmt(model, sid: str, values: dict, update: Optional[dict] = None, newer_only: bool = False):
+    """INSERT ... ON CONFLICT(sid) DO UPDATE. Con newer_only no pisa una fila con updated_at más nuevo."""
+    stmt = sqlite_insert(model).values(sid=sid, **values)
+    where = None
+    if newer_only and "updated_at" in values:
+        where = model.updated_at.is_(None) | (model.updated_at <= stmt.excluded.updated_at)
+    return stmt.on_conflict_do_update(index_elements=["sid"], set_=values if update is None else update, where=where)
+
+def upsert_by_sid(db, model, sid: str, values: dict, update: Optional[dict] = None) -> None:
+    db.execute(upsert_stmt(model, sid, values, update))
+    db.commit()
 
 
 # --- Último resultado de la sección Excel (cache por sesión) ---
 class ExcelResultState(Base):
     __tablename__ = "excel_result_state"
+    __table_args__ = (Index("ux_excel_result_state_sid", "sid", unique=True),)
     id = Column(Integer, primary_key=True, index=True)
-    sid = Column(String(64), index=True)   # cookie de sesión
+    sid = Column(String(64))               # cookie de sesión
     result_json = Column(Text)             # JSON de la última respuesta de /api/regression/excel
-    updated_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+# --- Memo de resultados por (hash del archivo, especificación), compartido entre sesiones ---
+class ResultCacheEntry(Base):
+    __tablename__ = "result_cache"
+    key = Column(String(64), primary_key=True)    # sha256 de la especificación normalizada
+    result_json = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+# --- Trabajos en segundo plano (ver jobs.py) ---
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_sid_created_at", "sid", "created_at"),
+        Index("ix_jobs_status", "status"),  # recuperación al arrancar + GC de blobs
+    )
+    id = Column(String(32), primary_key=True)      # uuid hex
+    sid = Column(String(64))
+    kind = Column(String(32))                      # "calc" | "search" | "convert"
+    dedup_key = Column(String(64), nullable=True)  # sha256 de (sid, tipo, archivo, especificación)
+    status = Column(String(16), default="queued")  # queued | running | done | error | cancelled
+    progress = Column(Float, default=0.0)          # 0..1
+    message = Column(String(256), nullable=True)
+    params_json = Column(Text)                     # suficiente para reanudar tras un reinicio
+    blob_key = Column(String(80), nullable=True)   # blob subido que aún no tiene fila en ExcelFile
+    result_json = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    owner = Column(String(64), nullable=True)      # worker que lo corre (host:pid:id), ver jobs.JobQueue
+    lease_until = Column(DateTime, nullable=True)  # vencido: el dueño murió y otro worker lo retoma
+    cancel_requested = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
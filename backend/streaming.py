@@ -0,0 +1,201 @@
+# backend/streaming.py
+# Ajuste OLS con memoria acotada para archivos grandes: se leen las filas por
+# bloques (openpyxl read_only / iterador de CSV), solo de las columnas pedidas,
+# y se acumulan los momentos (X'X, X'y, y'y, n) bloque a bloque.
+import os
+from typing import Callable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import solve_triangular
+
+from columnar import SidecarWriter
+from moments import MomentsAccumulator
+from solvers import COND_CHOLESKY_MAX, DEFAULT_CONF_LEVELS, SVD_RCOND, Solution, ols_summary
+
+STREAM_CHUNK_ROWS = int(os.getenv("STREAM_CHUNK_ROWS", "20000"))
+STREAM_THRESHOLD_BYTES = int(os.getenv("STREAM_THRESHOLD_BYTES", str(20 * 1024 * 1024)))
+
+
+def _coerce_chunk(values: list) -> Tuple[np.ndarray, np.ndarray]:
+    """(array float, máscara de celdas no numéricas) con la misma semántica que pd.to_numeric."""
+    try:
+        arr = np.array(values, dtype=float)
+        return arr, np.isnan(arr)
+    except (TypeError, ValueError):
+        coerced = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=float)
+        return coerced, np.isnan(coerced)
+
+
+def _whole_chunk(values: list, arr: np.ndarray, kind: str) -> bool:
+    """Si pandas leería el bloque como enteros: en Excel los float enteros ya vuelven como int,
+    en CSV además cada celda tiene que escribirse como entero ("1", no "1.0")."""
+    if not bool(np.all(np.isfinite(arr) & (arr == np.trunc(arr)))):
+        return False
+    if kind != "csv":
+        return True
+    try:
+        np.array(values, dtype=np.int64)
+        return True
+    except (TypeError, ValueError, OverflowError):
+        return False
+
+
+def _xlsx_header_and_rows(path: str):
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    ws = wb.worksheets[0]
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None) or ()
+    names = [str(c).strip() if c is not None else f"Unnamed: {i}" for i, c in enumerate(header)]
+    return wb, names, rows
+
+
+def _xlsx_chunks(path: str, columns: List[str], chunk_rows: int) -> Iterator[Tuple[int, List[list]]]:
+    """(fila inicial, [valores por columna]) por bloque; omite filas vacías al final como pandas."""
+    wb, names, rows = _xlsx_header_and_rows(path)
+    try:
+        idx = [names.index(c) for c in columns]
+        start, buf, blanks = 0, [], 0
+        for row in rows:
+            if row is None or all(v is None for v in row):
+                blanks += 1  # solo cuentan si después aparece otra fila con datos
+                continue
+            for _ in range(blanks):
+                buf.append((None,) * len(idx))
+            blanks = 0
+            buf.append(tuple(row[i] if i < len(row) else None for i in idx))
+            if len(buf) >= chunk_rows:
+                yield start, [list(col) for col in zip(*buf)]
+                start += len(buf)
+                buf = []
+        if buf:
+            yield start, [list(col) for col in zip(*buf)]
+    finally:
+        wb.close()
+
+
+def _csv_chunks(path: str, columns: List[str], chunk_rows: int) -> Iterator[Tuple[int, List[list]]]:
+    wanted = set(columns)
+    reader = pd.read_csv(path, usecols=lambda c: str(c).strip() in wanted, chunksize=chunk_rows, dtype=object)
+    start = 0
+    for chunk in reader:
+        chunk.columns = [str(c).strip() for c in chunk.columns]
+        yield start, [chunk[c].tolist() for c in columns]
+        start += len(chunk)
+
+
+def file_columns(path: str, kind: str) -> List[str]:
+    """Nombres de columna (ya con strip) leyendo solo el encabezado."""
+    if kind == "csv":
+        return [str(c).strip() for c in pd.read_csv(path, nrows=0).columns]
+    wb, names, _ = _xlsx_header_and_rows(path)
+    wb.close()
+    return names
+
+
+def iter_chunks(path: str, kind: str, columns: List[str], chunk_rows: int = STREAM_CHUNK_ROWS) -> Iterator[Tuple[int, List[list]]]:
+    if kind == "csv":
+        return _csv_chunks(path, columns, chunk_rows)
+    return _xlsx_chunks(path, columns, chunk_rows)
+
+
+def _tsqr_fit(chunks: Callable[[], Iterator[np.ndarray]], k: int) -> Tuple[np.ndarray, np.ndarray, float, int]:
+    """QR por bloques de [X | y]: R se actualiza con qr([R; bloque]); memoria O(k^2)."""
+    R = np.zeros((0, k + 1))
+    for Z in chunks():
+        R = np.linalg.qr(np.vstack([R, Z]), mode="r")
+    if R.shape[0] < k + 1:  # menos filas que columnas
+        R = np.vstack([R, np.zeros((k + 1 - R.shape[0], k + 1))])
+    R = np.triu(R[:k + 1])
+    Rxx, rxy = R[:k, :k], R[:k, k]
+    sse = float(R[k, k] ** 2)
+    diag = np.abs(np.diag(Rxx))
+    if diag.size and diag.min() > diag.max() * SVD_RCOND:
+        R_inv = solve_triangular(Rxx, np.eye(k))
+        return R_inv @ rxy, R_inv @ R_inv.T, sse, k
+    # deficiente en rango: pseudo-inversa de Rxx (misma solución de norma mínima que SVD de X)
+    U, s, Vt = np.linalg.svd(Rxx)
+    keep = s > (s[0] * SVD_RCOND if s.size else 0.0)
+    inv_s = np.zeros_like(s)
+    inv_s[keep] = 1.0 / s[keep]
+    beta = Vt.T @ (inv_s * (U.T @ rxy))
+    # el residuo incluye la parte de y que Rxx no alcanza en las direcciones descartadas
+    sse += float(((U.T @ rxy)[~keep] ** 2).sum())
+    return beta, (Vt.T * inv_s ** 2) @ Vt, sse, int(keep.sum())
+
+
+def stream_fit(path: str, kind: str, y_column: str, x_list: List[str], fit_intercept: bool,
+               chunk_rows: int = STREAM_CHUNK_ROWS, conf_levels: Sequence[float] = DEFAULT_CONF_LEVELS,
+               fields: Sequence[str] = (), sidecar: bool = False) -> Tuple[dict, int]:
+    """Ajusta y ~ X leyendo `path` por bloques. Devuelve (out como _ols, n).
+
+    Lanza ValueError con los mismos mensajes que los endpoints Excel. Los campos por
+    fila (solvers.ROW_FIELDS) no están disponibles: no se guardan las filas.
+    Con sidecar=True la misma pasada lee todas las columnas y escribe el sidecar columnar,
+    para que los reusos y la biblioteca no vuelvan a parsear el archivo.
+    """
+    names = file_columns(path, kind)
+    if y_column not in names:
+        raise ValueError(f"Columna y '{y_column}' no existe en el archivo")
+    if not x_list:
+        raise ValueError("Debes especificar al menos una columna X en 'x_columns'")
+    for c in x_list:
+        if c not in names:
+            raise ValueError(f"La columna X '{c}' no existe en el archivo")
+
+    xs = sorted(x_list)
+    columns = list(dict.fromkeys([y_column] + xs))
+    # con nombres repetidos (pandas los renombra "x.1") no se arma el sidecar
+    writer = SidecarWriter(path, names) if sidecar and len(set(names)) == len(names) else None
+    read = names if writer is not None else columns
+    pos_read = [read.index(c) for c in columns]
+    acc = MomentsAccumulator(columns)
+    bad = {c: [] for c in columns}
+    try:
+        for start, values in iter_chunks(path, kind, read, chunk_rows):
+            coerced = [_coerce_chunk(v) for v in values]
+            if writer is not None:
+                writer.append([a for a, _ in coerced], [m for _, m in coerced],
+                              [_whole_chunk(v, a, kind) for v, (a, _) in zip(values, coerced)])
+            block = np.empty((len(values[0]), len(columns)), dtype=float, order="F")
+            for j, c in enumerate(columns):
+                block[:, j], mask = coerced[pos_read[j]]
+                if mask.any() and len(bad[c]) < 5:
+                    bad[c].extend((np.flatnonzero(mask)[:5 - len(bad[c])] + start).tolist())
+            if not any(bad.values()):
+                acc.update(block)
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    if writer is not None:
+        writer.close()
+    for c in [y_column] + x_list:
+        if bad[c]:
+            raise ValueError(f"La columna '{c}' debe ser completamente numérica. Filas problemáticas: {bad[c]}")
+    if acc.n == 0:
+        raise ValueError("El archivo no tiene filas de datos")
+
+    m = acc.result()
+    out = m.fit(y_column, xs, fit_intercept, conf_levels, fields)
+    if out["condition_number"] <= COND_CHOLESKY_MAX:
+        return out, m.n
+
+    # mal condicionado: segunda pasada con QR por bloques (estable, misma memoria acotada)
+    pos = [columns.index(c) for c in xs]
+    iy = columns.index(y_column)
+
+    def design_chunks():
+        for _, values in iter_chunks(path, kind, columns, chunk_rows):
+            block = np.column_stack([_coerce_chunk(v)[0] for v in values])
+            parts = ([np.ones((block.shape[0], 1))] if fit_intercept else []) + [block[:, pos], block[:, [iy]]]
+            yield np.hstack(parts)
+
+    k = len(xs) + (1 if fit_intercept else 0)
+    beta, cov, sse, rank = _tsqr_fit(design_chunks, k)
+    sst = float(m.comoment[iy, iy])
+    yty = sst + m.n * float(m.mean[iy]) ** 2
+    sol = Solution(beta, cov, "tsqr", out["condition_number"], rank)
+    return ols_summary(beta, np.diag(cov), sse, sst, m.n, k, sol, fit_intercept=fit_intercept, yty=yty,
+                       conf_levels=conf_levels, fields=fields), m.n
@@ -0,0 +1,77 @@
+# backend/test_autosave.py
+# Buffer write-behind: orden entre un flush en curso y las escrituras directas / parches.
+#   python -m pytest test_autosave.py
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from autosave import AutosaveBuffer
+from state_db import Base, ExcelState, TableState, make_engine, upsert_by_sid
+
+
+@pytest.fixture
+def Session(tmp_path):
+    engine = make_engine(tmp_path / "state.db")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    engine.dispose()
+
+
+def _table(rows_json: str, ts: datetime) -> dict:
+    return {"rows_json": rows_json, "fit_intercept": True, "updated_at": ts}
+
+
+def test_flush_skips_rows_older_than_the_db(Session):
+    buf = AutosaveBuffer(Session, 60.0, 100)  # sin hilo: solo flush explícito
+    t0 = datetime.utcnow()
+    buf.put(TableState, "s1", _table('["viejo"]', t0))
+    buf.put(ExcelState, "s1", {"y_column": "y", "x_columns": "a", "fit_intercept": True, "updated_at": t0})
+    with Session() as db:
+        upsert_by_sid(db, TableState, "s1", _table('["nuevo"]', t0 + timedelta(seconds=1)))
+        upsert_by_sid(db, ExcelState, "s1", {"y_column": "y", "x_columns": "b", "fit_intercept": False,
+                                              "updated_at": t0 + timedelta(seconds=1)})
+    assert buf.flush() == 2
+    with Session() as db:
+        assert db.query(TableState).filter_by(sid="s1").one().rows_json == '["nuevo"]'
+        assert db.query(ExcelState).filter_by(sid="s1").one().x_columns == "b"
+
+    buf.put(TableState, "s1", _table('["posterior"]', t0 + timedelta(seconds=2)))
+    buf.flush("s1")
+    with Session() as db:
+        assert db.query(TableState).filter_by(sid="s1").one().rows_json == '["posterior"]'
+
+
+def test_paused_waits_for_a_flush_in_flight(Session):
+    entered, release = threading.Event(), threading.Event()
+
+    def gated():
+        entered.set()  # el lote ya salió del buffer y todavía no se escribió
+        release.wait(5)
+        return Session()
+
+    buf = AutosaveBuffer(gated, 60.0, 100)
+    buf.put(TableState, "s1", _table('["a"]', datetime.utcnow()))
+    flusher = threading.Thread(target=buf.flush)
+    flusher.start()
+    assert entered.wait(5)
+    assert buf.get(TableState, "s1") is None
+
+    seen = []
+
+    def patch():
+        with buf.paused():
+            with Session() as db:
+                row = db.query(TableState).filter_by(sid="s1").first()
+                seen.append(row.rows_json if row else None)
+
+    patcher = threading.Thread(target=patch)
+    patcher.start()
+    time.sleep(0.05)
+    assert seen == []
+    release.set()
+    flusher.join(5)
+    patcher.join(5)
+    assert seen == ['["a"]']
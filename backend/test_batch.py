@@ -0,0 +1,49 @@
+# backend/test_batch.py
+# Lote de especificaciones: validación por spec y mismo resultado que el ajuste individual.
+#   python -m pytest test_batch.py
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from batch import check_spec, fit_specs
+from main import app
+from moments import Moments
+
+
+def _data(n=40, seed=2):
+    rng = np.random.default_rng(seed)
+    cols = {"x1": rng.normal(size=n), "x2": rng.normal(size=n)}
+    cols["y"] = 1.0 + 2.0 * cols["x1"] - 0.5 * cols["x2"] + rng.normal(scale=0.1, size=n)
+    return cols
+
+
+def test_check_spec():
+    m = Moments.from_columns(_data(), ["label"])
+    assert check_spec(m, {"y": "y", "x_columns": ["x1", "x2"]}) is None
+    assert "al menos una X" in check_spec(m, {"y": "y", "x_columns": []})
+    assert "también en 'x_columns'" in check_spec(m, {"y": "y", "x_columns": ["x1", "y"]})
+    assert "no existe" in check_spec(m, {"y": "y", "x_columns": ["x9"]})
+    assert "numérica" in check_spec(m, {"y": "y", "x_columns": ["label"]})
+
+
+def test_fit_specs_reports_errors_per_spec():
+    m = Moments.from_columns(_data())
+    out = fit_specs(m, [{"y": "y", "x_columns": ["x1"], "fit_intercept": True},
+                        {"y": "y", "x_columns": ["y"], "fit_intercept": True}])
+    assert [status for status, _ in out] == ["ok", "error"]
+
+
+def test_batch_endpoint_dedupes_x_and_rejects_y_in_x():
+    data = _data()
+    payload = {"data": {k: v.tolist() for k, v in data.items()}, "specs": [
+        {"y": "y", "x_columns": ["x2", "x1"]},
+        {"y": "y", "x_columns": ["x1", "x1", " x2"]},
+        {"y": "y", "x_columns": ["x1", "y"]},
+    ]}
+    r = TestClient(app).post("/api/regression/batch", json=payload)
+    assert r.status_code == 200
+    plain, dup, bad = r.json()["results"]
+    assert dup["spec"]["x_columns"] == ["x1", "x2"]
+    assert dup["coefficients"] == pytest.approx(plain["coefficients"])
+    assert plain["coefficients"]["x1"] == pytest.approx(2.0, abs=0.1)
+    assert "error" in bad and "coefficients" not in bad
@@ -0,0 +1,149 @@
+# backend/test_blob_store.py
+# Blob store local y S3 (con un cliente falso en memoria, sin boto3 ni red).
+#   python -m pytest test_blob_store.py
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+
+import blob_store
+from blob_store import LocalBlobStore, S3BlobStore
+from columnar import read_schema, write_sidecar
+
+
+class FakeS3:
+    """Lo mínimo de un cliente boto3 "s3" que usa S3BlobStore, con objetos en un dict."""
+
+    def __init__(self, page_size: int = 2):
+        self.objects = {}  # (bucket, key) -> [bytes, LastModified]
+        self.page_size = page_size
+        self.calls = []
+
+    def _obj(self, bucket, key):
+        try:
+            return self.objects[(bucket, key)]
+        except KeyError:
+            raise LookupError(f"NoSuchKey: {key}") from None
+
+    def upload_file(self, filename, bucket, key):
+        self.calls.append(("upload_file", key))
+        with open(filename, "rb") as fh:
+            self.objects[(bucket, key)] = [fh.read(), datetime.now(timezone.utc)]
+
+    def download_file(self, bucket, key, filename):
+        self.calls.append(("download_file", key))
+        data = self._obj(bucket, key)[0]
+        with open(filename, "wb") as fh:
+            fh.write(data)
+
+    def head_object(self, Bucket, Key):
+        data, modified = self._obj(Bucket, Key)
+        return {"ContentLength": len(data), "LastModified": modified}
+
+    def copy_object(self, Bucket, Key, CopySource, MetadataDirective="COPY"):
+        self.calls.append(("copy_object", Key))
+        data = self._obj(CopySource["Bucket"], CopySource["Key"])[0]
+        self.objects[(Bucket, Key)] = [data, datetime.now(timezone.utc)]
+
+    def delete_object(self, Bucket, Key):
+        self.calls.append(("delete_object", Key))
+        self.objects.pop((Bucket, Key), None)
+
+    def list_objects_v2(self, Bucket, Prefix="", ContinuationToken=None):
+        keys = sorted(k for b, k in self.objects if b == Bucket and k.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        page = keys[start:start + self.page_size]
+        out = {"Contents": [{"Key": k} for k in page], "IsTruncated": start + self.page_size < len(keys)}
+        if out["IsTruncated"]:
+            out["NextContinuationToken"] = str(start + self.page_size)
+        return out
+
+
+def _age(path, seconds):
+    t = time.time() - seconds
+    os.utime(path, (t, t))
+
+
+@pytest.fixture
+def grace(monkeypatch):
+    monkeypatch.setattr(blob_store, "BLOB_GC_GRACE_S", 60.0)
+
+
+def test_local_grace_period_follows_mtime(tmp_path, grace):
+    store = LocalBlobStore(tmp_path / "blobs")
+    ref = store.put_bytes(b"a,b\n1,2\n", "csv")
+    assert not ref.deduplicated and store.recently_used(ref.key)
+
+    _age(ref.path, 3600)
+    assert not store.recently_used(ref.key)
+    # otro proceso (u otro arranque) con el mismo root ve lo mismo
+    assert not LocalBlobStore(tmp_path / "blobs").recently_used(ref.key)
+
+    again = store.put_bytes(b"a,b\n1,2\n", "csv")
+    assert again.deduplicated and again.path == ref.path
+    assert LocalBlobStore(tmp_path / "blobs").recently_used(ref.key)
+
+    store.delete(ref.key)
+    assert not os.path.exists(ref.path) and not store.recently_used(ref.key)
+
+
+def test_dedup_touch_keeps_sidecar_valid(tmp_path, grace):
+    store = LocalBlobStore(tmp_path / "blobs")
+    content = b"y,x\n1,2\n3,4\n"
+    ref = store.put_bytes(content, "csv")
+    write_sidecar(ref.path, pd.DataFrame({"y": [1, 3], "x": [2, 4]}))
+    _age(ref.path, 3600)
+    assert read_schema(ref.path) is None  # el sidecar sigue atado al mtime del archivo
+    write_sidecar(ref.path, pd.DataFrame({"y": [1, 3], "x": [2, 4]}))
+
+    store.put_bytes(content, "csv")
+    assert store.recently_used(ref.key)
+    schema = read_schema(ref.path)
+    assert schema is not None and [c["name"] for c in schema["columns"]] == ["y", "x"]
+
+
+def test_s3_put_dedup_materialize_delete(tmp_path, grace):
+    client = FakeS3()
+    store = S3BlobStore(client, "bucket", "blobs/", tmp_path / "cache")
+    ref = store.put_bytes(b"y,x\n1,2\n", "csv")
+    assert not ref.deduplicated
+    assert client.objects[("bucket", "blobs/" + ref.key)][0] == b"y,x\n1,2\n"
+    assert os.path.exists(ref.path)
+
+    again = store.put_bytes(b"y,x\n1,2\n", "csv")
+    assert again.deduplicated and again.key == ref.key
+    assert [c for c in client.calls if c[0] == "upload_file"] == [("upload_file", "blobs/" + ref.key)]
+    assert ("copy_object", "blobs/" + ref.key) in client.calls
+    assert store.stats()["dedup_hits"] == 1
+
+    # el período de gracia sale de LastModified: lo ve cualquier worker, tenga o no la copia local
+    other = S3BlobStore(client, "bucket", "blobs/", tmp_path / "other")
+    assert other.recently_used(ref.key)
+    client.objects[("bucket", "blobs/" + ref.key)][1] -= timedelta(hours=2)
+    assert not other.recently_used(ref.key)
+    store.put_bytes(b"y,x\n1,2\n", "csv")
+    assert other.recently_used(ref.key)
+
+    # sin copia local se descarga del bucket
+    os.remove(ref.path)
+    assert store.materialize(ref.path)
+    with open(ref.path, "rb") as fh:
+        assert fh.read() == b"y,x\n1,2\n"
+    assert store.stats()["downloads"] == 1
+    missing = str(store.path_for("0" * 64 + ".csv"))
+    assert not store.materialize(missing)
+
+    store.delete(ref.key)
+    assert ("bucket", "blobs/" + ref.key) not in client.objects
+    assert not os.path.exists(ref.path) and not store.recently_used(ref.key)
+
+
+def test_s3_keys_pages_and_filters(tmp_path):
+    client = FakeS3(page_size=2)
+    store = S3BlobStore(client, "bucket", "blobs/", tmp_path / "cache")
+    keys = {store.put_bytes(f"y\n{i}\n".encode(), "csv").key for i in range(5)}
+    client.objects[("bucket", "blobs/notes.txt")] = [b"", datetime.now(timezone.utc)]
+    client.objects[("bucket", "otro/" + next(iter(keys)))] = [b"", datetime.now(timezone.utc)]
+    assert set(store.keys()) == keys
@@ -0,0 +1,171 @@
+# backend/test_estimators.py
+# WLS, errores HC0-HC3, ridge (SVD + GCV) y Huber (IRLS) contra sus fórmulas explícitas.
+#   python -m pytest test_estimators.py
+import numpy as np
+import pytest
+
+from estimators import Design, fit, parse_spec
+
+NAMES = ["intercept", "x1", "x2"]
+
+
+def _data(n=80, seed=5, hetero=False):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([np.ones(n), rng.normal(size=n), rng.uniform(-2, 2, size=n)])
+    noise = rng.normal(size=n) * (0.2 + np.abs(X[:, 1]) if hetero else 0.5)
+    y = X @ np.array([1.0, 2.0, -0.7]) + noise
+    return X, y
+
+
+def _ols_cov(X, y):
+    xtx_inv = np.linalg.inv(X.T @ X)
+    beta = xtx_inv @ X.T @ y
+    e = y - X @ beta
+    return beta, e, xtx_inv
+
+
+def test_wls_is_ols_on_sqrt_w_scaled_rows():
+    X, y = _data()
+    w = np.random.default_rng(1).uniform(0.2, 3.0, size=len(y))
+    out = fit(Design(y, X, NAMES, True, w), parse_spec("wls", "w"))
+    sw = np.sqrt(w)
+    Xs, ys = X * sw[:, None], y * sw
+    beta, e, xtx_inv = _ols_cov(Xs, ys)
+    sigma2 = float(e @ e) / (len(y) - 3)
+    np.testing.assert_allclose(out["beta"], beta, rtol=1e-10)
+    np.testing.assert_allclose(out["se_beta"], np.sqrt(sigma2 * np.diag(xtx_inv)), rtol=1e-9)
+    assert out["sse"] == pytest.approx(float(e @ e), rel=1e-10)
+    y_bar = float(w @ y) / w.sum()
+    assert out["r2"] == pytest.approx(1.0 - float(e @ e) / float(w @ (y - y_bar) ** 2), rel=1e-10)
+    assert out["estimator"] == {"method": "wls", "weights": "w"}
+
+
+def test_wls_requires_weights():
+    X, y = _data()
+    with pytest.raises(ValueError, match="requiere pesos"):
+        fit(Design(y, X, NAMES, True), parse_spec("wls"))
+
+
+@pytest.mark.parametrize("kind", ["hc0", "hc1", "hc2", "hc3"])
+def test_hc_matches_sandwich_formula(kind):
+    X, y = _data(hetero=True)
+    n, k = X.shape
+    beta, e, xtx_inv = _ols_cov(X, y)
+    h = np.einsum("ij,jk,ik->i", X, xtx_inv, X)
+    omega = {"hc0": e ** 2, "hc1": e ** 2 * n / (n - k), "hc2": e ** 2 / (1 - h), "hc3": e ** 2 / (1 - h) ** 2}[kind]
+    cov = xtx_inv @ (X.T * omega) @ X @ xtx_inv
+    out = fit(Design(y, X, NAMES, True), parse_spec(kind), fields=("cov",))
+    np.testing.assert_allclose(out["beta"], beta, rtol=1e-10)
+    np.testing.assert_allclose(out["cov"], cov, rtol=1e-8, atol=1e-14)
+    np.testing.assert_allclose(out["se_beta"], np.sqrt(np.diag(cov)), rtol=1e-8)
+    # F global = Wald de las pendientes con la covarianza robusta
+    b = beta[1:]
+    assert out["f_stat"] == pytest.approx(float(b @ np.linalg.solve(cov[1:, 1:], b)) / 2, rel=1e-8)
+
+
+def test_hc_orders_on_heteroskedastic_data():
+    X, y = _data(hetero=True)
+    se = {kind: fit(Design(y, X, NAMES, True), parse_spec(kind))["se_beta"][1] for kind in ("hc0", "hc1", "hc2", "hc3")}
+    assert se["hc0"] < se["hc1"] and se["hc0"] < se["hc2"] < se["hc3"]
+
+
+def test_ridge_with_tiny_lambda_is_ols():
+    X, y = _data()
+    out = fit(Design(y, X, NAMES, True), parse_spec("ridge", lambdas="1e-12"))
+    beta, e, xtx_inv = _ols_cov(X, y)
+    np.testing.assert_allclose(out["beta"], beta, rtol=1e-8)
+    assert out["sse"] == pytest.approx(float(e @ e), rel=1e-9)
+    assert out["estimator"]["edf"] == pytest.approx(3.0, rel=1e-9)
+
+
+@pytest.mark.parametrize("fit_intercept", [True, False])
+def test_ridge_path_and_gcv_match_brute_force(fit_intercept):
+    rng = np.random.default_rng(9)
+    n = 40
+    x1 = rng.normal(size=n)
+    Z = np.column_stack([x1, x1 + rng.normal(scale=0.05, size=n), rng.normal(size=n) * 100.0])  # casi colineal
+    y = 0.5 + Z @ np.array([1.0, 1.0, 0.002]) + rng.normal(size=n)
+    X = np.column_stack([np.ones(n), Z]) if fit_intercept else Z
+    names = (["intercept"] if fit_intercept else []) + ["a", "b", "c"]
+    lambdas = np.logspace(-3, 3, 13)
+    out = fit(Design(y, X, names, fit_intercept), parse_spec("ridge", lambdas=",".join(map(str, lambdas))))
+
+    # fuerza bruta: (Zs'Zs + lambda I)^{-1} Zs'yc sobre columnas centradas y estandarizadas
+    mean = Z.mean(axis=0) if fit_intercept else np.zeros(3)
+    Zc = Z - mean
+    scale = np.sqrt((Zc ** 2).mean(axis=0))
+    Zs = Zc / scale
+    yc = y - y.mean() if fit_intercept else y
+    gcv = []
+    for lam, step in zip(lambdas, out["estimator"]["path"]):
+        A = np.linalg.inv(Zs.T @ Zs + lam * np.eye(3))
+        b = A @ Zs.T @ yc / scale
+        H = Zs @ A @ Zs.T + (np.full((n, n), 1.0 / n) if fit_intercept else 0.0)
+        rss = float(((yc - Zc @ b) ** 2).sum())
+        edf = float(np.trace(H))
+        gcv.append(n * rss / (n - edf) ** 2)
+        full = np.concatenate([[y.mean() - mean @ b], b]) if fit_intercept else b
+        np.testing.assert_allclose(list(step["coefficients"].values()), full, rtol=1e-8, atol=1e-12)
+        assert step["sse"] == pytest.approx(rss, rel=1e-9)
+        assert step["edf"] == pytest.approx(edf, rel=1e-9)
+        assert step["gcv"] == pytest.approx(gcv[-1], rel=1e-9)
+    best = int(np.argmin(gcv))
+    assert out["estimator"]["lambda"] == lambdas[best]
+    assert 0 < best < len(lambdas) - 1  # la grilla encierra el óptimo
+    np.testing.assert_allclose(out["beta"], list(out["estimator"]["path"][best]["coefficients"].values()))
+
+
+def test_huber_without_outliers_is_ols():
+    X, y = _data()
+    # k enorme: psi es la identidad, todos los pesos 1 y la covarianza H1 es la de OLS
+    out = fit(Design(y, X, NAMES, True), parse_spec("huber", huber_k="1e6"))
+    beta, e, xtx_inv = _ols_cov(X, y)
+    np.testing.assert_allclose(out["beta"], beta, rtol=1e-10)
+    np.testing.assert_allclose(out["se_beta"], np.sqrt(float(e @ e) / (len(y) - 3) * np.diag(xtx_inv)), rtol=1e-9)
+    assert out["estimator"]["downweighted"] == 0 and out["estimator"]["converged"]
+    # con la k por defecto y errores normales la estimación apenas se mueve
+    out = fit(Design(y, X, NAMES, True), parse_spec("huber"))
+    np.testing.assert_allclose(out["beta"], beta, atol=0.05)
+
+
+def test_huber_h1_covariance_and_estimating_equations():
+    X, y = _data(n=120)
+    y = y.copy()
+    y[:6] += 25.0  # atípicos
+    k = 1.345
+    out = fit(Design(y, X, NAMES, True), parse_spec("huber"), fields=("cov",))
+    est = out["estimator"]
+    assert est["converged"] and est["downweighted"] >= 6
+    beta, s = np.array(out["beta"]), est["scale"]
+    r = y - X @ beta
+    assert s == pytest.approx(np.median(np.abs(r - np.median(r))) / 0.6744897501960817, rel=1e-6)
+    psi = np.clip(r / s, -k, k)
+    np.testing.assert_allclose(X.T @ psi, 0.0, atol=1e-5 * len(y))  # X' psi(r / s) = 0 en el punto fijo
+    n, p = X.shape
+    m = float((np.abs(r / s) <= k).mean())
+    kappa = 1.0 + p / n * m * (1.0 - m) / m ** 2
+    cov = kappa ** 2 * float(psi @ psi) / (n - p) / m ** 2 * s ** 2 * np.linalg.inv(X.T @ X)
+    np.testing.assert_allclose(out["cov"], cov, rtol=1e-6)
+    # los atípicos no arrastran la pendiente como en OLS
+    assert abs(out["beta"][1] - 2.0) < abs(_ols_cov(X, y)[0][1] - 2.0)
+
+
+def test_huber_warm_start_reaches_the_same_fit():
+    X, y = _data()
+    y = y.copy()
+    y[:3] -= 10.0
+    d = Design(y, X, NAMES, True)
+    cold = fit(d, parse_spec("huber", huber_k="1.5"))
+    warm = fit(d, parse_spec("huber", huber_k="1.345"))
+    again = fit(Design(y, X, NAMES, True), parse_spec("huber", huber_k="1.345"))
+    assert not cold["estimator"]["warm_start"] and warm["estimator"]["warm_start"]
+    np.testing.assert_allclose(warm["beta"], again["beta"], rtol=1e-6)
+
+
+def test_parse_spec_validation():
+    assert parse_spec(None).method == "ols"
+    for args, msg in [(("lasso",), "desconocido"), (("ols", "w"), "solo aplica con method=wls"),
+                      (("ols", None, "1"), "solo aplica con method=ridge"), (("ridge", None, "-1"), "finitos >= 0"),
+                      (("huber", None, None, "0"), "positivo"), (("ridge", None, None, None, "pairs"), "resample")]:
+        with pytest.raises(ValueError, match=msg):
+            parse_spec(*args)
@@ -0,0 +1,175 @@
+# backend/test_jobs.py
+# Cola de trabajos con varios workers sobre la misma DB: dos JobQueue con distinto `owner`
+# hacen de dos procesos de uvicorn.
+#   python -m pytest test_jobs.py
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from jobs import JobQueue
+from state_db import Base, Job, make_engine
+
+
+@pytest.fixture
+def Session(tmp_path):
+    engine = make_engine(tmp_path / "jobs.db")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    engine.dispose()
+
+
+class Worker:
+    """Una JobQueue con un trabajo "count" que cuenta ejecuciones y avanza hasta que lo sueltan."""
+
+    def __init__(self, Session, runs, release, lease_s=30.0):
+        self.queue = JobQueue(Session, 1, 64, 8, 0.0, 3600.0, lease_s)
+        self.runs = runs
+        self.release = release
+        self.quiet = threading.Event()  # mientras está puesto el trabajo no llama a ctx.progress()
+        self.queue.register("count", self._count)
+
+    def _count(self, ctx):
+        self.runs.append((self.queue.owner, ctx.params["n"]))
+        while not self.release.wait(0.01):
+            if not self.quiet.is_set():
+                ctx.progress(0.5, "esperando")
+        ctx.progress(1.0)
+        return {"n": ctx.params["n"], "owner": self.queue.owner}
+
+
+def _wait(pred, timeout=5.0):
+    t0 = time.monotonic()
+    while not pred():
+        assert time.monotonic() - t0 < timeout, "timeout"
+        time.sleep(0.01)
+
+
+def _status(queue, sid, job_id):
+    return queue.get(sid, job_id)["status"]
+
+
+def test_each_job_runs_once_across_workers(Session):
+    runs, release = [], threading.Event()
+    a, b = Worker(Session, runs, release), Worker(Session, runs, release)
+    a.queue.start()
+    try:
+        job, _ = a.queue.submit("s1", "count", {"n": 1})
+        _wait(lambda: _status(a.queue, "s1", job["id"]) == "running")
+        b.queue.start()  # arranca mientras A lo corre: no lo retoma
+        b.queue._heartbeat()
+        assert b.queue.stats()["recovered"] == 0
+        # dedup contra la DB: el mismo envío desde B comparte el trabajo de A
+        again, dedup = b.queue.submit("s1", "count", {"n": 1}, dedup_key="k")
+        assert not dedup
+        same, dedup = a.queue.submit("s1", "count", {"n": 1}, dedup_key="k")
+        assert dedup and same["id"] == again["id"]
+        release.set()
+        _wait(lambda: _status(a.queue, "s1", job["id"]) == "done")
+        _wait(lambda: _status(a.queue, "s1", again["id"]) == "done")
+        assert sorted(n for _, n in runs) == [1, 1]
+        assert a.queue.get("s1", job["id"])["result"]["owner"] == a.queue.owner
+    finally:
+        release.set()
+        a.queue.stop()
+        b.queue.stop()
+
+
+def test_cancel_from_another_worker(Session):
+    runs, release = [], threading.Event()
+    a, b = Worker(Session, runs, release), Worker(Session, runs, release)
+    a.queue.start()
+    b.queue.start()
+    try:
+        job, _ = a.queue.submit("s1", "count", {"n": 1})
+        _wait(lambda: _status(a.queue, "s1", job["id"]) == "running")
+        assert b.queue.peek("s1", job["id"]) is None
+        a.quiet.set()
+        time.sleep(0.05)  # que termine un ctx.progress() en curso
+        out = b.queue.cancel("s1", job["id"])
+        # B no lo cierra: el lease de A sigue vigente
+        assert out["cancel_requested"] and out["status"] == "running"
+        # A lo nota en su siguiente ctx.progress()
+        a.quiet.clear()
+        _wait(lambda: _status(b.queue, "s1", job["id"]) == "cancelled")
+        assert a.queue.stats()["cancelled"] == 1
+    finally:
+        release.set()
+        a.queue.stop()
+        b.queue.stop()
+
+
+def test_orphaned_jobs_are_adopted_once(Session):
+    runs, release = [], threading.Event()
+    release.set()
+    with Session() as db:
+        old = datetime.utcnow() - timedelta(minutes=5)
+        for i, lease in enumerate((old, None, datetime.utcnow() + timedelta(minutes=5))):
+            db.add(Job(id=f"j{i}", sid="s1", kind="count", status="running", params_json=f'{{"n": {i}}}',
+                       owner="muerto:1:x" if lease else None, lease_until=lease, created_at=old))
+        db.add(Job(id="j3", sid="s1", kind="count", status="queued", params_json='{"n": 3}', owner="muerto:1:x",
+                   lease_until=old, cancel_requested=True, created_at=old))
+        db.commit()
+    workers = [Worker(Session, runs, release) for _ in range(3)]
+    starters = [threading.Thread(target=w.queue.start) for w in workers]
+    for t in starters:
+        t.start()
+    for t in starters:
+        t.join()
+    try:
+        q = workers[0].queue
+        _wait(lambda: _status(q, "s1", "j0") == "done" and _status(q, "s1", "j1") == "done")
+        assert sorted(n for _, n in runs) == [0, 1]          # una vez cada uno
+        assert _status(q, "s1", "j2") == "running"           # su dueño sigue vivo (lease vigente)
+        assert _status(q, "s1", "j3") == "cancelled"
+        assert sum(w.queue.stats()["recovered"] for w in workers) == 2
+    finally:
+        for w in workers:
+            w.queue.stop()
+
+
+def test_worker_that_lost_its_lease_drops_the_job(Session):
+    runs, release = [], threading.Event()
+    a, b = Worker(Session, runs, release), Worker(Session, runs, release)
+    a.queue.start()
+    try:
+        job, _ = a.queue.submit("s1", "count", {"n": 7})
+        _wait(lambda: _status(a.queue, "s1", job["id"]) == "running")
+        # A se colgó más que el lease: B lo retoma
+        a.queue._lease_stop.set()
+        with Session() as db:
+            db.query(Job).filter(Job.id == job["id"]).update({"lease_until": datetime.utcnow() - timedelta(seconds=1)})
+            db.commit()
+        b.queue.start()
+        _wait(lambda: len(runs) == 2)
+        _wait(lambda: a.queue.peek("s1", job["id"]) is None)  # A lo soltó en su siguiente ctx.progress()
+        release.set()
+        _wait(lambda: _status(b.queue, "s1", job["id"]) == "done")
+        assert b.queue.get("s1", job["id"])["result"]["owner"] == b.queue.owner
+        assert a.queue.stats()["done"] == 0
+    finally:
+        release.set()
+        a.queue.stop()
+        b.queue.stop()
+
+
+def test_stop_releases_jobs_for_other_workers(Session):
+    runs, release = [], threading.Event()
+    a, b = Worker(Session, runs, release), Worker(Session, runs, release)
+    a.queue.start()
+    b.queue.start()
+    try:
+        job, _ = a.queue.submit("s1", "count", {"n": 2})
+        _wait(lambda: _status(a.queue, "s1", job["id"]) == "running")
+        a.queue.stop()
+        assert _status(b.queue, "s1", job["id"]) == "queued"
+        b.queue._heartbeat()
+        release.set()
+        _wait(lambda: _status(b.queue, "s1", job["id"]) == "done")
+        assert [o for o, _ in runs] == [a.queue.owner, b.queue.owner]
+    finally:
+        release.set()
+        a.queue.stop()
+        b.queue.stop()
@@ -0,0 +1,200 @@
+# backend/test_model_search.py
+# Stepwise y mejores subconjuntos (barridos sobre los momentos) contra OLS por fuerza bruta.
+#   python -m pytest test_model_search.py
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+import model_search
+from model_search import Criterion, SearchProblem, best_subsets, stepwise
+from moments import Moments
+from solvers import solve_ols
+
+CANDIDATES = ["x0", "x1", "x2", "x3", "x4", "x01"]
+
+
+def _rows(n=60, seed=0) -> dict:
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 5))
+    rows = {f"x{j}": X[:, j] for j in range(5)}
+    rows["x01"] = X[:, 0] + X[:, 1]  # colineal con x0 y x1 juntas
+    rows["y"] = 1.0 + 2.0 * X[:, 0] - 1.5 * X[:, 2] + 0.3 * X[:, 3] + rng.normal(scale=0.8, size=n)
+    return rows
+
+
+class Brute:
+    """SSE y puntaje de cada subconjunto reajustando OLS sobre las filas."""
+
+    def __init__(self, rows: dict, fit_intercept: bool, criterion: str):
+        self.rows = rows
+        self.n = len(rows["y"])
+        self.fit_intercept = fit_intercept
+        self.k0 = 1 if fit_intercept else 0
+        y = rows["y"]
+        self.crit = Criterion(criterion, self.n, float(((y - y.mean()) ** 2).sum()))
+
+    def design(self, cols):
+        X = np.column_stack([self.rows[c] for c in cols]) if cols else np.empty((self.n, 0))
+        if self.fit_intercept:
+            X = np.column_stack([np.ones(self.n), X])
+        return X
+
+    def full_rank(self, cols) -> bool:
+        X = self.design(cols)
+        return X.shape[1] == 0 or np.linalg.matrix_rank(X) == X.shape[1]
+
+    def sse(self, cols) -> float:
+        y = self.rows["y"]
+        X = self.design(cols)
+        if X.shape[1] == 0:
+            return float(y @ y)
+        e = y - X @ solve_ols(X, y).beta
+        return float(e @ e)
+
+    def score(self, cols) -> float:
+        return self.crit.score(self.sse(cols), len(cols) + self.k0)
+
+    def subsets(self):
+        for size in range(1, len(CANDIDATES) + 1):
+            for cols in itertools.combinations(CANDIDATES, size):
+                if self.full_rank(cols):
+                    yield cols
+
+
+def _greedy(bf: Brute, strategy: str) -> tuple:
+    """Stepwise de referencia: mismo criterio de parada, SSE reajustados."""
+    current = []
+    if strategy == "backward":
+        for c in CANDIDATES:
+            if bf.full_rank(current + [c]):
+                current.append(c)
+    score = bf.score(current)
+    path = []
+    while True:
+        moves = []
+        if strategy in ("forward", "stepwise"):
+            moves += [("add", c, current + [c]) for c in CANDIDATES
+                      if c not in current and bf.full_rank(current + [c])]
+        if strategy in ("backward", "stepwise"):
+            moves += [("remove", c, [d for d in current if d != c]) for c in current]
+        if not moves:
+            break
+        best = min(moves, key=lambda mv: bf.score(mv[2]))
+        best_score = bf.score(best[2])
+        if not best_score < score - 1e-12 * max(1.0, abs(score)):
+            break
+        action, c, current = best
+        score = best_score
+        path.append((action, c))
+    return path, sorted(current, key=CANDIDATES.index)
+
+
+def _names(cols) -> tuple:
+    return tuple(CANDIDATES[j] for j in cols)
+
+
+@pytest.mark.parametrize("fit_intercept", [True, False])
+@pytest.mark.parametrize("strategy", ["forward", "backward", "stepwise"])
+@pytest.mark.parametrize("criterion", ["aic", "bic", "adj_r2"])
+def test_stepwise_matches_brute_force(strategy, criterion, fit_intercept):
+    rows = _rows()
+    m, bf = Moments.from_columns(rows), Brute(rows, fit_intercept, criterion)
+    steps = list(stepwise(SearchProblem(m, "y", CANDIDATES, fit_intercept, criterion), strategy))
+    start, moves, done = steps[0], steps[1:-1], steps[-1]
+    if strategy == "backward":
+        assert start["aliased"] == ["x01"]  # x0 y x1 ya están: x01 no entra al modelo completo
+    path, final = _greedy(bf, strategy)
+    assert [(s["action"], s["variable"]) for s in moves] == path
+    assert done["columns"] == final
+    for s in moves:
+        assert s["sse"] == pytest.approx(bf.sse(s["columns"]), rel=1e-9)
+        assert s[criterion] == pytest.approx(bf.crit.value(bf.sse(s["columns"]), len(s["columns"]) + bf.k0), rel=1e-9)
+
+
+@pytest.mark.parametrize("strategy", ["forward", "stepwise"])
+def test_search_never_adds_a_collinear_candidate(strategy):
+    # sin penalización (BIC con log n = 0) entra todo lo que baje el SSE: la que queda afuera es colineal
+    rows = _rows()
+    m, bf = Moments.from_columns(rows), Brute(rows, True, "aic")
+    problem = SearchProblem(m, "y", CANDIDATES, True, "aic")
+    problem.crit.log_n = 0.0
+    problem.crit.name = "bic"
+    for s in stepwise(problem, strategy):
+        assert bf.full_rank(s["columns"])
+    assert len(s["columns"]) == 5 and not {"x0", "x1", "x01"} <= set(s["columns"])
+
+
+@pytest.mark.parametrize("fit_intercept", [True, False])
+@pytest.mark.parametrize("criterion", ["aic", "bic", "adj_r2"])
+def test_best_subsets_match_brute_force(criterion, fit_intercept, monkeypatch):
+    monkeypatch.setattr(model_search, "SUBSET_TASK_BITS", 3)  # varias tareas que hay que fusionar
+    rows = _rows()
+    m, bf = Moments.from_columns(rows), Brute(rows, fit_intercept, criterion)
+    top = 10
+    out = list(best_subsets(SearchProblem(m, "y", CANDIDATES, fit_intercept, criterion), None, top))
+    final = out[-1]
+    assert final["done"] and out[-2]["tasks_total"] == 8
+
+    subsets = list(bf.subsets())
+    assert final["models"] == len(subsets)  # los que contienen x0, x1 y x01 no se evalúan
+    assert final["models"] == 2 ** len(CANDIDATES) - 1 - 2 ** 3
+
+    # x01 = x0 + x1: subconjuntos distintos con el mismo espacio columna empatan, así que se
+    # comparan los puntajes (el orden entre empatados queda al redondeo)
+    scores = {cols: bf.score(cols) for cols in subsets}
+    got = [_names(c) for _, _, c in final["ranked"]]
+    assert len(set(got)) == top
+    np.testing.assert_allclose([sc for sc, _, _ in final["ranked"]], sorted(scores.values())[:top], rtol=1e-9)
+    for sc, sse, cols in final["ranked"]:
+        assert sse == pytest.approx(bf.sse(_names(cols)), rel=1e-9)
+        assert sc == pytest.approx(scores[_names(cols)], rel=1e-9)
+
+    for size, (sc, _, cols) in final["by_size"].items():
+        best = min(scores[c] for c in subsets if len(c) == size)
+        assert sc == pytest.approx(best, rel=1e-9) and scores[_names(cols)] == pytest.approx(best, rel=1e-9)
+    assert sorted(final["by_size"]) == list(range(1, len(CANDIDATES)))  # el de 6 es colineal
+
+
+def test_best_subsets_in_a_process_pool_matches_serial(monkeypatch):
+    monkeypatch.setattr(model_search, "SUBSET_PARALLEL_MIN_MODELS", 0)
+    m = Moments.from_columns(_rows())
+    problem = SearchProblem(m, "y", CANDIDATES, True, "bic")
+    serial = list(best_subsets(problem, 4, 15))[-1]
+    ctx = multiprocessing.get_context("forkserver")
+    with ProcessPoolExecutor(max_workers=2, mp_context=ctx) as pool:
+        out = list(best_subsets(problem, 4, 15, pool=pool, workers=2))
+    assert out[-2]["tasks_total"] == 8
+    parallel = out[-1]
+    assert parallel["models"] == serial["models"]
+    np.testing.assert_allclose([s for s, _, _ in parallel["ranked"]], [s for s, _, _ in serial["ranked"]], rtol=1e-9)
+    np.testing.assert_allclose([parallel["by_size"][k][0] for k in sorted(serial["by_size"])],
+                               [serial["by_size"][k][0] for k in sorted(serial["by_size"])], rtol=1e-9)
+
+
+@pytest.mark.parametrize("strategy", ["forward", "best_subset"])
+def test_search_labels_coefficients_with_candidates_out_of_order(strategy):
+    # las candidatas vienen en el orden del archivo, no alfabético
+    from main import _search_events, _search_problem
+
+    rng = np.random.default_rng(4)
+    n = 50
+    cols = {"y": None, "x2": rng.normal(size=n), "x1": rng.normal(size=n), "b": rng.normal(size=n)}
+    cols["y"] = 1.0 + 5.0 * cols["x1"] - 3.0 * cols["x2"] + rng.normal(scale=0.01, size=n)
+    m = Moments.from_columns(cols)
+    params = {"strategy": strategy, "criterion": "bic", "max_k": None, "top": 3, "parallel": False}
+    problem = _search_problem(m, "y", "x2,x1,b", True, params)
+    assert problem.candidates == ["x2", "x1", "b"]
+    result = [ev for ev in _search_events(m, problem, params) if ev["type"] == "result"][0]
+    best = result["ranked"][0]
+    assert sorted(best["columns"]) == ["x1", "x2"]
+    coef = best["fit"]["coefficients"]
+    assert coef["intercept"] == pytest.approx(1.0, abs=0.01)
+    assert coef["x1"] == pytest.approx(5.0, abs=0.01) and coef["x2"] == pytest.approx(-3.0, abs=0.01)
+    for model in result["ranked"]:
+        ref = m.fit("y", sorted(model["columns"]), True)
+        names = ["intercept"] + sorted(model["columns"])
+        assert list(model["fit"]["coefficients"].values()) == pytest.approx(ref["beta"])
+        assert list(model["fit"]["coefficients"]) == names
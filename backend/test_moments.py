@@ -0,0 +1,96 @@
+# backend/test_moments.py
+# Motor "moments" (estadísticos suficientes) contra el motor por filas sobre los mismos datos.
+#   python -m pytest test_moments.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from columnar import write_sidecar
+from moments import Moments, MomentsAccumulator, moments_cache, moments_for_path
+from solvers import ols_summary, solve_ols
+
+LEVELS = (0.9, 0.95)
+
+
+def _rows_fit(y, X, fit_intercept):
+    """Lo que hace _ols en main.py: solver sobre las filas y el mismo resumen."""
+    if fit_intercept:
+        X = np.column_stack([np.ones(len(y)), X])
+    sol = solve_ols(X, y)
+    e = y - X @ sol.beta
+    return ols_summary(sol.beta, np.diag(sol.cov_unscaled), float(e @ e), float(((y - y.mean()) ** 2).sum()),
+                       len(y), X.shape[1], sol, fit_intercept=fit_intercept, yty=float(y @ y),
+                       conf_levels=LEVELS, fields=("cov",))
+
+
+def _data(n=200, offset=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+    cols = {"a": rng.normal(size=n) + offset, "b": rng.uniform(size=n), "c": rng.integers(0, 5, size=n).astype(float)}
+    cols["y"] = 3.0 + 0.5 * cols["a"] - 2.0 * cols["b"] + 0.1 * cols["c"] + rng.normal(scale=0.4, size=n)
+    return cols
+
+
+def _assert_same(got, ref, rtol=1e-9):
+    for key in ("beta", "se_beta", "t_stats", "p_values", "cov"):
+        np.testing.assert_allclose(got[key], ref[key], rtol=rtol, atol=1e-10, err_msg=key)
+    for key in ("r2", "adj_r2", "sse", "sigma2", "f_stat", "f_pvalue"):
+        assert got[key] == pytest.approx(ref[key], rel=rtol, abs=1e-12), key
+    for level in got["conf_int"]:
+        np.testing.assert_allclose(got["conf_int"][level], ref["conf_int"][level], rtol=rtol, atol=1e-10)
+    for part in ("model", "residual", "total"):
+        for key, value in ref["anova"][part].items():
+            assert got["anova"][part][key] == pytest.approx(value, rel=rtol, abs=1e-12), (part, key)
+    assert got["dof_resid"] == ref["dof_resid"] and got["rank"] == ref["rank"]
+
+
+@pytest.mark.parametrize("fit_intercept", [True, False])
+@pytest.mark.parametrize("xs", [["a"], ["a", "b"], ["c", "a", "b"]])
+def test_moments_fit_matches_rows_fit(xs, fit_intercept):
+    cols = _data()
+    m = Moments.from_columns(cols)
+    got = m.fit("y", xs, fit_intercept, LEVELS, ("cov",))
+    ref = _rows_fit(cols["y"], np.column_stack([cols[c] for c in xs]), fit_intercept)
+    _assert_same(got, ref)
+
+
+def test_centered_moments_survive_a_large_offset():
+    # x ~ 1e6 + N(0, 1): la Gram cruda pierde las pendientes, los co-momentos centrados no
+    cols = _data(offset=1e6)
+    got = Moments.from_columns(cols).fit("y", ["a", "b"], True, LEVELS, ("cov",))
+    ref = _rows_fit(cols["y"], np.column_stack([cols["a"], cols["b"]]), True)
+    _assert_same(got, ref, rtol=1e-6)
+
+
+def test_chunked_accumulator_matches_whole_file():
+    cols = _data(n=1003)
+    names = list(cols)
+    A = np.column_stack([cols[c] for c in names])
+    acc = MomentsAccumulator(names)
+    for start in range(0, len(A), 97):
+        acc.update(A[start:start + 97])
+    acc.update(A[:0])
+    whole = Moments.from_columns(cols)
+    m = acc.result()
+    assert m.n == whole.n
+    np.testing.assert_allclose(m.mean, whole.mean, rtol=1e-12)
+    np.testing.assert_allclose(m.comoment, whole.comoment, rtol=1e-10)
+    _assert_same(m.fit("y", ["a", "b", "c"], True, LEVELS, ("cov",)),
+                 _rows_fit(cols["y"], A[:, :3], True))
+
+
+@pytest.mark.parametrize("sidecar", [False, True])
+def test_moments_for_path_matches_rows_fit(tmp_path, sidecar):
+    cols = _data(n=50)
+    df = pd.DataFrame(cols)
+    df["label"] = ["g%d" % (i % 3) for i in range(len(df))]
+    path = str(tmp_path / "datos.csv")
+    df.to_csv(path, index=False)
+    if sidecar:
+        write_sidecar(path, pd.read_csv(path))
+    moments_cache.clear()
+    m = moments_for_path(path)
+    assert m.non_numeric == ["label"] and m.n == 50
+    back = pd.read_csv(path)  # lo que leería el motor por filas (mismo redondeo del CSV)
+    ref = _rows_fit(back["y"].to_numpy(float), back[["a", "b"]].to_numpy(float), True)
+    _assert_same(m.fit("y", ["a", "b"], True, LEVELS, ("cov",)), ref)
+    moments_cache.clear()
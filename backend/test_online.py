@@ -0,0 +1,129 @@
+# backend/test_online.py
+# Actualizaciones de rango uno de la sesión incremental contra un ajuste desde cero.
+#   python -m pytest test_online.py
+import numpy as np
+import pytest
+
+from online import DowndateFailed, OnlineRegression, _qr_r, chol_downdate, chol_update
+from solvers import solve_ols
+
+
+def _gram(R):
+    return R.T @ R
+
+
+def _fresh(rows, k):
+    """Lo que daría reajustar desde cero sobre las filas actuales."""
+    A = np.vstack(rows)
+    X, y = A[:, :k], A[:, k]
+    sol = solve_ols(X, y)
+    e = y - X @ sol.beta
+    return sol.beta, float(e @ e), float(((y - y.mean()) ** 2).sum())
+
+
+def _check(s: OnlineRegression, rtol=1e-9):
+    beta, sse, sst = _fresh(s.rows, s.k)
+    out = s.fit()
+    np.testing.assert_allclose(out["beta"], beta, rtol=rtol, atol=1e-10)
+    assert out["sse"] == pytest.approx(sse, rel=1e-8, abs=1e-10)
+    assert s.y_m2 == pytest.approx(sst, rel=1e-9)
+    assert out["r2"] == pytest.approx(1.0 - sse / sst, rel=1e-8)
+
+
+def _session(n=40, p=3, seed=0, **kwargs):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([np.ones(n), rng.normal(size=(n, p))])
+    y = X @ rng.normal(size=p + 1) + rng.normal(scale=0.3, size=n)
+    s = OnlineRegression([f"x{i}" for i in range(p)], True, **kwargs)
+    s.load(y, X)
+    return s, rng
+
+
+def _row(rng, p):
+    values = {f"x{i}": float(v) for i, v in enumerate(rng.normal(size=p))}
+    values["y"] = float(rng.normal())
+    return values
+
+
+def test_givens_update_and_hyperbolic_downdate_match_qr():
+    rng = np.random.default_rng(1)
+    A = rng.normal(size=(30, 5))
+    z = rng.normal(size=5)
+    R = _qr_r(A)
+    chol_update(R, z)
+    np.testing.assert_allclose(_gram(R), _gram(_qr_r(np.vstack([A, z]))), rtol=1e-10, atol=1e-10)
+    assert np.allclose(np.tril(R, -1), 0.0)
+    chol_downdate(R, z)
+    np.testing.assert_allclose(_gram(R), A.T @ A, rtol=1e-10, atol=1e-10)
+
+
+def test_downdate_that_would_lose_rank_fails_without_touching_r():
+    A = np.array([[1.0, 0.0], [1.0, 0.0], [1.0, 2.0]])  # solo la última fila da rango a la columna 2
+    R = _qr_r(A)
+    before = R.copy()
+    with pytest.raises(DowndateFailed):
+        chol_downdate(R, A[2])
+    np.testing.assert_array_equal(R, before)
+
+
+def test_edit_sequence_matches_fresh_fit():
+    s, rng = _session()
+    _check(s)
+    for step in range(60):
+        kind = ("append", "insert", "set", "delete")[step % 4]
+        index = int(rng.integers(0, s.n))
+        op = {"op": kind, "index": s.n if kind == "append" else index}
+        if kind != "delete":
+            op["row"] = _row(rng, 3)
+        s.apply(s.plan([op]))
+        _check(s)
+    assert s.updates > 0 and s.downdates > 0 and s.forced_refactors == 0
+
+
+def test_periodic_refactor_keeps_results():
+    s, rng = _session(refactor_every=5)
+    ops = [{"op": "append", "row": _row(rng, 3)} for _ in range(12)]
+    s.apply(s.plan(ops))
+    assert s.refactors == 1 + 2 and s.since_refactor == 2
+    _check(s)
+
+
+def test_forced_refactor_when_a_delete_drops_rank():
+    # x0 solo varía en la última fila: borrarla deja X sin rango completo
+    rows = [[1.0, 0.0, float(i), float(i) * 0.5 + 1.0] for i in range(6)] + [[1.0, 3.0, 2.0, 7.0]]
+    A = np.array(rows)
+    s = OnlineRegression(["x0", "x1"], True)
+    s.load(A[:, -1], A[:, :-1])
+    _check(s)
+    s.apply(s.plan([{"op": "delete", "index": 6}]))
+    assert s.forced_refactors == 1
+    # deficiente en rango: la sesión cae a SVD sobre las filas (solución de norma mínima)
+    out = s.fit()
+    assert out["solver"] == "svd" and out["rank"] == 2
+    ref = solve_ols(np.vstack(s.rows)[:, :3], np.vstack(s.rows)[:, 3], "svd")
+    np.testing.assert_allclose(out["beta"], ref.beta, atol=1e-10)
+    # y recupera el rango con una fila nueva
+    s.apply(s.plan([{"op": "append", "row": {"x0": 1.0, "x1": 4.0, "y": 2.0}}]))
+    _check(s)
+    assert s.fit()["solver"] == "online-qr"
+
+
+def test_set_that_replaces_the_only_informative_row():
+    rows = [[1.0, 0.0, 1.0], [1.0, 0.0, 2.0], [1.0, 1.0, 3.0]]
+    A = np.array(rows)
+    s = OnlineRegression(["x0"], True)
+    s.load(A[:, -1], A[:, :-1])
+    s.apply(s.plan([{"op": "set", "index": 2, "row": {"x0": 2.0, "y": 5.0}}]))
+    _check(s)
+    s.apply(s.plan([{"op": "set", "index": 2, "row": {"x0": 0.0, "y": 5.0}}]))
+    assert s.forced_refactors == 1
+    assert s.fit()["solver"] == "svd"
+
+
+def test_plan_validates_before_applying():
+    s, rng = _session(n=5)
+    with pytest.raises(ValueError, match="fuera de rango"):
+        s.plan([{"op": "delete", "index": 0}] * 5 + [{"op": "delete", "index": 0}])
+    with pytest.raises(ValueError, match="no coinciden"):
+        s.plan([{"op": "append", "row": {"y": 1.0}}])
+    assert s.n == 5 and s.deltas == 0
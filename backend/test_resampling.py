@@ -0,0 +1,137 @@
+# backend/test_resampling.py
+# Remuestreo: reproducibilidad por semilla (con y sin procesos) e intervalos BCa.
+#   python -m pytest test_resampling.py
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+from scipy.special import ndtr, ndtri
+
+import resampling
+from estimators import parse_spec
+from resampling import _blocks, _intervals, _residual_block, parse_resample, resample
+
+NAMES = ["(Intercept)", "x0", "x1"]
+
+
+def _data(n=80, seed=3):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([np.ones(n), rng.normal(size=n), rng.exponential(size=n)])
+    y = X @ np.array([0.5, 1.2, 0.0]) + rng.standard_t(4, size=n)  # x1 no entra al modelo
+    xtx_inv = np.linalg.inv(X.T @ X)
+    return X, y, xtx_inv @ X.T @ y, xtx_inv
+
+
+def _run(kind, seed, B=1200, **kwargs):
+    X, y, beta, xtx_inv = _data()
+    out = resample(X, y, beta, xtx_inv, NAMES, True, kind, B, seed, (0.9, 0.95), **kwargs)
+    out.pop("elapsed_ms")
+    return out
+
+
+@pytest.mark.parametrize("kind", ["pairs", "residual", "permutation"])
+def test_same_seed_same_result(kind):
+    a, b = _run(kind, 11), _run(kind, 11)
+    assert a == b and a["blocks"] == 3
+    other = _run(kind, 12)
+    key = "p_values" if kind == "permutation" else "std_errors"
+    assert other[key] != a[key]
+
+
+@pytest.mark.parametrize("kind", ["pairs", "residual", "permutation"])
+def test_process_pool_gives_the_serial_result(kind, monkeypatch):
+    monkeypatch.setattr(resampling, "RESAMPLE_PARALLEL_MIN_WORK", 0)
+    serial = _run(kind, 5)
+    ctx = multiprocessing.get_context("forkserver")
+    with ProcessPoolExecutor(max_workers=2, mp_context=ctx) as pool:
+        seen = []
+        parallel = _run(kind, 5, pool_factory=lambda: pool, progress=lambda done, total: seen.append((done, total)))
+    assert parallel.pop("parallel") and not serial.pop("parallel")
+    assert parallel == serial
+    assert seen == [(1, 3), (2, 3), (3, 3)]
+
+
+def test_blocks_do_not_depend_on_b():
+    # cada bloque tiene su semilla hija: con más réplicas los primeros bloques no cambian
+    X, y, beta, xtx_inv = _data()
+    e, PT = y - X @ beta, X @ xtx_inv
+    short = np.vstack([_residual_block(e, PT, beta, size, seq) for size, seq in _blocks(700, 9)])
+    long = np.vstack([_residual_block(e, PT, beta, size, seq) for size, seq in _blocks(1500, 9)])
+    np.testing.assert_array_equal(short[:500], long[:500])
+    assert [size for size, _ in _blocks(1200, 0)] == [500, 500, 200]
+
+
+def test_permutation_p_values():
+    out = _run("permutation", 1, B=999)
+    p = out["p_values"]
+    assert p["(Intercept)"] is None
+    assert p["x0"] == pytest.approx(1.0 / 1000)   # efecto fuerte: ninguna permutación lo alcanza
+    assert p["x1"] > 0.05
+
+
+def test_closed_form_jackknife_matches_leave_one_out(monkeypatch):
+    X, y, beta, xtx_inv = _data(n=30)
+    seen = {}
+
+    def capture(reps, beta, jack_u, names, conf_levels):
+        seen["jack_u"] = jack_u
+        return _intervals(reps, beta, jack_u, names, conf_levels)
+
+    monkeypatch.setattr(resampling, "_intervals", capture)
+    resample(X, y, beta, xtx_inv, NAMES, True, "residual", 100, 0, (0.95,))
+    loo = np.array([np.linalg.lstsq(np.delete(X, i, 0), np.delete(y, i), rcond=None)[0] for i in range(len(y))])
+    u = loo.mean(axis=0) - loo  # u_i = media(theta_(.)) - theta_(i)
+    np.testing.assert_allclose(seen["jack_u"], u, rtol=1e-9, atol=1e-12)
+
+
+def test_bca_of_a_skewed_mean_matches_efron():
+    # media de una muestra exponencial: caso de libro (Efron & Tibshirani, cap. 14)
+    rng = np.random.default_rng(0)
+    y = rng.exponential(size=25)
+    theta = y.mean()
+    reps = y[rng.integers(0, len(y), size=(4000, len(y)))].mean(axis=1)
+    loo = (y.sum() - y) / (len(y) - 1)
+    u = loo.mean() - loo
+
+    out = _intervals(reps[:, None], np.array([theta]), u[:, None], ["m"], (0.9,))
+    z0 = ndtri((reps < theta).mean())
+    a = (u ** 3).sum() / (6.0 * (u ** 2).sum() ** 1.5)
+    z = ndtri(np.array([0.05, 0.95]))
+    expected = np.quantile(reps, ndtr(z0 + (z0 + z) / (1.0 - a * (z0 + z))))
+    np.testing.assert_allclose(out["bca"]["0.9"]["m"], expected, rtol=1e-12)
+    assert a > 0
+    # asimetría a la derecha: BCa corre el intervalo hacia arriba respecto del percentil
+    lo_p, hi_p = out["percentile"]["0.9"]["m"]
+    lo_b, hi_b = out["bca"]["0.9"]["m"]
+    assert lo_b > lo_p and hi_b > hi_p
+
+
+def test_bca_equals_percentile_without_bias_or_skew():
+    reps = np.linspace(-1.0, 1.0, 2001)[:, None]  # simétrica alrededor de beta = 0
+    u = np.array([-1.0, 1.0, -2.0, 2.0])[:, None]  # aceleración nula
+    out = _intervals(reps, np.zeros(1), u, ["b"], (0.8,))
+    np.testing.assert_allclose(out["bca"]["0.8"]["b"], out["percentile"]["0.8"]["b"], atol=1e-12)
+
+
+def test_unseeded_request_draws_a_seed_and_reports_it():
+    out = _run("residual", None)
+    assert out.pop("seed_drawn") and isinstance(out["seed"], int)
+    again = _run("residual", out["seed"])
+    assert not again.pop("seed_drawn")
+    assert again == out
+    # sin semilla no se fija una al parsear: la clave de cache / dedup es la misma en cada pedido
+    a, b = parse_spec("ols", resample="pairs"), parse_spec("ols", resample="pairs")
+    assert a.seed is None and a.cache_key() == b.cache_key() and a._asdict() == b._asdict()
+    assert parse_spec("ols", resample="pairs", seed="3").cache_key() != a.cache_key()
+
+
+def test_parse_resample():
+    assert parse_resample(None, None, None) == (None, 0, None)
+    assert parse_resample("Pairs", "200", "7") == ("pairs", 200, 7)
+    assert parse_resample("residual", None, None) == ("residual", resampling.RESAMPLE_B_DEFAULT, None)
+    for args, msg in [((None, "100", None), "solo aplican"), (("jackknife", None, None), "desconocido"),
+                      (("pairs", "5", None), "entre"), (("pairs", "x", None), "enteros"),
+                      (("pairs", None, "-1"), "no negativo")]:
+        with pytest.raises(ValueError, match=msg):
+            parse_resample(*args)
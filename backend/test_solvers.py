@@ -0,0 +1,183 @@
+# backend/test_solvers.py
+# Elección Cholesky / QR / SVD según el número de condición, contra lstsq y la pseudo-inversa,
+# e inferencia de ols_summary (t, p, IC, F, ANOVA, fields=) contra las fórmulas de libro.
+#   python -m pytest test_solvers.py
+import numpy as np
+import pytest
+from scipy import stats
+
+from solvers import (COND_CHOLESKY_MAX, COND_QR_MAX, _scaled_cond_R, _scaled_gram_cond, ols_summary,
+                     residual_fields, solve_gram, solve_ols)
+
+
+def _design(n=100, eps=None, seed=0, scale=1.0):
+    """[1, x1, x2, x3]; con eps, x3 = x1 + eps·ruido (condición ~ 1/eps)."""
+    rng = np.random.default_rng(seed)
+    x1, x2 = rng.normal(size=n), rng.normal(size=n)
+    x3 = rng.normal(size=n) if eps is None else x1 + eps * rng.normal(size=n)
+    X = np.column_stack([np.ones(n), x1, x2 * scale, x3])
+    y = X @ np.array([1.0, 2.0, -1.0 / scale, 0.5]) + rng.normal(scale=0.1, size=n)
+    return X, y
+
+
+def _lstsq(X, y):
+    return np.linalg.lstsq(X, y, rcond=None)[0]
+
+
+def test_well_conditioned_uses_cholesky():
+    X, y = _design()
+    sol = solve_ols(X, y)
+    assert sol.method == "cholesky" and sol.rank == 4 and sol.cond < 10
+    np.testing.assert_allclose(sol.beta, _lstsq(X, y), rtol=1e-10)
+    np.testing.assert_allclose(sol.cov_unscaled, np.linalg.inv(X.T @ X), rtol=1e-10)
+
+
+def test_condition_ignores_column_units():
+    # la misma X con una columna en otras unidades: mismo cond equilibrado, mismo método
+    X, y = _design()
+    Xs, ys = _design(scale=1e6)
+    a, b = solve_ols(X, y), solve_ols(Xs, ys)
+    assert b.method == "cholesky" and b.cond == pytest.approx(a.cond, rel=1e-6)
+    np.testing.assert_allclose(b.beta, _lstsq(Xs, ys), rtol=1e-8)
+
+
+def test_ill_conditioned_uses_qr():
+    X, y = _design(eps=1e-6)
+    sol = solve_ols(X, y)
+    assert sol.method == "qr" and COND_CHOLESKY_MAX < sol.cond < COND_QR_MAX and sol.rank == 4
+    assert sol.cond == pytest.approx(_scaled_cond_R(np.linalg.qr(X, mode="r")), rel=1e-12)
+    np.testing.assert_allclose(sol.beta, _lstsq(X, y), rtol=1e-6)
+    P = np.linalg.pinv(X)  # (X'X)^{-1} = X^+ X^+', sin elevar la condición al cuadrado
+    np.testing.assert_allclose(sol.cov_unscaled, P @ P.T, rtol=1e-6)
+    # Cholesky forzado sobre los mismos datos pierde ~cond^2 de precisión
+    chol = solve_ols(X, y, "cholesky")
+    assert chol.method == "cholesky"
+    assert np.abs(chol.beta - _lstsq(X, y)).max() > np.abs(sol.beta - _lstsq(X, y)).max()
+
+
+def test_nearly_singular_falls_to_svd():
+    X, y = _design(eps=1e-11)
+    sol = solve_ols(X, y)
+    assert sol.method == "svd" and sol.cond > COND_QR_MAX
+    # con QR pedido explícitamente se respeta mientras R tenga rango completo
+    assert solve_ols(X, y, "qr").method == "qr"
+
+
+def test_rank_deficient_gives_the_minimum_norm_solution():
+    X, y = _design()
+    X = np.column_stack([X, X[:, 1] - 2.0 * X[:, 2]])  # quinta columna combinación exacta
+    sol = solve_ols(X, y)
+    assert sol.method == "svd" and sol.rank == 4
+    np.testing.assert_allclose(sol.beta, np.linalg.pinv(X) @ y, rtol=1e-8, atol=1e-10)
+    np.testing.assert_allclose(sol.cov_unscaled, np.linalg.pinv(X.T @ X), rtol=1e-6, atol=1e-10)
+    assert solve_ols(X, y, "qr").method == "svd"  # R singular: QR no sirve
+
+
+def test_solve_gram_matches_rows():
+    X, y = _design()
+    sol = solve_gram(X.T @ X, X.T @ y)
+    assert sol.method == "cholesky"
+    np.testing.assert_allclose(sol.beta, solve_ols(X, y).beta, rtol=1e-10)
+    # sin filas no hay QR: descomposición espectral (pseudo-inversa si es singular)
+    Xd = np.column_stack([X, X[:, 1] + X[:, 3]])
+    sol = solve_gram(Xd.T @ Xd, Xd.T @ y)
+    assert sol.method == "eigh" and sol.rank == 4
+    np.testing.assert_allclose(sol.beta, np.linalg.pinv(Xd) @ y, rtol=1e-6, atol=1e-8)
+
+
+def test_gram_cond_estimate():
+    X, _ = _design(eps=1e-3)
+    d = np.linalg.norm(X, axis=0)
+    assert _scaled_gram_cond(X.T @ X) == pytest.approx(np.linalg.cond(X / d), rel=1e-6)
+    with pytest.raises(ValueError, match="desconocido"):
+        solve_ols(X, np.zeros(len(X)), "lu")
+
+
+def _summary(X, y, fit_intercept, conf_levels=(0.9, 0.95), fields=()):
+    sol = solve_ols(X, y)
+    e = y - X @ sol.beta
+    return ols_summary(sol.beta, np.diag(sol.cov_unscaled), float(e @ e), float(((y - y.mean()) ** 2).sum()),
+                       len(y), X.shape[1], sol, fit_intercept=fit_intercept, yty=float(y @ y),
+                       conf_levels=conf_levels, fields=fields)
+
+
+@pytest.mark.parametrize("fit_intercept", [True, False])
+def test_inference_matches_textbook_formulas(fit_intercept):
+    X, y = _design(n=30, seed=3)
+    y = y + np.random.default_rng(1).normal(scale=0.5, size=len(y))  # que no todo sea p ~ 0
+    if not fit_intercept:
+        X = X[:, 1:]
+    n, k = X.shape
+    out = _summary(X, y, fit_intercept, fields=("cov",))
+
+    beta = np.linalg.lstsq(X, y, rcond=None)[0]
+    e = y - X @ beta
+    sse = float(e @ e)
+    dof = n - k
+    sigma2 = sse / dof
+    cov = sigma2 * np.linalg.inv(X.T @ X)
+    se = np.sqrt(np.diag(cov))
+    t = beta / se
+    np.testing.assert_allclose(out["beta"], beta, rtol=1e-10)
+    np.testing.assert_allclose(out["se_beta"], se, rtol=1e-10)
+    np.testing.assert_allclose(out["t_stats"], t, rtol=1e-10)
+    np.testing.assert_allclose(out["p_values"], 2 * stats.t.sf(np.abs(t), dof), rtol=1e-8, atol=1e-300)
+    np.testing.assert_allclose(out["cov"], cov, rtol=1e-10)
+    for level in (0.9, 0.95):
+        half = stats.t.ppf((1 + level) / 2, dof) * se
+        np.testing.assert_allclose(out["conf_int"][f"{level:g}"], np.column_stack([beta - half, beta + half]),
+                                   rtol=1e-10)
+
+    # sin intercepto el modelo nulo es y = 0: suma de cuadrados no centrada y k grados en el modelo
+    sst = float(((y - y.mean()) ** 2).sum())
+    total = sst if fit_intercept else float(y @ y)
+    df_model = k - 1 if fit_intercept else k
+    f = (total - sse) / df_model / sigma2
+    assert out["sse"] == pytest.approx(sse, rel=1e-10) and out["sigma2"] == pytest.approx(sigma2, rel=1e-10)
+    assert out["dof_resid"] == dof
+    assert out["r2"] == pytest.approx(1 - sse / sst, rel=1e-10)
+    assert out["adj_r2"] == pytest.approx(1 - (sse / dof) / (sst / (n - 1)), rel=1e-10)
+    assert out["f_stat"] == pytest.approx(f, rel=1e-10)
+    assert out["f_pvalue"] == pytest.approx(stats.f.sf(f, df_model, dof), rel=1e-6, abs=1e-300)
+    anova = out["anova"]
+    assert anova["model"]["df"] == df_model and anova["residual"]["df"] == dof
+    assert anova["total"]["df"] == (n - 1 if fit_intercept else n)
+    assert anova["model"]["ss"] == pytest.approx(total - sse, rel=1e-10)
+    assert anova["model"]["ms"] == pytest.approx((total - sse) / df_model, rel=1e-10)
+    assert anova["model"]["f"] == out["f_stat"] and anova["model"]["p_value"] == out["f_pvalue"]
+    assert anova["residual"]["ss"] == pytest.approx(sse, rel=1e-10)
+    assert anova["residual"]["ms"] == pytest.approx(sigma2, rel=1e-10)
+    assert anova["total"]["ss"] == pytest.approx(total, rel=1e-10)
+
+
+def test_fields_are_only_returned_on_request():
+    X, y = _design(n=25)
+    out = _summary(X, y, True)
+    assert "cov" not in out and list(out["conf_int"]) == ["0.9", "0.95"]
+    assert "cov" in _summary(X, y, True, fields=("cov",))
+    assert list(_summary(X, y, True, conf_levels=(0.99,))["conf_int"]) == ["0.99"]
+
+    beta = solve_ols(X, y).beta
+    fitted = X @ beta
+    e = y - fitted
+    assert residual_fields(e, fitted, 1.0, ()) == {}
+    rows = residual_fields(e, fitted, 0.01, ("fitted", "residuals"))
+    assert set(rows) == {"fitted", "residuals"}
+    np.testing.assert_allclose(rows["fitted"] + rows["residuals"], y, rtol=1e-12)
+    diag = residual_fields(e, fitted, 0.01, ("diagnostics",))["diagnostics"]
+    assert diag["durbin_watson"] == pytest.approx(float((np.diff(e) ** 2).sum() / (e @ e)), rel=1e-12)
+    assert diag["skewness"] == pytest.approx(stats.skew(e), rel=1e-9)
+    assert diag["kurtosis"] == pytest.approx(stats.kurtosis(e, fisher=False), rel=1e-9)
+    jb = stats.jarque_bera(e)
+    assert diag["jarque_bera"] == pytest.approx(jb.statistic, rel=1e-9)
+    assert diag["jarque_bera_pvalue"] == pytest.approx(jb.pvalue, rel=1e-9)
+    assert diag["max_abs_std_residual"] == pytest.approx(np.abs(e).max() / 0.1, rel=1e-12)
+
+
+def test_perfect_fit_stays_json_safe():
+    X, _ = _design(n=10)
+    y = X @ np.array([1.0, 2.0, 3.0, 4.0])
+    out = _summary(X, y, True)
+    assert out["r2"] == pytest.approx(1.0)
+    values = [out["f_stat"], out["f_pvalue"], out["sigma2"], *out["t_stats"], *out["p_values"], *out["se_beta"]]
+    assert all(np.isfinite(v) for v in values)
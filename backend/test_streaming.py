@@ -0,0 +1,113 @@
+# backend/test_streaming.py
+# Ajuste por bloques (CSV y xlsx) contra _ols sobre el mismo archivo, la segunda pasada TSQR
+# y el sidecar escrito en la misma lectura.
+#   python -m pytest test_streaming.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from columnar import read_schema
+from main import _ols, _prepare_matrix
+from solvers import COND_CHOLESKY_MAX
+from streaming import stream_fit
+
+LEVELS = (0.9, 0.95)
+
+
+def _write(df: pd.DataFrame, tmp_path, kind: str) -> str:
+    path = str(tmp_path / f"datos.{kind}")
+    if kind == "csv":
+        df.to_csv(path, index=False)
+    else:
+        df.to_excel(path, index=False)
+    return path
+
+
+def _read(path: str, kind: str) -> pd.DataFrame:
+    # round_trip: el parser rápido de pandas puede errar en 1 ulp; el streaming lee exacto
+    return pd.read_csv(path, float_precision="round_trip") if kind == "csv" else pd.read_excel(path)
+
+
+def _rows_fit(path, kind, y, xs, fit_intercept):
+    """Lo que hace el endpoint sin streaming: el archivo entero en memoria y _ols."""
+    df = _read(path, kind)
+    y_arr, X_arr = _prepare_matrix(df[y].to_numpy(float), {c: df[c].to_numpy(float) for c in xs}, fit_intercept)
+    return _ols(y_arr, X_arr, fit_intercept, conf_levels=LEVELS)
+
+
+def _assert_same(got, ref, rtol=1e-9, atol=1e-10):
+    for key in ("beta", "se_beta", "t_stats", "p_values"):
+        np.testing.assert_allclose(got[key], ref[key], rtol=rtol, atol=atol, err_msg=key)
+    for key in ("r2", "adj_r2", "sse", "sigma2", "f_stat"):
+        assert got[key] == pytest.approx(ref[key], rel=rtol, abs=atol), key
+    for level in ref["conf_int"]:
+        np.testing.assert_allclose(got["conf_int"][level], ref["conf_int"][level], rtol=rtol, atol=atol)
+    assert got["dof_resid"] == ref["dof_resid"] and got["rank"] == ref["rank"]
+
+
+def _frame(n=61, seed=0, x2=None):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"y": 0.0, "x1": rng.normal(size=n), "cuenta": rng.integers(0, 9, size=n)})
+    df["x2"] = rng.uniform(size=n) if x2 is None else x2(df["x1"].to_numpy(), rng)
+    df["y"] = 1.0 + 2.0 * df["x1"] - df["x2"] + 0.3 * df["cuenta"] + rng.normal(scale=0.5, size=n)
+    df["grupo"] = [f"g{i % 4}" for i in range(n)]
+    return df
+
+
+@pytest.mark.parametrize("kind", ["csv", "xlsx"])
+@pytest.mark.parametrize("fit_intercept", [True, False])
+def test_chunked_fit_matches_ols(tmp_path, kind, fit_intercept):
+    path = _write(_frame(), tmp_path, kind)
+    xs = ["x2", "cuenta", "x1"]
+    out, n = stream_fit(path, kind, "y", xs, fit_intercept, chunk_rows=7, conf_levels=LEVELS)
+    assert n == 61 and out["solver"] != "tsqr"
+    _assert_same(out, _rows_fit(path, kind, "y", xs, fit_intercept))
+
+
+@pytest.mark.parametrize("kind", ["csv", "xlsx"])
+def test_near_collinear_file_goes_through_tsqr(tmp_path, kind):
+    # x2 = x1 + ruido de 1e-5: X'X pierde dígitos, la segunda pasada resuelve por QR
+    path = _write(_frame(x2=lambda x1, rng: x1 + rng.normal(scale=1e-5, size=x1.size)), tmp_path, kind)
+    out, n = stream_fit(path, kind, "y", ["x1", "x2"], True, chunk_rows=10, conf_levels=LEVELS)
+    assert out["solver"] == "tsqr" and out["condition_number"] > COND_CHOLESKY_MAX and out["rank"] == 3
+    _assert_same(out, _rows_fit(path, kind, "y", ["x1", "x2"], True), rtol=1e-6)
+
+
+@pytest.mark.parametrize("kind", ["csv", "xlsx"])
+def test_rank_deficient_file_gives_the_svd_solution(tmp_path, kind):
+    path = _write(_frame(x2=lambda x1, rng: 2.0 * x1), tmp_path, kind)
+    out, _ = stream_fit(path, kind, "y", ["x1", "x2"], True, chunk_rows=10, conf_levels=LEVELS)
+    ref = _rows_fit(path, kind, "y", ["x1", "x2"], True)
+    assert out["solver"] == "tsqr" and ref["solver"] == "svd"
+    assert out["rank"] == ref["rank"] == 2
+    # misma solución de norma mínima y mismo SSE que la SVD sobre las filas
+    np.testing.assert_allclose(out["beta"], ref["beta"], rtol=1e-8, atol=1e-10)
+    assert out["sse"] == pytest.approx(ref["sse"], rel=1e-8)
+
+
+@pytest.mark.parametrize("kind", ["csv", "xlsx"])
+def test_stream_writes_the_sidecar_pandas_would(tmp_path, kind):
+    path = _write(_frame(n=45), tmp_path, kind)
+    assert read_schema(path) is None
+    stream_fit(path, kind, "y", ["x1"], True, chunk_rows=8, sidecar=True)
+    schema = read_schema(path)
+    df = _read(path, kind)
+    assert schema["n_rows"] == len(df)
+    meta = {c["name"]: c for c in schema["columns"]}
+    assert list(meta) == list(df.columns)
+    assert not meta["grupo"]["numeric"]
+    for name in ("y", "x1", "x2", "cuenta"):
+        arr = np.load(f"{schema['dir']}/{meta[name]['file']}")
+        assert arr.dtype == df[name].dtype, name  # "cuenta" sigue siendo entera
+        np.testing.assert_array_equal(arr, df[name].to_numpy())
+
+
+def test_non_numeric_cells_are_reported_and_marked_in_the_sidecar(tmp_path):
+    df = _frame(n=30)
+    df["x1"] = df["x1"].astype(object)
+    df.loc[[3, 17], "x1"] = "n/a"
+    path = _write(df, tmp_path, "csv")
+    with pytest.raises(ValueError, match=r"'x1' debe ser completamente numérica.*\[3, 17\]"):
+        stream_fit(path, "csv", "y", ["x1"], True, chunk_rows=8, sidecar=True)
+    schema = read_schema(path)  # el sidecar sí se escribe: x1 queda como no numérica
+    assert schema is not None and not {c["name"]: c for c in schema["columns"]}["x1"]["numeric"]
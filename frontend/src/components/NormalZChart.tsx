@@ -225,17 +225,15 @@ export default function NormalZChart() {
 
   const onPickFromLibrary = async (fileMeta: { id: number; filename: string }) => {
     try {
-      const resp = await fetch(`${API_BASE}/api/library/excel/download?id=${fileMeta.id}`, {
+      // el backend extrae solo la columna (sin bajar ni parsear el libro completo)
+      const colName = activeDist === 0 ? "z" : "t";
+      const params = new URLSearchParams({ id: String(fileMeta.id), columns: colName });
+      const resp = await fetch(`${API_BASE}/api/library/excel/columns?${params}`, {
         credentials: "include",
       });
       if (!resp.ok) return;
-      const blob = await resp.blob();
-      const ab = await blob.arrayBuffer();
-      const wb = XLSX.read(new Uint8Array(ab), { type: "array" });
-      const ws = wb.Sheets[wb.SheetNames[0]];
-      const rows: Row[] = XLSX.utils.sheet_to_json(ws, { defval: null });
-      const colName = activeDist === 0 ? "z" : "t";
-      const colz = rows.map((r) => Number(r[colName])).filter(Number.isFinite) as number[];
+      const data: { columns: Record<string, number[]> } = await resp.json();
+      const colz = data.columns[colName] ?? [];
       setSampleZ(colz.length ? colz : null);
       if (fileInputRef.current) fileInputRef.current.value = "";
     } catch {
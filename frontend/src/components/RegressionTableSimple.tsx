@@ -17,6 +17,19 @@ const API_BASE = 'http://localhost:8000'
 
 type Row = { x: string; y: string; x2?: string }
 
+// Operaciones por índice que llevan las filas usadas en el último cálculo a las actuales
+function rowDelta(prev: number[][], next: number[][], names: string[]) {
+  const toRow = (v: number[]) => Object.fromEntries(names.map((n, j) => [n, v[j]]))
+  const ops: { op: string; index?: number; row?: Record<string, number> }[] = []
+  const common = Math.min(prev.length, next.length)
+  for (let i = 0; i < common; i++) {
+    if (prev[i].some((v, j) => v !== next[i][j])) ops.push({ op: 'set', index: i, row: toRow(next[i]) })
+  }
+  for (let i = common; i < next.length; i++) ops.push({ op: 'append', row: toRow(next[i]) })
+  for (let i = prev.length - 1; i >= common; i--) ops.push({ op: 'delete', index: i })
+  return ops
+}
+
 export default function RegressionTableSimple() {
   const [rows, setRows] = useState<Row[]>([
     { x: '1', y: '0.7' },
@@ -33,6 +46,8 @@ export default function RegressionTableSimple() {
   const [loaded, setLoaded] = useState(false)
   const saveTimer = useRef<number | null>(null)
   const chartRef = useRef<HTMLDivElement | null>(null)
+  // sesión incremental en el backend: tras el primer cálculo solo viajan las filas que cambiaron
+  const sessionRef = useRef<{ key: string; rows: number[][]; version: number } | null>(null)
 
   useEffect(() => {
     ;(async () => {
@@ -155,14 +170,32 @@ export default function RegressionTableSimple() {
         X['x2'] = x2Arr
       }
 
-      const resp = await fetch(`${API_BASE}/api/regression/json`, {
+      const names = useX2 ? ['y', 'x1', 'x2'] : ['y', 'x1']
+      const used = yArr.map((y, i) => (useX2 ? [y, x1Arr[i], x2Arr[i]] : [y, x1Arr[i]]))
+      const key = `${names.join(',')}|${fitIntercept}`
+      const post = (path: string, body: any) => fetch(`${API_BASE}${path}`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         credentials: 'include',
-        body: JSON.stringify({ y: yArr, X, fit_intercept: fitIntercept }),
+        body: JSON.stringify(body),
       })
+      let resp: Response | null = null
+      const session = sessionRef.current
+      if (session && session.key === key) {
+        resp = await post('/api/regression/session/delta', {
+          ops: rowDelta(session.rows, used, names),
+          base_version: session.version,
+        })
+        // 404: la sesión expiró; 409: otra pestaña la modificó -> se recrea con todas las filas
+        if (resp.status === 404 || resp.status === 409) resp = null
+      }
+      if (!resp) resp = await post('/api/regression/session', { y: yArr, X, fit_intercept: fitIntercept })
       const json = await resp.json()
-      if (!resp.ok) throw new Error(json.error || 'Error desconocido')
+      if (!resp.ok) {
+        sessionRef.current = null
+        throw new Error(json.error || 'Error desconocido')
+      }
+      sessionRef.current = { key, rows: used, version: json.session.version }
       setResult(json)
     } catch (e: any) {
       setError(e.message)